@@ -1,13 +1,29 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional
-from paddleocr import PaddleOCR
-from PIL import Image
-import io
+import os
+import sys
 import uvicorn
 
-app = FastAPI(title="DeciGrade OCR Service", version="0.1.0")
+# Share the ml-service OCR pipeline (engines, decode, deskew) instead of a separate PaddleOCR setup
+ML_SERVICE_PATH = os.getenv(
+    "DECIGARDE_ML_SERVICE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ml-service")
+)
+if ML_SERVICE_PATH not in sys.path:
+    sys.path.insert(0, ML_SERVICE_PATH)
+
+from services.runtime_config import apply_thread_budget, get_worker_pool, thread_budget_enabled
+
+# Budget library threads against the worker pool before the OCR engines load
+thread_budget = apply_thread_budget()
+
+from services.ocr_service import get_ocr_service
+from services.image_decoder import decode_image
+from services.image_preprocessor import ImagePreprocessor
+
+app = FastAPI(title="DeciGrade OCR Service", version="0.2.0")
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,47 +33,63 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize OCR once at startup (English by default)
-ocr = PaddleOCR(use_angle_cls=True, lang="en")
+# Engines used by this lightweight service (PaddleOCR, or its ONNX export when configured)
+OCR_ENGINES = [e.strip() for e in os.getenv("AI_ENGINE_OCR_ENGINES", "paddleocr,onnxocr").split(",") if e.strip()]
+DESKEW_ENABLED = os.getenv("OCR_DESKEW", "true").lower() == "true"
+
+# Initialize OCR once at startup; shared with ml-service when both run in one process
+ocr = get_ocr_service()
+preprocessor = ImagePreprocessor()
+worker_pool = get_worker_pool()
+if thread_budget_enabled():
+    thread_budget.enforce()
 
 
 class OCRResponse(BaseModel):
     text: str
     confidence: float
     provider: str = "paddleocr"
+    processing_time: Optional[float] = None
+
+
+def run_ocr(content: bytes) -> dict:
+    """Decode once with OpenCV and hand the array straight to the engines"""
+    image, _ = decode_image(content)
+    if image is None:
+        raise ValueError("Failed to decode image")
+
+    straightened = False
+    if DESKEW_ENABLED:
+        image, deskew_info = preprocessor.deskew_image(image)
+        straightened = deskew_info["straightened"]
+
+    # Fall back to every available engine when the configured ones are not installed
+    engines = [e for e in OCR_ENGINES if e in ocr.get_available_engines()] or None
+    return ocr.extract_from_array(image, enhance_handwriting=True, engines=engines,
+                                  page_straightened=straightened)
 
 
 @app.post("/ocr", response_model=OCRResponse)
 async def ocr_endpoint(file: UploadFile = File(...)):
     content = await file.read()
-    image = Image.open(io.BytesIO(content)).convert("RGB")
-    image_bytes = io.BytesIO()
-    image.save(image_bytes, format="PNG")
-    image_bytes.seek(0)
 
-    # Run OCR
-    result = ocr.ocr(image_bytes.getvalue(), cls=True)
+    try:
+        result = await worker_pool.run(run_ocr, content)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    lines = []
-    confidences = []
-    for page in result:
-        for line in page:
-            text = line[1][0]
-            conf = float(line[1][1]) if line[1][1] is not None else 0.0
-            lines.append(text)
-            confidences.append(conf)
-
-    full_text = "\n".join(lines).strip()
-    avg_conf = float(sum(confidences) / len(confidences)) if confidences else 0.0
-
-    return OCRResponse(text=full_text, confidence=avg_conf, provider="paddleocr")
+    return OCRResponse(
+        text=result.get("text", "").strip(),
+        confidence=float(result.get("confidence", 0.0)),
+        provider=result.get("provider", "none"),
+        processing_time=result.get("processing_time")
+    )
 
 
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
+    return {"status": "ok", "engines": ocr.get_available_engines()}
 
 
 if __name__ == "__main__":
     uvicorn.run("ocr_service:app", host="127.0.0.1", port=8001, reload=False)
-
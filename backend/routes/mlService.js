@@ -5,6 +5,9 @@ const axios = require('axios');
 // ML Service configuration
 const ML_SERVICE_URL = process.env.ML_SERVICE_URL || 'http://localhost:8000';
 
+// The ML service shares its workers fairly between tenants; each teacher is one tenant
+const tenantHeaders = (req) => (req.user ? { 'X-Tenant-ID': String(req.user._id || req.user.id) } : {});
+
 // Health check for ML service
 router.get('/health', async (req, res) => {
   try {
@@ -42,7 +45,8 @@ router.post('/ocr', async (req, res) => {
     // Forward the request to ML service
     const response = await axios.post(`${ML_SERVICE_URL}/api/ml/ocr`, req.body, {
       headers: {
-        'Content-Type': 'multipart/form-data'
+        'Content-Type': 'multipart/form-data',
+        ...tenantHeaders(req)
       }
     });
     
@@ -59,7 +63,9 @@ router.post('/ocr', async (req, res) => {
 router.post('/mark', async (req, res) => {
   try {
     // Forward the request to ML service
-    const response = await axios.post(`${ML_SERVICE_URL}/api/ml/mark`, req.body);
+    const response = await axios.post(`${ML_SERVICE_URL}/api/ml/mark`, req.body, {
+      headers: tenantHeaders(req)
+    });
     
     res.json(response.data);
   } catch (error) {
@@ -76,7 +82,8 @@ router.post('/batch-ocr', async (req, res) => {
     // Forward the request to ML service
     const response = await axios.post(`${ML_SERVICE_URL}/api/ml/batch-ocr`, req.body, {
       headers: {
-        'Content-Type': 'multipart/form-data'
+        'Content-Type': 'multipart/form-data',
+        ...tenantHeaders(req)
       }
     });
     
@@ -93,7 +100,9 @@ router.post('/batch-ocr', async (req, res) => {
 router.post('/batch-mark', async (req, res) => {
   try {
     // Forward the request to ML service
-    const response = await axios.post(`${ML_SERVICE_URL}/api/ml/batch-mark`, req.body);
+    const response = await axios.post(`${ML_SERVICE_URL}/api/ml/batch-mark`, req.body, {
+      headers: tenantHeaders(req)
+    });
     
     res.json(response.data);
   } catch (error) {
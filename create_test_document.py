@@ -1,88 +1,191 @@
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageFont, ImageFilter
 import io
 import os
+import random
 
-def create_test_document():
-    """Create a realistic test document image with clear text"""
-    # Create a document-sized image (A4-like proportions)
-    width, height = 800, 1100
-    img = Image.new('RGB', (width, height), color='white')
-    draw = ImageDraw.Draw(img)
-    
-    # Try to use a larger font for better OCR
+# Reference layout the document coordinates are expressed in
+BASE_WIDTH, BASE_HEIGHT = 800, 1100
+
+HEADER_LINES = [
+    "TEST DOCUMENT FOR OCR",
+    "DeciGarde OCR Testing"
+]
+
+CONTENT_LINES = [
+    "This is a test document created specifically for",
+    "testing the OCR capabilities of the DeciGarde system.",
+    "",
+    "The document contains multiple lines of text with",
+    "varying content to ensure proper text extraction.",
+    "",
+    "Sample question: What is the capital of France?",
+    "Sample answer: The capital of France is Paris.",
+    "",
+    "This text should be easily readable by OCR engines",
+    "including Tesseract, PaddleOCR, and EasyOCR.",
+    "",
+    "Additional content for testing:",
+    "- Mathematics: 2 + 2 = 4",
+    "- Geography: London is in England",
+    "- Science: Water is H2O",
+    "",
+    "End of test document content."
+]
+
+FOOTER_LINES = [
+    "Generated for OCR testing purposes",
+    "Date: August 26, 2025"
+]
+
+def _load_font(size):
+    """Load a TrueType font at the given size, falling back to the default font"""
     try:
-        # Try to use a larger font
-        font_large = ImageFont.truetype("arial.ttf", 24)
-        font_medium = ImageFont.truetype("arial.ttf", 18)
-        font_small = ImageFont.truetype("arial.ttf", 14)
+        return ImageFont.truetype("arial.ttf", size)
     except:
         try:
-            # Fallback to default font
-            font_large = ImageFont.load_default()
-            font_medium = ImageFont.load_default()
-            font_small = ImageFont.load_default()
+            # Pillow >= 10.1 can scale the default font
+            return ImageFont.load_default(size=size)
+        except TypeError:
+            return ImageFont.load_default()
         except:
             # Last resort - no font
-            font_large = None
-            font_medium = None
-            font_small = None
-    
+            return None
+
+def _draw_handwritten_line(draw, position, text, font, rng, scale):
+    """Draw a line character by character with baseline, spacing and stroke jitter"""
+    x, y = position
+    for char in text:
+        jitter_y = rng.uniform(-2.5, 2.5) * scale
+        shade = rng.randint(0, 60)
+        stroke = 1 if rng.random() < 0.3 else 0
+        draw.text((x, y + jitter_y), char, fill=(shade, shade, shade + 40),
+                  font=font, stroke_width=stroke, stroke_fill=(shade, shade, shade + 40))
+        try:
+            advance = draw.textlength(char, font=font)
+        except Exception:
+            advance = 8 * scale
+        x += advance * rng.uniform(0.95, 1.2)
+
+def _apply_noise(img, noise, rng):
+    """Degrade an image with blur, gaussian noise and speckles (noise in 0..1)"""
+    if noise <= 0:
+        return img
+
+    if noise >= 0.1:
+        img = img.filter(ImageFilter.GaussianBlur(radius=noise * 4))
+
+    # Gaussian intensity noise via a per-pixel effect image
+    sigma = int(noise * 120)
+    if sigma > 0:
+        noise_layer = Image.effect_noise(img.size, sigma).convert('RGB')
+        img = Image.blend(img, noise_layer, min(noise, 0.5))
+
+    # Salt and pepper speckles
+    draw = ImageDraw.Draw(img)
+    speckles = int(img.size[0] * img.size[1] * noise * 0.002)
+    for _ in range(speckles):
+        px = rng.randrange(img.size[0])
+        py = rng.randrange(img.size[1])
+        draw.point((px, py), fill='black' if rng.random() < 0.5 else 'white')
+
+    return img
+
+def render_test_document(width=BASE_WIDTH, height=BASE_HEIGHT, style="printed", noise=0.0, skew_angle=0.0, seed=0, lines=None):
+    """
+    Render a synthetic exam-style page
+
+    Args:
+        width: Page width in pixels
+        height: Page height in pixels
+        style: "printed" for clean typeset text, "handwritten" for jittered strokes
+        noise: Degradation level between 0 (clean) and 1 (unreadable)
+        skew_angle: Rotation applied to the whole page in degrees
+        seed: Random seed so generated corpora are reproducible
+        lines: Optional body lines (defaults to CONTENT_LINES)
+
+    Returns:
+        PIL RGB image of the page
+    """
+    rng = random.Random(seed)
+    content_lines = CONTENT_LINES if lines is None else lines
+
+    scale_x = width / BASE_WIDTH
+    scale_y = height / BASE_HEIGHT
+    scale = min(scale_x, scale_y)
+
+    img = Image.new('RGB', (width, height), color='white')
+    draw = ImageDraw.Draw(img)
+
+    font_large = _load_font(max(int(24 * scale), 8))
+    font_medium = _load_font(max(int(18 * scale), 8))
+    font_small = _load_font(max(int(14 * scale), 8))
+
+    def at(x, y):
+        return (int(x * scale_x), int(y * scale_y))
+
     # Draw document header
-    draw.rectangle([(50, 50), (width-50, 120)], outline='black', width=2)
-    draw.text((100, 70), "TEST DOCUMENT FOR OCR", fill='black', font=font_large)
-    draw.text((100, 100), "DeciGarde OCR Testing", fill='black', font=font_medium)
-    
+    draw.rectangle([at(50, 50), at(BASE_WIDTH - 50, 120)], outline='black', width=max(int(2 * scale), 1))
+    draw.text(at(100, 70), HEADER_LINES[0], fill='black', font=font_large)
+    draw.text(at(100, 100), HEADER_LINES[1], fill='black', font=font_medium)
+
     # Draw main content area
-    draw.rectangle([(50, 150), (width-50, height-100)], outline='black', width=1)
-    
+    draw.rectangle([at(50, 150), at(BASE_WIDTH - 50, BASE_HEIGHT - 100)], outline='black', width=max(int(scale), 1))
+
     # Add sample text content
     y_position = 180
     line_height = 30
-    
-    content_lines = [
-        "This is a test document created specifically for",
-        "testing the OCR capabilities of the DeciGarde system.",
-        "",
-        "The document contains multiple lines of text with",
-        "varying content to ensure proper text extraction.",
-        "",
-        "Sample question: What is the capital of France?",
-        "Sample answer: The capital of France is Paris.",
-        "",
-        "This text should be easily readable by OCR engines",
-        "including Tesseract, PaddleOCR, and EasyOCR.",
-        "",
-        "Additional content for testing:",
-        "- Mathematics: 2 + 2 = 4",
-        "- Geography: London is in England",
-        "- Science: Water is H2O",
-        "",
-        "End of test document content."
-    ]
-    
+
     for line in content_lines:
-        if line.startswith("-"):
-            # Indent bullet points
-            draw.text((80, y_position), line, fill='black', font=font_small)
-        elif line == "":
+        if line == "":
             # Skip empty lines
-            pass
+            y_position += line_height
+            continue
+
+        x_position = 80 if line.startswith("-") else 70
+        if style == "handwritten":
+            _draw_handwritten_line(draw, at(x_position, y_position), line, font_small, rng, scale)
         else:
-            draw.text((70, y_position), line, fill='black', font=font_small)
+            draw.text(at(x_position, y_position), line, fill='black', font=font_small)
         y_position += line_height
-    
+
     # Add footer
-    draw.text((70, height-80), "Generated for OCR testing purposes", fill='black', font=font_small)
-    draw.text((70, height-60), "Date: August 26, 2025", fill='black', font=font_small)
-    
+    draw.text(at(70, BASE_HEIGHT - 80), FOOTER_LINES[0], fill='black', font=font_small)
+    draw.text(at(70, BASE_HEIGHT - 60), FOOTER_LINES[1], fill='black', font=font_small)
+
+    if skew_angle:
+        img = img.rotate(skew_angle, resample=Image.BICUBIC, expand=False, fillcolor='white')
+
+    return _apply_noise(img, noise, rng)
+
+def document_ground_truth(lines=None):
+    """Return the text an ideal OCR engine would extract from a rendered page"""
+    content_lines = CONTENT_LINES if lines is None else lines
+    all_lines = HEADER_LINES + [line for line in content_lines if line] + FOOTER_LINES
+    return "\n".join(all_lines)
+
+def encode_document(img, format='JPEG', quality=90):
+    """Encode a rendered page to bytes as a phone or scanner upload would be"""
+    buffer = io.BytesIO()
+    if format.upper() == 'JPEG':
+        img.save(buffer, format='JPEG', quality=quality)
+    else:
+        img.save(buffer, format=format)
+    return buffer.getvalue()
+
+def create_test_document():
+    """Create a realistic test document image with clear text"""
+    # Create a document-sized image (A4-like proportions)
+    width, height = BASE_WIDTH, BASE_HEIGHT
+    img = render_test_document(width, height)
+
     # Save the image
     output_path = "test_document.png"
     img.save(output_path, format='PNG', quality=95)
-    
+
     print(f"✅ Test document created: {output_path}")
     print(f"📏 Dimensions: {width}x{height} pixels")
     print(f"📁 File size: {os.path.getsize(output_path)} bytes")
-    
+
     return output_path
 
 if __name__ == "__main__":
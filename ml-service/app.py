@@ -1,20 +1,46 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
 import uvicorn
 import logging
 import os
-from typing import List, Dict, Any
+import hmac
+import time
+import uuid
+from contextlib import nullcontext
+from typing import List, Dict, Any, Optional, Callable
 import json
 from dotenv import load_dotenv
 
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
 # Load environment variables from .env file
 load_dotenv()
 
+# Split CPUs between request workers and library thread pools before the ML libraries load
+from services.runtime_config import apply_thread_budget, get_worker_pool, thread_budget_enabled
+thread_budget = apply_thread_budget()
+
 # Import our ML services
-from services.ocr_service import OCRService
+from services.ocr_service import get_ocr_service
 from services.marking_service import MarkingService
 from services.image_preprocessor import ImagePreprocessor
+from services.dedup import DuplicateIndex, content_hash
+from services.degradation import DegradationController, DegradationPolicy, DEGRADATION_HEADER
+from services.single_flight import SingleFlight, request_key
+from services.request_scheduler import (set_request_class, reset_request_class, TENANT_HEADER, PRIORITY_HEADER,
+                                        DEFAULT_TENANT)
+from services.metrics import (
+    REQUESTS_TOTAL, REQUEST_DURATION, REQUESTS_IN_FLIGHT, QUEUE_DEPTH, OCR_ROUTES,
+    time_stage, record_cache_lookup, render_metrics
+)
+from services.tracing import TRACE_HEADER, start_trace, is_trace_requested, write_trace_file
+from services.profiler import profile_process
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -36,10 +62,247 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Admin endpoints are enabled by setting ML_ADMIN_TOKEN and sending it in this header
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+MAX_PROFILE_SECONDS = 120
+
+# Quality gate: triage pages and send clean printed ones to the light Tesseract-only path
+QUALITY_GATE_ENABLED = os.getenv('OCR_QUALITY_GATE', 'true').lower() == 'true'
+LIGHT_PATH_MIN_CONFIDENCE = float(os.getenv('OCR_LIGHT_MIN_CONFIDENCE', '0.6'))
+
+# Page-level deskew before OCR; straightened pages skip PaddleOCR's per-line angle classifier
+DESKEW_ENABLED = os.getenv('OCR_DESKEW', 'true').lower() == 'true'
+
+# Reuse the OCR result of pages uploaded again (identical bytes) in batch uploads
+DEDUP_ENABLED = os.getenv('OCR_DEDUP', 'true').lower() == 'true'
+
 # Initialize services
-ocr_service = OCRService()
+ocr_service = get_ocr_service()
 marking_service = MarkingService()
 image_preprocessor = ImagePreprocessor()
+duplicate_index = DuplicateIndex.from_env()
+degradation = DegradationController.from_env()
+# Identical OCR (multipart or raw body) and marking requests in flight share one computation
+ocr_flight = SingleFlight.from_env("ocr")
+mark_flight = SingleFlight.from_env("mark")
+
+# Model endpoints served at a degradation level; single-item ones also feed the latency SLO
+DEGRADABLE_ENDPOINTS = {"/api/ml/ocr", "/api/ml/ocr/raw", "/api/ml/mark", "/api/ml/remark", "/api/ml/batch-ocr",
+                        "/api/ml/batch-mark", "/api/ml/batch-remark"}
+LATENCY_SLO_ENDPOINTS = {"/api/ml/ocr", "/api/ml/ocr/raw", "/api/ml/mark"}
+# Batch items queue behind single pages and answers for a model worker
+BULK_ENDPOINTS = {"/api/ml/batch-ocr", "/api/ml/batch-mark", "/api/ml/batch-remark"}
+
+# Model loading may have resized library thread pools; re-apply the budget
+worker_pool = get_worker_pool()
+if thread_budget_enabled():
+    thread_budget.enforce()
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests and record in-flight and end-to-end latency metrics"""
+    start_time = time.perf_counter()
+    status_code = 500
+    with REQUESTS_IN_FLIGHT.track_inprogress():
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            # Label by route template rather than raw path to bound cardinality
+            route = request.scope.get("route")
+            endpoint = getattr(route, "path", "unmatched")
+            REQUESTS_TOTAL.labels(method=request.method, endpoint=endpoint, status=str(status_code)).inc()
+            REQUEST_DURATION.labels(method=request.method, endpoint=endpoint).observe(time.perf_counter() - start_time)
+
+@app.middleware("http")
+async def apply_degradation(request: Request, call_next):
+    """Pick the degradation level for model requests, tag the response with it and feed the latency SLO"""
+    if request.url.path not in DEGRADABLE_ENDPOINTS:
+        return await call_next(request)
+    
+    policy = degradation.current()
+    request.state.degradation = policy
+    start_time = time.perf_counter()
+    response = await call_next(request)
+    if request.url.path in LATENCY_SLO_ENDPOINTS:
+        degradation.record_latency(time.perf_counter() - start_time)
+    response.headers[DEGRADATION_HEADER] = str(policy.level)
+    degradation.tag(policy)
+    return response
+
+@app.middleware("http")
+async def classify_request(request: Request, call_next):
+    """Schedule the request's model work by tenant (X-Tenant-ID) and priority class"""
+    tenant = request.headers.get(TENANT_HEADER, "").strip()[:64] or DEFAULT_TENANT
+    # Callers may ask for bulk scheduling of single requests, but batches are always bulk
+    bulk = (request.url.path in BULK_ENDPOINTS
+            or request.headers.get(PRIORITY_HEADER, "").strip().lower() == "bulk")
+    token = set_request_class(tenant, "bulk" if bulk else "interactive")
+    try:
+        return await call_next(request)
+    finally:
+        reset_request_class(token)
+
+def _degradation_policy(request: Request) -> DegradationPolicy:
+    """Level chosen for this request by the degradation middleware"""
+    return getattr(request.state, 'degradation', None) or degradation.current()
+
+def _json_response(content: Dict[str, Any]) -> JSONResponse:
+    """Build a JSON response, timing serialization as its own stage"""
+    with time_stage('json_serialization'):
+        return JSONResponse(content=content)
+
+MSGPACK_MEDIA_TYPES = ('application/msgpack', 'application/x-msgpack')
+
+def _msgpack_default(value):
+    # numpy scalars and other stragglers that JSONResponse would also reject
+    return value.item() if hasattr(value, 'item') else str(value)
+
+def _negotiated_response(content: Dict[str, Any], request: Optional[Request]) -> Response:
+    """MessagePack when the caller accepts it and msgpack is installed, compact JSON otherwise"""
+    accept = request.headers.get('accept', '') if request is not None else ''
+    if MSGPACK_AVAILABLE and any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES):
+        with time_stage('msgpack_serialization'):
+            body = msgpack.packb(content, use_bin_type=True, default=_msgpack_default)
+        return Response(content=body, media_type=MSGPACK_MEDIA_TYPES[0])
+    return _json_response(content)
+
+def _require_admin(request: Request):
+    """Reject requests without the configured admin token"""
+    admin_token = os.getenv('ML_ADMIN_TOKEN')
+    if not admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ML_ADMIN_TOKEN not set)")
+    if not hmac.compare_digest(request.headers.get(ADMIN_TOKEN_HEADER, ''), admin_token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+def _extract_with_quality_gate(image_content: bytes, language: str, enhance_handwriting: bool,
+                               auto_route: bool, preprocess: bool = False, deskew: bool = False,
+                               policy: Optional[DegradationPolicy] = None):
+    """
+    Run OCR through the quality gate
+    
+    Clean printed pages go to the light Tesseract-only path and are escalated to
+    the full multi-engine path if the light result is empty or low-confidence.
+    Handwritten or low-quality pages go straight to the full path; unreadable
+    pages are rejected without running any engine.
+    
+    Args:
+        image_content: Raw image bytes
+        language: Language code
+        enhance_handwriting: Whether the caller asked for handwriting-optimized settings
+        auto_route: Whether to apply the quality gate at all
+        preprocess: Whether to run ImagePreprocessor before OCR
+        deskew: Straighten the page once before OCR (result carries the 'deskew' info)
+        policy: Degradation level limiting OCR engines and working resolution (default: none)
+    
+    Returns:
+        Tuple of (OCR result or None when rejected, triage result or None when not routed)
+    """
+    triage = None
+    route = "full"
+    deskew_info = None
+    max_engines = policy.max_ocr_engines if policy else None
+    max_side = policy.max_image_side if policy else None
+    
+    if auto_route:
+        triage = image_preprocessor.triage(image_content)
+        route = triage["route"]
+        
+        if route == "reject":
+            OCR_ROUTES.labels(route="reject").inc()
+            return None, triage
+        
+        if route == "light" and 'tesseract' not in ocr_service.get_available_engines():
+            route = "full"
+            triage["reason"] += " (light engine unavailable)"
+    
+    if deskew:
+        image_content, deskew_info = image_preprocessor.deskew(image_content)
+    straightened = bool(deskew_info and deskew_info["straightened"])
+    
+    if route == "light":
+        image_data = image_preprocessor.preprocess(image_content, enhance_handwriting=False) if preprocess else image_content
+        ocr_result = ocr_service.extract_text(image_data, language=language, enhance_handwriting=False,
+                                              engines=['tesseract'], page_straightened=straightened,
+                                              max_side=max_side)
+        if ocr_result["text"].strip() and ocr_result["confidence"] >= LIGHT_PATH_MIN_CONFIDENCE:
+            OCR_ROUTES.labels(route="light").inc()
+            triage["route_taken"] = "light"
+            if deskew_info is not None:
+                ocr_result["deskew"] = deskew_info
+            return ocr_result, triage
+        route = "light_escalated"
+    
+    image_data = image_preprocessor.preprocess(image_content, enhance_handwriting=enhance_handwriting) if preprocess else image_content
+    ocr_result = ocr_service.extract_text(image_data, language=language, enhance_handwriting=enhance_handwriting,
+                                          page_straightened=straightened, max_engines=max_engines, max_side=max_side)
+    OCR_ROUTES.labels(route=route).inc()
+    if triage is not None:
+        triage["route_taken"] = route
+    if deskew_info is not None:
+        ocr_result["deskew"] = deskew_info
+    return ocr_result, triage
+
+def _maybe_trace(request: Request, form_flag: bool, name: str, **attributes):
+    """Start a trace when the request opted in via header or form flag"""
+    if is_trace_requested(request.headers.get(TRACE_HEADER), form_flag):
+        return start_trace(name, **attributes)
+    return nullcontext(None)
+
+def _traced_response(content: Dict[str, Any], trace_root, request: Optional[Request] = None) -> Response:
+    """
+    Attach the span tree to a response and write it to TRACE_OUTPUT_DIR when configured
+    
+    Passing the request lets the caller negotiate a MessagePack response via Accept.
+    """
+    if trace_root is not None:
+        content["trace"] = trace_root.to_dict()
+        trace_file = write_trace_file(trace_root)
+        if trace_file:
+            content["trace_file"] = trace_file
+    if request is not None:
+        return _negotiated_response(content, request)
+    return _json_response(content)
+
+async def _run_coalesced(flight: SingleFlight, key: str, trace_root, func: Callable, *args, **kwargs):
+    """Run func on the worker pool; untraced identical requests in flight share one run"""
+    if trace_root is not None:
+        # A traced request needs its own spans
+        return await worker_pool.run(func, *args, **kwargs)
+    return await flight.run(key, lambda: worker_pool.run(func, *args, **kwargs))
+
+def _ocr_response(ocr_result, triage, filename: str, language: str,
+                  policy: Optional[DegradationPolicy] = None) -> Dict[str, Any]:
+    """Build the OCR response body, or raise 422 when the quality gate rejected the page"""
+    if ocr_result is None:
+        logger.info(f"OCR rejected for {filename}: {triage['reason']}")
+        raise HTTPException(status_code=422, detail={
+            "message": f"Image rejected by quality gate: {triage['reason']}",
+            "quality": triage
+        })
+    
+    logger.info(f"OCR completed for {filename}. Confidence: {ocr_result['confidence']}")
+    
+    response = {
+        "success": True,
+        "text": ocr_result["text"],
+        "confidence": ocr_result["confidence"],
+        "provider": ocr_result["provider"],
+        "processing_time": ocr_result.get("processing_time", 0),
+        "engine_times": ocr_result.get("engine_times", {}),
+        "language": language
+    }
+    if triage is not None:
+        response["route"] = triage["route_taken"]
+        response["quality"] = triage
+    if "deskew" in ocr_result:
+        response["deskew"] = ocr_result["deskew"]
+    if "schedule" in ocr_result:
+        response["schedule"] = ocr_result["schedule"]
+    if policy is not None:
+        response["degradation"] = policy.describe()
+    return response
 
 @app.get("/")
 async def root():
@@ -62,6 +325,60 @@ async def health_check():
         }
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: request counts, in-flight, queue depth, stage latencies, caches and model state"""
+    return Response(content=render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/ml/admin/profile")
+async def profile_service(
+    request: Request,
+    seconds: float = 10.0,
+    mode: str = "wall",
+    interval_ms: float = 5.0,
+    threads: str = ""
+):
+    """
+    Sample the live process and return a flamegraph-compatible collapsed-stack file (admin only)
+    
+    Args:
+        seconds: Profiling duration (max 120)
+        mode: 'wall' for wall-clock time, 'cpu' for on-CPU time
+        interval_ms: Sampling interval in milliseconds
+        threads: Comma-separated thread name prefixes to sample (default: all threads)
+    
+    Returns:
+        Collapsed stacks ("thread;frame;...;leaf count" per line)
+    """
+    _require_admin(request)
+    
+    if mode not in ('wall', 'cpu'):
+        raise HTTPException(status_code=400, detail="mode must be 'wall' or 'cpu'")
+    if not 0 < seconds <= MAX_PROFILE_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {MAX_PROFILE_SECONDS}")
+    if interval_ms < 1:
+        raise HTTPException(status_code=400, detail="interval_ms must be at least 1")
+    
+    thread_prefixes = [t.strip() for t in threads.split(',') if t.strip()]
+    try:
+        # Sample from a worker thread so the event loop keeps serving the requests being profiled
+        profiler = await run_in_threadpool(
+            profile_process, seconds, mode=mode, interval=interval_ms / 1000.0, thread_prefixes=thread_prefixes
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    summary = profiler.summary()
+    return PlainTextResponse(
+        content=profiler.collapsed(),
+        headers={
+            "X-Profile-Mode": summary["mode"],
+            "X-Profile-Samples": str(summary["samples"]),
+            "X-Profile-Duration": f"{summary['duration']:.3f}",
+            "Content-Disposition": f'attachment; filename="decigarde-{mode}-profile.collapsed"'
+        }
+    )
+
 @app.get("/api/ml/capabilities")
 async def get_capabilities():
     """Get ML service capabilities and status"""
@@ -70,6 +387,8 @@ async def get_capabilities():
             "ocr": {
                 "available_engines": ocr_service.get_available_engines(),
                 "engine_status": ocr_service.get_engine_status(),
+                "engines": ocr_service.registry.describe(),
+                "scheduler": ocr_service.scheduler.report(),
                 "supported_languages": ["eng", "fra", "spa", "deu", "ita", "por", "rus", "chi_sim", "jpn", "kor"],
                 "handwriting_optimization": True,
                 "batch_processing": True
@@ -84,8 +403,19 @@ async def get_capabilities():
                 "handwriting_enhancement": True,
                 "noise_reduction": True,
                 "text_edge_enhancement": True,
-                "image_quality_analysis": True
+                "image_quality_analysis": True,
+                # Pages larger than this are downsized on arrival; clients may shrink uploads to match
+                "working_resolution": {
+                    "handwriting": dict(zip(("width", "height"), image_preprocessor.handwriting_max_size)),
+                    "printed": dict(zip(("width", "height"), image_preprocessor.printed_max_size))
+                }
             },
+            # Thread budget and the thread counts the loaded libraries report
+            "runtime": thread_budget.effective_settings(),
+            # Worker slots by priority class and tenant
+            "request_scheduling": worker_pool.scheduler.report(),
+            # Load-shedding levels and the signals that select them
+            "degradation": degradation.report(),
             "gpu_support": {
                 "enabled": os.getenv('USE_GPU', 'false').lower() == 'true',
                 "paddleocr_gpu": 'paddleocr' in ocr_service.get_available_engines(),
@@ -96,11 +426,41 @@ async def get_capabilities():
         logger.error(f"Error getting capabilities: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to get capabilities: {str(e)}")
 
+@app.post("/api/ml/analyze-quality")
+async def analyze_quality(image: UploadFile = File(...)):
+    """
+    Analyze image quality and report which OCR route the quality gate would take
+    
+    Args:
+        image: Image file (JPEG, PNG, etc.)
+    
+    Returns:
+        JSON with quality analysis, recommendations and triage decision
+    """
+    try:
+        if not image.content_type or not image.content_type.startswith('image/'):
+            raise HTTPException(status_code=400, detail="File must be an image")
+        
+        image_content = await image.read()
+        analysis = await worker_pool.run(image_preprocessor.analyze_image_quality, image_content)
+        analysis["triage"] = await worker_pool.run(image_preprocessor.triage, image_content)
+        return _json_response(analysis)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Quality analysis failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Quality analysis failed: {str(e)}")
+
 @app.post("/api/ml/ocr")
 async def process_ocr(
+    request: Request,
     image: UploadFile = File(...),
     language: str = Form("eng"),
-    enhance_handwriting: bool = Form(True)
+    enhance_handwriting: bool = Form(True),
+    auto_route: bool = Form(QUALITY_GATE_ENABLED),
+    deskew: bool = Form(DESKEW_ENABLED),
+    trace: bool = Form(False)
 ):
     """
     Process OCR on uploaded image
@@ -109,6 +469,9 @@ async def process_ocr(
         image: Image file (JPEG, PNG, etc.)
         language: Language code (eng, fra, spa, etc.)
         enhance_handwriting: Whether to use handwriting-optimized settings
+        auto_route: Triage the page and pick the light or full OCR pipeline (rejects unreadable pages)
+        deskew: Straighten the page before OCR
+        trace: Return a span tree of the request (also enabled by the X-DeciGarde-Trace header)
     
     Returns:
         JSON with extracted text and confidence
@@ -120,42 +483,109 @@ async def process_ocr(
         if not image.content_type or not image.content_type.startswith('image/'):
             raise HTTPException(status_code=400, detail="File must be an image")
         
-        # Read image content
-        image_content = await image.read()
+        policy = _degradation_policy(request)
+        with _maybe_trace(request, trace, "/api/ml/ocr", filename=image.filename) as trace_root:
+            # Read image content
+            with time_stage('read_upload') as read_span:
+                image_content = await image.read()
+                read_span.set_attribute('bytes', len(image_content))
+            
+            # TEMPORARY: Bypass preprocessor to fix OCR accuracy (preprocess=False)
+            # Extract text using OCR
+            key = request_key(image_content, language, enhance_handwriting, auto_route, deskew, policy.level)
+            ocr_result, triage = await _run_coalesced(
+                ocr_flight, key, trace_root,
+                _extract_with_quality_gate,
+                image_content,
+                language=language,
+                enhance_handwriting=enhance_handwriting,
+                auto_route=auto_route,
+                deskew=deskew,
+                policy=policy
+            )
         
-        # TEMPORARY: Bypass preprocessor to fix OCR accuracy
-        # processed_image = image_preprocessor.preprocess(image_content)
-        processed_image = image_content  # Use original image directly
+        response = _ocr_response(ocr_result, triage, image.filename, language, policy)
+        return _traced_response(response, trace_root)
         
-        # Extract text using OCR
-        ocr_result = ocr_service.extract_text(
-            processed_image, 
-            language=language,
-            enhance_handwriting=enhance_handwriting
-        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"OCR processing failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"OCR processing failed: {str(e)}")
+
+@app.post("/api/ml/ocr/raw")
+async def process_ocr_raw(
+    request: Request,
+    language: str = "eng",
+    enhance_handwriting: bool = True,
+    auto_route: bool = QUALITY_GATE_ENABLED,
+    deskew: bool = DESKEW_ENABLED,
+    trace: bool = False,
+    filename: str = "upload"
+):
+    """
+    Process OCR on an image sent as the raw request body
+    
+    Same behaviour as /api/ml/ocr without multipart encoding: the body is the
+    image itself (Content-Type image/* or application/octet-stream) and the
+    options are query parameters. Send ``Accept: application/msgpack`` for a
+    MessagePack response (falls back to JSON when msgpack is not installed).
+    
+    Args:
+        language: Language code (eng, fra, spa, etc.)
+        enhance_handwriting: Whether to use handwriting-optimized settings
+        auto_route: Triage the page and pick the light or full OCR pipeline (rejects unreadable pages)
+        deskew: Straighten the page before OCR
+        trace: Return a span tree of the request (also enabled by the X-DeciGarde-Trace header)
+        filename: Name used in logs and traces
+    
+    Returns:
+        Extracted text and confidence, as JSON or MessagePack
+    """
+    try:
+        content_type = request.headers.get('content-type', '')
+        if not (content_type.startswith('image/') or content_type.startswith('application/octet-stream')):
+            raise HTTPException(status_code=415, detail="Body must be an image (image/* or application/octet-stream)")
         
-        logger.info(f"OCR completed for {image.filename}. Confidence: {ocr_result['confidence']}")
+        policy = _degradation_policy(request)
+        with _maybe_trace(request, trace, "/api/ml/ocr/raw", filename=filename) as trace_root:
+            with time_stage('read_upload') as read_span:
+                image_content = await request.body()
+                read_span.set_attribute('bytes', len(image_content))
+            
+            if not image_content:
+                raise HTTPException(status_code=400, detail="Empty request body")
+            
+            key = request_key(image_content, language, enhance_handwriting, auto_route, deskew, policy.level)
+            ocr_result, triage = await _run_coalesced(
+                ocr_flight, key, trace_root,
+                _extract_with_quality_gate,
+                image_content,
+                language=language,
+                enhance_handwriting=enhance_handwriting,
+                auto_route=auto_route,
+                deskew=deskew,
+                policy=policy
+            )
         
-        return JSONResponse(content={
-            "success": True,
-            "text": ocr_result["text"],
-            "confidence": ocr_result["confidence"],
-            "provider": ocr_result["provider"],
-            "processing_time": ocr_result.get("processing_time", 0),
-            "language": language
-        })
+        response = _ocr_response(ocr_result, triage, filename, language, policy)
+        return _traced_response(response, trace_root, request)
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"OCR processing failed: {str(e)}")
+        logger.error(f"Raw OCR processing failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"OCR processing failed: {str(e)}")
 
 @app.post("/api/ml/mark")
 async def mark_script(
+    request: Request,
     question: str = Form(...),
     answer: str = Form(...),
     rubric: str = Form(...),
     max_score: int = Form(...),
-    subject: str = Form("general")
+    subject: str = Form("general"),
+    trace: bool = Form(False)
 ):
     """
     Mark a script answer using AI
@@ -166,6 +596,7 @@ async def mark_script(
         rubric: JSON string of marking criteria
         max_score: Maximum possible score
         subject: Subject area for specialized marking
+        trace: Return a span tree of the request (also enabled by the X-DeciGarde-Trace header)
     
     Returns:
         JSON with marking results
@@ -179,18 +610,92 @@ async def mark_script(
         except json.JSONDecodeError:
             raise HTTPException(status_code=400, detail="Invalid rubric JSON format")
         
-        # Process marking
-        marking_result = marking_service.mark_answer(
+        policy = _degradation_policy(request)
+        with _maybe_trace(request, trace, "/api/ml/mark", subject=subject, answer_chars=len(answer)) as trace_root:
+            # Process marking
+            key = request_key(question, answer, json.dumps(rubric_data, sort_keys=True), max_score, subject,
+                              policy.level)
+            marking_result = await _run_coalesced(
+                mark_flight, key, trace_root,
+                marking_service.mark_answer,
+                question=question,
+                answer=answer,
+                rubric=rubric_data,
+                max_score=max_score,
+                subject=subject,
+                approaches=policy.marking_approaches
+            )
+        
+        logger.info(f"Marking completed. Score: {marking_result['score']}/{max_score}")
+        
+        return _traced_response({
+            "success": True,
+            "score": marking_result["score"],
+            "max_score": max_score,
+            "feedback": marking_result["feedback"],
+            "confidence": marking_result["confidence"],
+            "matched_keywords": marking_result["matched_keywords"],
+            "semantic_score": marking_result.get("semantic_score", 0),
+            "improvements": marking_result.get("improvements", []),
+            "subject": subject,
+            "degradation": policy.describe()
+        }, trace_root)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Marking failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Marking failed: {str(e)}")
+
+@app.post("/api/ml/remark")
+async def remark_script(
+    request: Request,
+    question: str = Form(...),
+    answer: str = Form(...),
+    old_rubric: str = Form(...),
+    new_rubric: str = Form(...),
+    max_score: int = Form(...),
+    subject: str = Form("general")
+):
+    """
+    Re-mark an answer after its rubric was edited
+    
+    Only the marking approaches that depend on the edited rubric fields are
+    recomputed; the others reuse the results from when the answer was marked.
+    
+    Args:
+        question: The question text
+        answer: The student's answer text
+        old_rubric: JSON string of the rubric the answer was marked with
+        new_rubric: JSON string of the edited rubric
+        max_score: Maximum possible score
+        subject: Subject area for specialized marking
+    
+    Returns:
+        JSON with marking results for the new rubric and what was recomputed
+    """
+    try:
+        try:
+            old_rubric_data = json.loads(old_rubric)
+            new_rubric_data = json.loads(new_rubric)
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid rubric JSON format")
+        
+        policy = _degradation_policy(request)
+        marking_result = await worker_pool.run(
+            marking_service.remark_answer,
             question=question,
             answer=answer,
-            rubric=rubric_data,
+            old_rubric=old_rubric_data,
+            new_rubric=new_rubric_data,
             max_score=max_score,
-            subject=subject
+            subject=subject,
+            approaches=policy.marking_approaches
         )
         
-        logger.info(f"Marking completed. Score: {marking_result['score']}/{max_score}")
+        logger.info(f"Re-marking completed. Score: {marking_result['score']}/{max_score}")
         
-        return JSONResponse(content={
+        return _json_response({
             "success": True,
             "score": marking_result["score"],
             "max_score": max_score,
@@ -199,18 +704,26 @@ async def mark_script(
             "matched_keywords": marking_result["matched_keywords"],
             "semantic_score": marking_result.get("semantic_score", 0),
             "improvements": marking_result.get("improvements", []),
-            "subject": subject
+            "subject": subject,
+            "remark": marking_result.get("remark", {}),
+            "degradation": policy.describe()
         })
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Marking failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Marking failed: {str(e)}")
+        logger.error(f"Re-marking failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Re-marking failed: {str(e)}")
 
 @app.post("/api/ml/batch-ocr")
 async def process_batch_ocr(
+    request: Request,
     images: List[UploadFile] = File(...),
     language: str = Form("eng"),
-    enhance_handwriting: bool = Form(True)
+    enhance_handwriting: bool = Form(True),
+    auto_route: bool = Form(QUALITY_GATE_ENABLED),
+    deskew: bool = Form(DESKEW_ENABLED),
+    dedup: bool = Form(DEDUP_ENABLED)
 ):
     """
     Process OCR on multiple images
@@ -219,6 +732,9 @@ async def process_batch_ocr(
         images: List of image files
         language: Language code
         enhance_handwriting: Whether to use handwriting-optimized settings
+        auto_route: Triage each page and pick the light or full OCR pipeline (rejects unreadable pages)
+        deskew: Straighten each page before OCR
+        dedup: Reuse the OCR result of a page uploaded earlier and flag it as a duplicate
     
     Returns:
         JSON with results for each image
@@ -226,9 +742,17 @@ async def process_batch_ocr(
     try:
         logger.info(f"Processing batch OCR for {len(images)} images")
         
+        batch_id = uuid.uuid4().hex
         results = []
+        queue_depth = QUEUE_DEPTH.labels(queue='batch_ocr')
+        queue_depth.inc(len(images))
         
+        highest_policy = _degradation_policy(request)
         for i, image in enumerate(images):
+            queue_depth.dec()
+            # Long batches re-check the load for every page
+            policy = degradation.current() if i else highest_policy
+            highest_policy = max(highest_policy, policy, key=lambda p: p.level)
             try:
                 # Validate file type
                 if not image.content_type.startswith('image/'):
@@ -241,23 +765,73 @@ async def process_batch_ocr(
                 
                 # Read and process image
                 image_content = await image.read()
-                processed_image = image_preprocessor.preprocess(image_content)
                 
-                # Extract text
-                ocr_result = ocr_service.extract_text(
-                    processed_image,
+                # Pages uploaded again only cost a hash lookup
+                digest = await run_in_threadpool(content_hash, image_content) if dedup else None
+                ocr_settings = {"language": language, "enhance_handwriting": enhance_handwriting}
+                if digest is not None:
+                    match = duplicate_index.find(digest, **ocr_settings)
+                    record_cache_lookup('ocr_dedup', match is not None)
+                    if match is not None:
+                        results.append({
+                            "filename": image.filename,
+                            "success": True,
+                            "text": match["text"],
+                            "confidence": match["confidence"],
+                            "provider": match["provider"],
+                            "processing_time": 0,
+                            "duplicate_of": match["filename"],
+                            "duplicate_scope": "batch" if match["batch_id"] == batch_id else "index"
+                        })
+                        continue
+                
+                # Route, preprocess and extract text
+                ocr_result, triage = await worker_pool.run(
+                    _extract_with_quality_gate,
+                    image_content,
                     language=language,
-                    enhance_handwriting=enhance_handwriting
+                    enhance_handwriting=enhance_handwriting,
+                    auto_route=auto_route,
+                    preprocess=True,
+                    deskew=deskew,
+                    policy=policy
                 )
                 
-                results.append({
+                if ocr_result is None:
+                    results.append({
+                        "filename": image.filename,
+                        "success": False,
+                        "error": f"Image rejected by quality gate: {triage['reason']}",
+                        "route": "reject",
+                        "quality": triage
+                    })
+                    continue
+                
+                item = {
                     "filename": image.filename,
                     "success": True,
                     "text": ocr_result["text"],
                     "confidence": ocr_result["confidence"],
                     "provider": ocr_result["provider"],
-                    "processing_time": ocr_result.get("processing_time", 0)
-                })
+                    "processing_time": ocr_result.get("processing_time", 0),
+                    "degradation": policy.describe()
+                }
+                if triage is not None:
+                    item["route"] = triage["route_taken"]
+                if "deskew" in ocr_result:
+                    item["deskew"] = ocr_result["deskew"]
+                results.append(item)
+                
+                # Pages read at reduced resolution or with fewer engines are not reused at normal load
+                full_quality = policy.max_ocr_engines is None and policy.max_image_side is None
+                if digest is not None and ocr_result["text"].strip() and full_quality:
+                    duplicate_index.add(digest, ocr_settings, {
+                        "filename": image.filename,
+                        "batch_id": batch_id,
+                        "text": ocr_result["text"],
+                        "confidence": ocr_result["confidence"],
+                        "provider": ocr_result["provider"]
+                    })
                 
             except Exception as e:
                 logger.error(f"Failed to process {image.filename}: {str(e)}")
@@ -267,11 +841,16 @@ async def process_batch_ocr(
                     "error": str(e)
                 })
         
-        return JSONResponse(content={
+        if dedup:
+            await run_in_threadpool(duplicate_index.save)
+        
+        return _json_response({
             "success": True,
             "total_images": len(images),
             "processed_images": len([r for r in results if r["success"]]),
             "failed_images": len([r for r in results if not r["success"]]),
+            "duplicate_images": len([r for r in results if "duplicate_of" in r]),
+            "degradation": highest_policy.describe(),
             "results": results
         })
         
@@ -281,6 +860,7 @@ async def process_batch_ocr(
 
 @app.post("/api/ml/batch-mark")
 async def mark_batch_scripts(
+    request: Request,
     marking_data: str = Form(...)
 ):
     """
@@ -304,8 +884,15 @@ async def mark_batch_scripts(
         logger.info(f"Processing batch marking for {len(data)} questions")
         
         results = []
+        queue_depth = QUEUE_DEPTH.labels(queue='batch_mark')
+        queue_depth.inc(len(data))
         
+        highest_policy = _degradation_policy(request)
         for i, item in enumerate(data):
+            queue_depth.dec()
+            # Long batches re-check the load for every answer
+            policy = degradation.current() if i else highest_policy
+            highest_policy = max(highest_policy, policy, key=lambda p: p.level)
             try:
                 # Validate required fields
                 required_fields = ["question", "answer", "rubric", "max_score"]
@@ -314,12 +901,14 @@ async def mark_batch_scripts(
                         raise ValueError(f"Missing required field: {field}")
                 
                 # Process marking
-                marking_result = marking_service.mark_answer(
+                marking_result = await worker_pool.run(
+                    marking_service.mark_answer,
                     question=item["question"],
                     answer=item["answer"],
                     rubric=item["rubric"],
                     max_score=item["max_score"],
-                    subject=item.get("subject", "general")
+                    subject=item.get("subject", "general"),
+                    approaches=policy.marking_approaches
                 )
                 
                 results.append({
@@ -328,7 +917,8 @@ async def mark_batch_scripts(
                     "score": marking_result["score"],
                     "max_score": item["max_score"],
                     "feedback": marking_result["feedback"],
-                    "confidence": marking_result["confidence"]
+                    "confidence": marking_result["confidence"],
+                    "degradation": policy.describe()
                 })
                 
             except Exception as e:
@@ -339,11 +929,12 @@ async def mark_batch_scripts(
                     "error": str(e)
                 })
         
-        return JSONResponse(content={
+        return _json_response({
             "success": True,
             "total_questions": len(data),
             "processed_questions": len([r for r in results if r["success"]]),
             "failed_questions": len([r for r in results if not r["success"]]),
+            "degradation": highest_policy.describe(),
             "results": results
         })
         
@@ -351,6 +942,101 @@ async def mark_batch_scripts(
         logger.error(f"Batch marking failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Batch marking failed: {str(e)}")
 
+@app.post("/api/ml/batch-remark")
+async def remark_batch_scripts(
+    request: Request,
+    remark_data: str = Form(...),
+    old_rubric: Optional[str] = Form(None),
+    new_rubric: Optional[str] = Form(None)
+):
+    """
+    Re-mark a cohort of answers after a rubric edit
+    
+    Args:
+        remark_data: JSON array of {question, answer, max_score, subject?, old_rubric?, new_rubric?}
+        old_rubric: JSON string of the previous rubric, for items that do not carry their own
+        new_rubric: JSON string of the edited rubric, for items that do not carry their own
+    
+    Returns:
+        JSON with results for each answer, including what was recomputed
+    """
+    try:
+        try:
+            data = json.loads(remark_data)
+            if not isinstance(data, list):
+                raise ValueError("remark_data must be a JSON array")
+            default_old = json.loads(old_rubric) if old_rubric else None
+            default_new = json.loads(new_rubric) if new_rubric else None
+        except (json.JSONDecodeError, ValueError) as e:
+            raise HTTPException(status_code=400, detail=f"Invalid re-marking data format: {str(e)}")
+        
+        logger.info(f"Processing batch re-marking for {len(data)} answers")
+        
+        results = []
+        queue_depth = QUEUE_DEPTH.labels(queue='batch_remark')
+        queue_depth.inc(len(data))
+        
+        highest_policy = _degradation_policy(request)
+        for i, item in enumerate(data):
+            queue_depth.dec()
+            # Long batches re-check the load for every answer
+            policy = degradation.current() if i else highest_policy
+            highest_policy = max(highest_policy, policy, key=lambda p: p.level)
+            try:
+                for field in ["question", "answer", "max_score"]:
+                    if field not in item:
+                        raise ValueError(f"Missing required field: {field}")
+                item_old = item.get("old_rubric", default_old)
+                item_new = item.get("new_rubric", default_new)
+                if item_old is None or item_new is None:
+                    raise ValueError("Missing old_rubric or new_rubric")
+                
+                marking_result = await worker_pool.run(
+                    marking_service.remark_answer,
+                    question=item["question"],
+                    answer=item["answer"],
+                    old_rubric=item_old,
+                    new_rubric=item_new,
+                    max_score=item["max_score"],
+                    subject=item.get("subject", "general"),
+                    approaches=policy.marking_approaches
+                )
+                
+                results.append({
+                    "question_number": i + 1,
+                    "success": True,
+                    "score": marking_result["score"],
+                    "max_score": item["max_score"],
+                    "feedback": marking_result["feedback"],
+                    "confidence": marking_result["confidence"],
+                    "remark": marking_result.get("remark", {}),
+                    "degradation": policy.describe()
+                })
+                
+            except Exception as e:
+                logger.error(f"Failed to re-mark answer {i + 1}: {str(e)}")
+                results.append({
+                    "question_number": i + 1,
+                    "success": False,
+                    "error": str(e)
+                })
+        
+        return _json_response({
+            "success": True,
+            "total_questions": len(data),
+            "processed_questions": len([r for r in results if r["success"]]),
+            "failed_questions": len([r for r in results if not r["success"]]),
+            "reused_results": sum(len(r["remark"].get("reused", [])) for r in results if r.get("remark")),
+            "degradation": highest_policy.describe(),
+            "results": results
+        })
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch re-marking failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch re-marking failed: {str(e)}")
+
 if __name__ == "__main__":
     # Run the application
     uvicorn.run(
@@ -0,0 +1 @@
+# Benchmark suites for DeciGarde ML Service
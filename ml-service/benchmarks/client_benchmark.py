@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Integration Client Throughput Benchmark
+Sends the same OCR and marking workload through integration_client in four
+ways: a new client per call (the old quick_* behaviour), one pooled client
+called sequentially, map_ocr/map_mark with a bounded number of requests in
+flight, and the asyncio client. By default requests go to an in-process stub
+server with a fixed latency, so the numbers isolate client overhead. A second
+section compares upload size and server-side decode time of a large page sent
+as-is and after client-side downscaling (downscale_uploads).
+
+Usage (from ml-service/):
+    python -m benchmarks.client_benchmark --requests 200 --latency-ms 20
+    python -m benchmarks.client_benchmark --upload-image phone_photo.jpg --upload-quality 80
+    python -m benchmarks.client_benchmark --url http://localhost:8000 --image ../test_document.png
+"""
+
+import argparse
+import asyncio
+import logging
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from benchmarks.common import Stopwatch, environment_info, write_report
+from benchmarks.stub_server import StubServer
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_MARKING = {
+    "question": "What is photosynthesis?",
+    "answer": "Photosynthesis is the process by which plants make food using sunlight.",
+    "rubric": {"keywords": ["photosynthesis", "plants", "sunlight", "food"]},
+    "max_score": 10
+}
+
+def _summary(elapsed: float, results: List[Dict[str, Any]], server: Optional[StubServer]) -> Dict[str, Any]:
+    summary = {
+        "seconds": elapsed,
+        "requests": len(results),
+        "throughput_rps": len(results) / elapsed if elapsed else 0.0,
+        "failures": sum(1 for r in results if r.get("success") is False)
+    }
+    if server is not None:
+        summary["connections"] = server.stats["connections"]
+    return summary
+
+def _measure(name: str, call, server: Optional[StubServer]) -> Dict[str, Any]:
+    if server is not None:
+        server.reset_stats()
+    with Stopwatch() as timer:
+        results = call()
+    summary = _summary(timer.elapsed, results, server)
+    print(f"⚡ {name:28s} {summary['throughput_rps']:8.1f} req/s "
+          f"({summary['seconds']:.2f}s, {summary.get('connections', '-')} connections, {summary['failures']} failures)")
+    return summary
+
+def run(url: str, image_path: Path, requests_count: int, max_in_flight: int,
+        server: Optional[StubServer]) -> Dict[str, Any]:
+    """Run every client mode for OCR and marking"""
+    from integration_client import DeciGardeMLClient, AsyncDeciGardeMLClient, HTTPX_AVAILABLE
+
+    images = [image_path] * requests_count
+    marks = [SAMPLE_MARKING] * requests_count
+    results = {}
+
+    def client_per_call(operation, items):
+        def runner():
+            outputs = []
+            for item in items:
+                # Old quick_* behaviour: fresh session and health probe for every call
+                client = DeciGardeMLClient(url, check_health=True)
+                outputs.append(operation(client, item))
+                client.close()
+            return outputs
+        return runner
+
+    with DeciGardeMLClient(url, pool_size=max_in_flight) as client:
+        for workload, items, operation, mapped in (
+            ("ocr", images, lambda c, path: c.process_ocr(path), client.map_ocr),
+            ("mark", marks, lambda c, item: c.mark_answer(**item), client.map_mark),
+        ):
+            print(f"\n📊 {workload} x {requests_count}")
+            modes = {
+                "client_per_call": _measure("new client per call", client_per_call(operation, items), server),
+                "pooled_sequential": _measure("pooled, sequential",
+                                              lambda: [operation(client, item) for item in items], server),
+                "pooled_map": _measure(f"map_* ({max_in_flight} in flight)",
+                                       lambda: mapped(items, max_in_flight=max_in_flight), server),
+            }
+
+            if HTTPX_AVAILABLE:
+                async def run_async():
+                    async with AsyncDeciGardeMLClient(url, pool_size=max_in_flight) as async_client:
+                        mapper = async_client.map_ocr if workload == "ocr" else async_client.map_mark
+                        return await mapper(items, max_in_flight=max_in_flight)
+                modes["async_map"] = _measure(f"async map_* ({max_in_flight} in flight)",
+                                              lambda: asyncio.run(run_async()), server)
+
+            baseline = modes["client_per_call"]["throughput_rps"]
+            for summary in modes.values():
+                summary["speedup"] = summary["throughput_rps"] / baseline if baseline else 0.0
+            results[workload] = modes
+
+    return results
+
+def _time_decode(data: bytes, max_size, repeat: int = 5) -> float:
+    from services.image_decoder import decode_image
+
+    best = None
+    for _ in range(repeat):
+        with Stopwatch() as timer:
+            decode_image(data, max_width=max_size[0], max_height=max_size[1])
+        best = timer.elapsed if best is None else min(best, timer.elapsed)
+    return best
+
+def run_upload(url: str, image_path: Path, quality: int, server: Optional[StubServer]) -> Dict[str, Any]:
+    """Upload one large page with and without client-side downscaling"""
+    from integration_client import DeciGardeMLClient, DEFAULT_WORKING_RESOLUTION, encode_for_upload
+
+    original = image_path.read_bytes()
+    max_size = DEFAULT_WORKING_RESOLUTION["handwriting"]
+
+    with Stopwatch() as timer:
+        encoded = encode_for_upload(original, max_size, quality)
+    encoded_bytes = encoded[0] if encoded else original
+
+    results = {
+        "original_bytes": len(original),
+        "uploaded_bytes": len(encoded_bytes),
+        "encode_seconds": timer.elapsed,
+        "server_decode_seconds_original": _time_decode(original, max_size),
+        "server_decode_seconds_downscaled": _time_decode(encoded_bytes, max_size),
+        "quality": quality
+    }
+
+    for label, downscale in (("as_is", False), ("downscaled", True)):
+        with DeciGardeMLClient(url, downscale_uploads=downscale, upload_quality=quality) as client:
+            client.process_ocr(image_path)  # warm up (fetches capabilities when downscaling)
+            if server is not None:
+                server.reset_stats()
+            with Stopwatch() as timer:
+                client.process_ocr(image_path)
+            results[f"request_seconds_{label}"] = timer.elapsed
+            if server is not None:
+                results[f"request_bytes_{label}"] = server.stats["bytes_received"]
+
+    print(f"\n📦 upload {image_path.name}: {results['original_bytes'] / 1024:.0f} KB -> "
+          f"{results['uploaded_bytes'] / 1024:.0f} KB (encode {results['encode_seconds'] * 1000:.0f} ms, "
+          f"server decode {results['server_decode_seconds_original'] * 1000:.0f} -> "
+          f"{results['server_decode_seconds_downscaled'] * 1000:.0f} ms)")
+    return results
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="DeciGarde integration client benchmark")
+    parser.add_argument('--url', default=None, help='ML service URL (default: in-process stub server)')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='Stub server latency per request')
+    parser.add_argument('--requests', type=int, default=100, help='Requests per mode and workload')
+    parser.add_argument('--max-in-flight', type=int, default=10)
+    parser.add_argument('--image', default=None, help='Image uploaded for OCR (default: small generated PNG)')
+    parser.add_argument('--upload-image', default=None,
+                        help='Large page for the upload comparison (default: generated 4000x3000 photo)')
+    parser.add_argument('--upload-quality', type=int, default=85, help='JPEG quality for downscaled uploads')
+    parser.add_argument('--output', default='-', help='Report path (default: stdout)')
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.ERROR)
+
+    print("🧪 DeciGarde Client Benchmark")
+    print("=" * 60)
+
+    server = None
+    url = args.url
+    if url is None:
+        server = StubServer(latency=args.latency_ms / 1000.0).start()
+        url = server.url
+
+    with tempfile.TemporaryDirectory() as tmp:
+        image_path = Path(args.image) if args.image else Path(tmp) / "page.png"
+        if not args.image:
+            import cv2
+            import numpy as np
+            cv2.imwrite(str(image_path), np.full((200, 200), 255, np.uint8))
+
+        upload_path = Path(args.upload_image) if args.upload_image else Path(tmp) / "photo.jpg"
+        if not args.upload_image:
+            from benchmarks.ocr_benchmark import generate_corpus
+            upload_path.write_bytes(generate_corpus([(4000, 3000)], ["handwritten"], [0.2])[0]["data"])
+
+        try:
+            results = run(url, image_path, args.requests, args.max_in_flight, server)
+            results["upload"] = run_upload(url, upload_path, args.upload_quality, server)
+        finally:
+            if server is not None:
+                server.stop()
+
+    report = {
+        "suite": "client",
+        "environment": environment_info(),
+        "config": {
+            "url": args.url or "stub",
+            "latency_ms": args.latency_ms if args.url is None else None,
+            "requests": args.requests,
+            "max_in_flight": args.max_in_flight,
+            "upload_quality": args.upload_quality
+        },
+        "results": results
+    }
+
+    write_report(report, args.output)
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Shared helpers for the benchmark suites: latency summaries, memory
+measurement and JSON reports that can be diffed between releases
+"""
+
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+# ml-service/ and the repository root, so benchmarks run from any directory
+ML_SERVICE_DIR = Path(__file__).resolve().parent.parent
+REPO_ROOT = ML_SERVICE_DIR.parent
+
+for _path in (str(ML_SERVICE_DIR), str(REPO_ROOT)):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+REPORT_SCHEMA_VERSION = 1
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Linear-interpolated percentile of a list of values
+
+    Args:
+        values: Sample values
+        pct: Percentile between 0 and 100
+
+    Returns:
+        Percentile value, or 0.0 for an empty sample
+    """
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    if lower == upper:
+        return float(ordered[int(rank)])
+    return float(ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower))
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    """Summarize latencies (seconds) into the percentiles tracked between releases"""
+    if not latencies:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+
+    return {
+        "count": len(latencies),
+        "mean": sum(latencies) / len(latencies),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies)
+    }
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in megabytes, if measurable"""
+    if RESOURCE_AVAILABLE:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes on Linux
+        if sys.platform == 'darwin':
+            return peak / (1024 * 1024)
+        return peak / 1024
+    if PSUTIL_AVAILABLE:
+        memory = psutil.Process().memory_info()
+        return getattr(memory, 'peak_wset', memory.rss) / (1024 * 1024)
+    return None
+
+class Stopwatch:
+    """Context manager measuring wall-clock time with perf_counter"""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self.start
+        return False
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=REPO_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+def environment_info() -> Dict[str, Any]:
+    """Describe the machine and revision a report was produced on"""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+def write_report(report: Dict[str, Any], output: Optional[str]) -> None:
+    """
+    Write a benchmark report as stable, diff-friendly JSON
+
+    Args:
+        report: Report dictionary
+        output: Output path, or None/"-" to print to stdout
+    """
+    report.setdefault("schema_version", REPORT_SCHEMA_VERSION)
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if not output or output == '-':
+        print(text)
+        return
+
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        f.write(text + "\n")
+    print(f"📁 Report written to {output}")
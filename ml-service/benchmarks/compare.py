@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Compare two benchmark reports and print the change of every numeric metric
+
+Usage (from ml-service/):
+    python -m benchmarks.compare reports/ocr-1.0.json reports/ocr-1.1.json
+"""
+
+import argparse
+import json
+from typing import Dict, Any, Iterator, Tuple
+
+# Metadata that changes on every run and is not worth diffing
+IGNORED_KEYS = {"environment", "schema_version"}
+
+def flatten_metrics(report: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, float]]:
+    """Yield (dotted.path, value) for every numeric leaf of a report"""
+    for key, value in report.items():
+        if not prefix and key in IGNORED_KEYS:
+            continue
+        path = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            yield from flatten_metrics(value, path)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield path, float(value)
+
+def compare_reports(baseline: Dict[str, Any], candidate: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    Compute per-metric deltas between two reports
+
+    Args:
+        baseline: Report from the previous release
+        candidate: Report from the release under test
+
+    Returns:
+        Mapping of metric path to baseline, candidate, delta and relative change
+    """
+    base_metrics = dict(flatten_metrics(baseline))
+    new_metrics = dict(flatten_metrics(candidate))
+
+    changes = {}
+    for path in sorted(set(base_metrics) | set(new_metrics)):
+        old = base_metrics.get(path)
+        new = new_metrics.get(path)
+        change = {"baseline": old, "candidate": new}
+        if old is not None and new is not None:
+            change["delta"] = new - old
+            change["relative"] = (new - old) / old if old else None
+        changes[path] = change
+    return changes
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diff two DeciGarde benchmark reports")
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--filter', default='', help='Only show metrics whose path contains this text')
+    parser.add_argument('--threshold', type=float, default=0.0,
+                        help='Only show metrics whose relative change exceeds this fraction')
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    for path, change in compare_reports(baseline, candidate).items():
+        if args.filter and args.filter not in path:
+            continue
+        relative = change.get("relative")
+        if args.threshold and (relative is None or abs(relative) < args.threshold):
+            continue
+        old = "-" if change["baseline"] is None else f"{change['baseline']:.4f}"
+        new = "-" if change["candidate"] is None else f"{change['candidate']:.4f}"
+        rel = "" if relative is None else f" ({relative:+.1%})"
+        print(f"{path:60s} {old:>12s} -> {new:>12s}{rel}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Load Test
+Drives the in-process app with stepped concurrency and reports, per step,
+throughput, latency, errors and the degradation levels the service applied
+(from the X-DeciGarde-Degradation header). The same steps run once with load
+shedding enabled and once as a baseline with it disabled, each in a fresh
+process so model warm-up and the controller state do not carry over.
+
+Usage (from ml-service/):
+    python -m benchmarks.load_test --workload mark --steps 1,4,16,32 --output reports/load.json
+    python -m benchmarks.load_test --workload ocr --queue-depths 2,4,8 --latency-slo 2.0
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+from collections import Counter
+from typing import Dict, Any, List
+
+from benchmarks.common import Stopwatch, environment_info, latency_summary, write_report
+from benchmarks.thread_benchmark import build_requests
+
+logger = logging.getLogger(__name__)
+
+RESULT_PREFIX = "LOAD_TEST_RESULT "
+CONFIGS = ("degradation", "baseline")
+
+def config_env(config: str, args) -> Dict[str, str]:
+    """Environment for one run; the thresholds only matter when degradation is enabled"""
+    env = {var: value for var, value in os.environ.items() if var != 'ML_DEGRADATION_FORCE_LEVEL'}
+    env.update(ML_DEGRADATION="true" if config == "degradation" else "false")
+    if args.queue_depths is not None:
+        env["ML_DEGRADE_QUEUE_DEPTHS"] = args.queue_depths
+    if args.latency_slo is not None:
+        env["ML_LATENCY_SLO_SECONDS"] = str(args.latency_slo)
+    if args.cooldown is not None:
+        env["ML_DEGRADE_COOLDOWN_SECONDS"] = str(args.cooldown)
+    return env
+
+async def _step(client, payloads: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statuses, levels = [], [], Counter()
+
+    async def send(payload):
+        async with semaphore:
+            with Stopwatch() as timer:
+                response = await client.post(**payload)
+            latencies.append(timer.elapsed)
+            statuses.append(response.status_code)
+            levels[response.headers.get("x-decigarde-degradation", "none")] += 1
+
+    with Stopwatch() as total:
+        await asyncio.gather(*(send(p) for p in payloads))
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "seconds": total.elapsed,
+        "throughput_rps": len(latencies) / total.elapsed if total.elapsed else 0.0,
+        "latency": latency_summary(latencies),
+        "non_2xx": sum(1 for status in statuses if status >= 300),
+        "levels": dict(sorted(levels.items()))
+    }
+
+async def _drive(app, payloads: List[Dict[str, Any]], steps: List[int]) -> List[Dict[str, Any]]:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=600) as client:
+        # Warm the models outside the timed steps
+        await client.post(**payloads[0])
+        return [await _step(client, payloads, concurrency) for concurrency in steps]
+
+def run_child(args) -> Dict[str, Any]:
+    """Run every step in this process (the parent set the degradation environment)"""
+    logging.basicConfig(level=logging.WARNING)
+    import app
+
+    payloads = build_requests(args.workload, args.requests, args.seed)
+    steps = asyncio.run(_drive(app.app, payloads, [int(s) for s in args.steps.split(',') if s]))
+    return {"steps": steps, "degradation": app.degradation.report()}
+
+def run_config(config: str, args) -> Dict[str, Any]:
+    """Run one configuration in a fresh interpreter and collect its result"""
+    command = [sys.executable, "-m", "benchmarks.load_test", "--child",
+               "--workload", args.workload, "--requests", str(args.requests),
+               "--steps", args.steps, "--seed", str(args.seed)]
+    completed = subprocess.run(command, env=config_env(config, args), capture_output=True, text=True,
+                               timeout=args.timeout)
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    logger.error(f"{config} failed: {completed.stderr[-2000:]}")
+    return {"error": completed.stderr[-2000:] or f"exit code {completed.returncode}"}
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="DeciGarde load test")
+    parser.add_argument('--workload', choices=['ocr', 'mark'], default='mark')
+    parser.add_argument('--steps', default='1,4,16,32', help='Comma-separated requests in flight per step')
+    parser.add_argument('--requests', type=int, default=64, help='Requests per step')
+    parser.add_argument('--configs', default=','.join(CONFIGS), help="Comma-separated subset of 'degradation,baseline'")
+    parser.add_argument('--queue-depths', default=None, help='Override ML_DEGRADE_QUEUE_DEPTHS')
+    parser.add_argument('--latency-slo', type=float, default=None, help='Override ML_LATENCY_SLO_SECONDS')
+    parser.add_argument('--cooldown', type=float, default=None, help='Override ML_DEGRADE_COOLDOWN_SECONDS')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--timeout', type=int, default=1800, help='Seconds allowed per configuration')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--output', default='-', help='Report path (default: stdout)')
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.child:
+        print(RESULT_PREFIX + json.dumps(run_child(args)))
+        return
+
+    logging.basicConfig(level=logging.WARNING)
+    configs = [c for c in args.configs.split(',') if c]
+    for config in configs:
+        if config not in CONFIGS:
+            raise SystemExit(f"Unknown configuration '{config}' (expected one of {CONFIGS})")
+
+    print("🧪 DeciGarde Load Test")
+    print("=" * 60)
+    print(f"🔧 {args.workload} workload, steps {args.steps}, {args.requests} requests per step")
+
+    results = {}
+    for config in configs:
+        results[config] = run_config(config, args)
+        if "error" in results[config]:
+            print(f"❌ {config} failed")
+            continue
+        for step in results[config]["steps"]:
+            print(f"⚡ {config:11s} x{step['concurrency']:<3d} {step['throughput_rps']:7.2f} req/s, "
+                  f"p50 {step['latency']['p50']:.3f}s, p95 {step['latency']['p95']:.3f}s, "
+                  f"{step['non_2xx']} non-2xx, levels {step['levels']}")
+
+    report = {
+        "suite": "load",
+        "environment": environment_info(),
+        "config": {
+            "workload": args.workload,
+            "steps": args.steps,
+            "requests": args.requests,
+            "queue_depths": args.queue_depths,
+            "latency_slo": args.latency_slo,
+            "cooldown": args.cooldown
+        },
+        "results": results
+    }
+    write_report(report, args.output)
+    return report
+
+if __name__ == "__main__":
+    main()
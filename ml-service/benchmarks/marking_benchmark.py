@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Marking Throughput Benchmark and Golden-Score Regression Check
+Measures answers/sec for each MarkingService approach (keyword, semantic,
+content, llm via a local stub) and for the combined mark_answer call, and
+verifies that scores match the stored golden file
+
+Usage (from ml-service/):
+    python -m benchmarks.marking_benchmark --output reports/marking.json
+    python -m benchmarks.marking_benchmark --check-golden
+    python -m benchmarks.marking_benchmark --update-golden
+    EMBEDDING_MODEL_DIR=models/onnx-minilm python -m benchmarks.marking_benchmark \
+        --compare-embeddings sentence_transformers,onnx --tolerance 0.02
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Any, List, Callable
+
+from benchmarks.common import (
+    Stopwatch, environment_info, latency_summary, peak_rss_mb, write_report
+)
+from benchmarks.marking_corpus import build_corpus, StubLLMClient
+
+logger = logging.getLogger(__name__)
+
+GOLDEN_PATH = Path(__file__).resolve().parent / "golden" / "marking_scores.json"
+
+# Golden scores are recorded with the dependency-free semantic fallback and the
+# LLM stub so they do not change with installed models or API availability
+GOLDEN_SEMANTIC_BACKEND = "difflib"
+
+EMBEDDING_BACKENDS = ["sentence_transformers", "onnx"]
+
+def create_service(semantic: str = "auto", llm_latency: float = 0.0):
+    """
+    Create a MarkingService configured for benchmarking
+
+    Args:
+        semantic: "auto" for the configured embedding backend, an EMBEDDING_BACKENDS name,
+            or "difflib" to force the fallback
+        llm_latency: Simulated LLM round-trip time in seconds
+
+    Returns:
+        MarkingService instance with the LLM stub attached
+    """
+    from services.marking_service import MarkingService
+
+    if semantic in EMBEDDING_BACKENDS:
+        os.environ['EMBEDDING_BACKEND'] = semantic
+    service = MarkingService()
+    if semantic == "difflib":
+        service.embedding_backend = None
+    service.openai_client = StubLLMClient(latency=llm_latency)
+    return service
+
+def _approach_calls(service, case: Dict[str, Any]) -> Dict[str, Callable[[], Any]]:
+    """Build the per-approach callables for one case, on pre-normalized text"""
+    question = service._normalize_text(case["question"])
+    answer = service._normalize_text(case["answer"])
+    rubric, max_score, subject = case["rubric"], case["max_score"], case["subject"]
+
+    return {
+        "keyword": lambda: service._mark_by_keywords(answer, rubric, max_score),
+        "semantic": lambda: service._mark_by_semantic_similarity(question, answer, max_score),
+        "content": lambda: service._mark_by_content_analysis(answer, rubric, max_score, subject),
+        "llm": lambda: service._mark_by_llm(question, answer, rubric, max_score, subject),
+        "combined": lambda: service.mark_answer(
+            question=case["question"], answer=case["answer"], rubric=rubric,
+            max_score=max_score, subject=subject
+        )
+    }
+
+def run_throughput(service, corpus: List[Dict[str, Any]], approaches: List[str], repeat: int) -> Dict[str, Any]:
+    """Time each approach over the corpus and report answers/sec and latency"""
+    results = {}
+
+    for approach in approaches:
+        latencies = []
+        with Stopwatch() as total:
+            for _ in range(repeat):
+                for case in corpus:
+                    call = _approach_calls(service, case)[approach]
+                    with Stopwatch() as timer:
+                        call()
+                    latencies.append(timer.elapsed)
+
+        results[approach] = {
+            "answers": len(latencies),
+            "wall_time": total.elapsed,
+            "answers_per_sec": len(latencies) / total.elapsed if total.elapsed > 0 else 0.0,
+            "latency": latency_summary(latencies)
+        }
+        print(f"⚡ {approach:10s} {results[approach]['answers_per_sec']:10.1f} answers/s")
+
+    by_length = {}
+    for case in corpus:
+        by_length.setdefault(case["length"], []).append(case)
+    results["combined_by_length"] = {}
+    for length, cases in sorted(by_length.items()):
+        latencies = []
+        for case in cases:
+            with Stopwatch() as timer:
+                _approach_calls(service, case)["combined"]()
+            latencies.append(timer.elapsed)
+        results["combined_by_length"][length] = latency_summary(latencies)
+
+    return results
+
+def run_embedding_comparison(corpus: List[Dict[str, Any]], backends: List[str], repeat: int,
+                             tolerance: float) -> Dict[str, Any]:
+    """
+    Score the corpus with each embedding backend and compare to the first (the baseline)
+
+    Returns:
+        Per-backend throughput plus cosine-similarity and semantic-score drift versus the baseline
+    """
+    from services.embedding_backends import SentenceTransformerBackend, ONNXEmbeddingBackend
+
+    expected = {"sentence_transformers": SentenceTransformerBackend, "onnx": ONNXEmbeddingBackend}
+    results, similarities = {}, {}
+    for backend in backends:
+        service = create_service(semantic=backend)
+        # create_embedding_backend falls back to sentence-transformers when the ONNX model is missing
+        if not isinstance(service.embedding_backend, expected.get(backend, ())):
+            print(f"⚠️  {backend}: not available, skipped")
+            continue
+
+        print(f"🔧 {backend}: {service.embedding_backend.describe()}")
+        semantic = [_approach_calls(service, case)["semantic"]() for case in corpus]
+        similarities[backend] = semantic
+        results[backend] = {
+            "backend": service.embedding_backend.describe(),
+            "throughput": run_throughput(service, corpus, ["semantic", "combined"], repeat)
+        }
+
+    if results:
+        baseline_name = next(iter(results))
+        baseline = similarities[baseline_name]
+        for backend, semantic in similarities.items():
+            deltas = [abs(a["similarity"] - b["similarity"]) for a, b in zip(semantic, baseline)]
+            drift = {
+                "baseline": baseline_name,
+                "max_abs_delta": max(deltas, default=0.0),
+                "mean_abs_delta": sum(deltas) / max(len(deltas), 1),
+                "score_changes": sum(a["score"] != b["score"] for a, b in zip(semantic, baseline)),
+                "tolerance": tolerance
+            }
+            drift["within_tolerance"] = drift["max_abs_delta"] <= tolerance
+            drift["speedup"] = (results[backend]["throughput"]["semantic"]["answers_per_sec"] /
+                                results[baseline_name]["throughput"]["semantic"]["answers_per_sec"])
+            results[backend]["drift"] = drift
+            if backend != baseline_name:
+                status = "✅" if drift["within_tolerance"] else "❌"
+                print(f"{status} {backend} vs {baseline_name}: max |Δcos| {drift['max_abs_delta']:.4f}, "
+                      f"{drift['score_changes']} semantic score changes, {drift['speedup']:.2f}x answers/s")
+
+    return results
+
+def golden_record(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce a mark_answer result to the fields pinned by the golden file"""
+    return {
+        "score": result["score"],
+        "confidence": round(float(result["confidence"]), 6),
+        "approach_scores": result.get("approach_scores", {}),
+        "matched_keywords": result.get("matched_keywords", [])
+    }
+
+def compute_golden(corpus: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Mark the corpus with the deterministic golden configuration"""
+    service = create_service(semantic=GOLDEN_SEMANTIC_BACKEND)
+    scores = {}
+    for case in corpus:
+        result = service.mark_answer(
+            question=case["question"], answer=case["answer"], rubric=case["rubric"],
+            max_score=case["max_score"], subject=case["subject"]
+        )
+        scores[case["id"]] = golden_record(result)
+
+    return {
+        "semantic_backend": GOLDEN_SEMANTIC_BACKEND,
+        "llm": "StubLLMClient",
+        "cases": len(corpus),
+        "scores": scores
+    }
+
+def check_golden(corpus: List[Dict[str, Any]] = None, golden_path: Path = GOLDEN_PATH) -> List[str]:
+    """
+    Compare current marking output against the golden file
+
+    Returns:
+        List of human-readable mismatch descriptions (empty when scores are unchanged)
+    """
+    corpus = corpus if corpus is not None else build_corpus()
+    with open(golden_path) as f:
+        golden = json.load(f)
+
+    current = compute_golden(corpus)["scores"]
+    mismatches = []
+    for case_id, expected in golden["scores"].items():
+        actual = current.get(case_id)
+        if actual is None:
+            mismatches.append(f"{case_id}: missing from current corpus")
+        elif actual != expected:
+            mismatches.append(f"{case_id}: expected {expected}, got {actual}")
+    for case_id in sorted(set(current) - set(golden["scores"])):
+        mismatches.append(f"{case_id}: not in golden file (run --update-golden)")
+
+    return mismatches
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="DeciGarde marking throughput benchmark")
+    parser.add_argument('--approaches', default='keyword,semantic,content,llm,combined')
+    parser.add_argument('--answers-per-length', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=3, help='Passes over the corpus')
+    parser.add_argument('--semantic', choices=['auto', 'difflib'] + EMBEDDING_BACKENDS, default='auto',
+                        help='Embedding backend (auto = EMBEDDING_BACKEND) or force the difflib fallback')
+    parser.add_argument('--compare-embeddings', default=None,
+                        help='Comma-separated embedding backends compared to the first, e.g. sentence_transformers,onnx')
+    parser.add_argument('--tolerance', type=float, default=0.02,
+                        help='Largest cosine-similarity difference accepted by --compare-embeddings')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='Simulated LLM latency (s)')
+    parser.add_argument('--check-golden', action='store_true', help='Fail if scores differ from the golden file')
+    parser.add_argument('--update-golden', action='store_true', help='Rewrite the golden file')
+    parser.add_argument('--output', default='-', help='Report path (default: stdout)')
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.update_golden:
+        golden = compute_golden(build_corpus())
+        GOLDEN_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(GOLDEN_PATH, 'w') as f:
+            f.write(json.dumps(golden, indent=2, sort_keys=True) + "\n")
+        print(f"✅ Golden scores written for {golden['cases']} cases: {GOLDEN_PATH}")
+        return
+
+    if args.check_golden:
+        mismatches = check_golden()
+        if mismatches:
+            print(f"❌ {len(mismatches)} golden score mismatches:")
+            for mismatch in mismatches:
+                print(f"   {mismatch}")
+            sys.exit(1)
+        print("✅ Marking scores match the golden file")
+        return
+
+    print("🧪 DeciGarde Marking Benchmark")
+    print("=" * 60)
+
+    if args.compare_embeddings:
+        corpus = build_corpus(answers_per_length=args.answers_per_length)
+        backends = [b for b in args.compare_embeddings.split(',') if b]
+        report = {
+            "suite": "marking_embeddings",
+            "environment": environment_info(),
+            "config": {"backends": backends, "repeat": args.repeat, "tolerance": args.tolerance,
+                       "answers_per_length": args.answers_per_length},
+            "corpus": {"answers": len(corpus)},
+            "embeddings": run_embedding_comparison(corpus, backends, args.repeat, args.tolerance),
+            "peak_rss_mb": peak_rss_mb()
+        }
+        write_report(report, args.output)
+        if not all(r.get("drift", {}).get("within_tolerance", True) for r in report["embeddings"].values()):
+            sys.exit(1)
+        return report
+
+    service = create_service(semantic=args.semantic, llm_latency=args.llm_latency)
+    subjects = service.get_marking_capabilities()["supported_subjects"]
+    corpus = build_corpus(subjects, answers_per_length=args.answers_per_length)
+    approaches = [a for a in args.approaches.split(',') if a]
+    print(f"📄 Corpus: {len(corpus)} answers across {len(subjects)} subjects")
+
+    report = {
+        "suite": "marking",
+        "environment": environment_info(),
+        "config": {
+            "approaches": approaches,
+            "answers_per_length": args.answers_per_length,
+            "repeat": args.repeat,
+            "semantic_backend": (service.embedding_backend.describe() if service.embedding_backend
+                                 else "difflib"),
+            "llm_latency": args.llm_latency
+        },
+        "corpus": {"answers": len(corpus), "subjects": subjects},
+        "throughput": run_throughput(service, corpus, approaches, args.repeat),
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+    write_report(report, args.output)
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Deterministic marking corpus: questions, rubrics and answers of varying
+length for every subject MarkingService supports, plus a local stand-in for
+the OpenAI client so the LLM approach can be benchmarked offline
+"""
+
+import hashlib
+import random
+import re
+import time
+from types import SimpleNamespace
+from typing import Dict, Any, List
+
+# Subject templates: question, rubric keywords/key phrases and answer vocabulary
+SUBJECT_TEMPLATES = {
+    "mathematics": {
+        "question": "Solve the quadratic equation x^2 - 5x + 6 = 0 and explain each step.",
+        "keywords": ["factor", "roots", "quadratic", "equation", "solution"],
+        "key_phrases": ["x = 2", "x = 3"],
+        "sentences": [
+            "We factor the quadratic equation into (x - 2)(x - 3) = 0.",
+            "The roots are found by setting each factor to zero so x = 2 or x = 3.",
+            "Checking the solution: 2*2 - 5*2 + 6 = 0 holds.",
+            "The discriminant is 25 - 24 = 1 which is positive.",
+            "Using sqrt of the discriminant gives the same two roots.",
+            "Therefore the equation has two real solutions."
+        ]
+    },
+    "physics": {
+        "question": "A 2 kg mass accelerates at 3 m/s^2. Calculate the net force and explain Newton's second law.",
+        "keywords": ["force", "mass", "acceleration", "newton", "net"],
+        "key_phrases": ["F = ma", "6 N"],
+        "sentences": [
+            "Newton's second law states that the net force equals mass times acceleration, F = ma.",
+            "Here the mass is 2 kg and the acceleration is 3 m/s^2.",
+            "So the force is 2*3 = 6 N acting in the direction of motion.",
+            "The unit of force is the newton N which equals kg m/s^2.",
+            "A larger mass needs a larger force for the same acceleration.",
+            "Energy transferred would be measured in J if the mass moved."
+        ]
+    },
+    "chemistry": {
+        "question": "Describe what happens when sodium reacts with water.",
+        "keywords": ["sodium", "hydroxide", "hydrogen", "exothermic", "reaction"],
+        "key_phrases": ["sodium hydroxide", "hydrogen gas"],
+        "sentences": [
+            "Sodium reacts vigorously with water in an exothermic reaction.",
+            "The products are sodium hydroxide and hydrogen gas.",
+            "The balanced equation is 2Na + 2H2O = 2NaOH + H2.",
+            "The solution becomes alkaline because hydroxide ions form.",
+            "The temperature rises by about 20 °C during the reaction.",
+            "The sodium melts into a ball and moves around on the surface."
+        ]
+    },
+    "biology": {
+        "question": "Explain the concept of photosynthesis.",
+        "keywords": ["photosynthesis", "sunlight", "chlorophyll", "glucose", "oxygen", "carbon dioxide"],
+        "key_phrases": ["light energy", "chloroplasts"],
+        "sentences": [
+            "Photosynthesis is the process where plants use sunlight to make glucose.",
+            "It takes place in the chloroplasts which contain chlorophyll.",
+            "Carbon dioxide and water are converted into glucose and oxygen.",
+            "Light energy is transformed into chemical energy.",
+            "Oxygen is released as a by-product through the stomata.",
+            "The glucose is used for respiration and growth."
+        ]
+    },
+    "english": {
+        "question": "Discuss the use of imagery in a poem you have studied.",
+        "keywords": ["imagery", "metaphor", "simile", "poet", "reader"],
+        "key_phrases": ["vivid imagery", "the reader"],
+        "sentences": [
+            "The poet uses vivid imagery to make the scene come alive.",
+            "A striking metaphor compares the sea to a restless animal.",
+            "The simile makes the feeling of loss very clear to the reader.",
+            "Sound imagery is quite effective in the second stanza.",
+            "These images are extremely important to the overall mood.",
+            "Clearly the imagery shapes how the reader responds."
+        ]
+    },
+    "literature": {
+        "question": "How does the author develop the theme of ambition in the novel?",
+        "keywords": ["ambition", "character", "theme", "conflict", "author"],
+        "key_phrases": ["tragic flaw", "the protagonist"],
+        "sentences": [
+            "The author develops ambition through the protagonist's choices.",
+            "Ambition becomes a tragic flaw that leads to downfall.",
+            "Conflict between loyalty and desire drives the plot.",
+            "Other characters act as foils that highlight the theme.",
+            "The ending is rather bleak and clearly moralistic.",
+            "Symbols such as the crown reinforce the theme."
+        ]
+    },
+    "history": {
+        "question": "What were the main causes of the First World War?",
+        "keywords": ["alliances", "militarism", "imperialism", "nationalism", "assassination"],
+        "key_phrases": ["Franz Ferdinand", "alliance system"],
+        "sentences": [
+            "The main causes were militarism, alliances, imperialism and nationalism.",
+            "The alliance system divided Europe into two armed camps.",
+            "The assassination of Archduke Franz Ferdinand was the trigger.",
+            "Imperial rivalry over colonies increased tension.",
+            "Nationalism in the Balkans was extremely volatile.",
+            "The arms race made war somewhat more likely."
+        ]
+    },
+    "geography": {
+        "question": "Explain how rivers form meanders.",
+        "keywords": ["erosion", "deposition", "meander", "outer bank", "inner bank"],
+        "key_phrases": ["lateral erosion", "slip-off slope"],
+        "sentences": [
+            "Meanders form through lateral erosion on the outer bank.",
+            "Faster water on the outer bank causes erosion and a river cliff.",
+            "Slower water on the inner bank leads to deposition and a slip-off slope.",
+            "Over time the meander migrates across the floodplain.",
+            "Eventually the neck may be cut through forming an oxbow lake.",
+            "This process is clearly visible in lowland rivers."
+        ]
+    },
+    "general": {
+        "question": "Why is regular exercise important for health?",
+        "keywords": ["exercise", "heart", "health", "muscles", "stress"],
+        "key_phrases": ["mental health", "heart disease"],
+        "sentences": [
+            "Regular exercise strengthens the heart and muscles.",
+            "It reduces the risk of heart disease and obesity.",
+            "Exercise also improves mental health by reducing stress.",
+            "People who exercise often sleep better.",
+            "Even walking every day is very beneficial.",
+            "Health experts recommend thirty minutes a day."
+        ]
+    }
+}
+
+FILLER_SENTENCES = [
+    "I think this is an important topic.",
+    "This was covered in class last term.",
+    "There are many things to say about it.",
+    "In conclusion the answer depends on the situation."
+]
+
+ANSWER_LENGTHS = {
+    "blank": 0,
+    "short": 1,
+    "medium": 3,
+    "long": 6,
+    "very_long": 24
+}
+
+def build_corpus(subjects: List[str] = None, answers_per_length: int = 2, seed: int = 7) -> List[Dict[str, Any]]:
+    """
+    Build the marking corpus
+
+    Args:
+        subjects: Subjects to include (defaults to every template)
+        answers_per_length: Answers generated for each length bucket
+        seed: Random seed so the corpus is identical across runs
+
+    Returns:
+        List of marking cases with id, question, answer, rubric, max_score and subject
+    """
+    rng = random.Random(seed)
+    cases = []
+
+    for subject in subjects or list(SUBJECT_TEMPLATES):
+        template = SUBJECT_TEMPLATES.get(subject, SUBJECT_TEMPLATES["general"])
+        rubric = {
+            "keywords": template["keywords"],
+            "key_phrases": template["key_phrases"],
+            "criteria": f"Award marks for a correct and well explained answer about {subject}."
+        }
+
+        for length_name, sentence_count in ANSWER_LENGTHS.items():
+            for index in range(answers_per_length):
+                pool = template["sentences"] + FILLER_SENTENCES
+                sentences = [rng.choice(pool) for _ in range(sentence_count)]
+                cases.append({
+                    "id": f"{subject}-{length_name}-{index}",
+                    "subject": subject,
+                    "length": length_name,
+                    "question": template["question"],
+                    "answer": " ".join(sentences),
+                    "rubric": rubric,
+                    "max_score": rng.choice([5, 10, 20])
+                })
+
+    return cases
+
+class StubLLMClient:
+    """
+    Offline stand-in for openai.OpenAI used by MarkingService._mark_by_llm
+
+    Returns a pseudo-score derived from a hash of the prompt (stable for the
+    same prompt, unrelated to answer quality) and can simulate network
+    latency, so the LLM approach can be timed without API calls.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model: str, messages: List[Dict[str, str]], **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        prompt = messages[-1]["content"]
+        max_match = re.search(r'Maximum Score:\s*(\d+)', prompt)
+        max_score = int(max_match.group(1)) if max_match else 10
+
+        # Stable pseudo-score derived from the prompt content
+        digest = int(hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8], 16)
+        score = digest % (max_score + 1)
+
+        content = (
+            f"Score: {score}/{max_score}\n"
+            f"Feedback: The answer addresses the question with some relevant detail.\n"
+            f"Improvements: Add more explanation\n"
+            f"Strengths: Clear structure"
+        )
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
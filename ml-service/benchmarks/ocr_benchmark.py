@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+OCR Throughput and Latency Benchmark
+Generates synthetic printed/handwritten pages at several resolutions and
+noise levels, drives OCRService and ImagePreprocessor in-process and/or the
+running service over HTTP, and writes a JSON report that can be diffed
+between releases with benchmarks/compare.py
+
+Usage (from ml-service/):
+    python -m benchmarks.ocr_benchmark --mode inprocess --output reports/ocr.json
+    python -m benchmarks.ocr_benchmark --mode http --url http://localhost:8000
+    python -m benchmarks.ocr_benchmark --skew 0,3,-7 --deskew --output reports/ocr-deskew.json
+    ONNX_OCR_MODEL_DIR=models/onnx-ocr python -m benchmarks.ocr_benchmark --compare-engines paddleocr,onnxocr
+    python -m benchmarks.ocr_benchmark --compare-schedulers all,cascade --repeat 3
+"""
+
+import argparse
+import logging
+import os
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, Any, List
+
+from benchmarks.common import (
+    Stopwatch, environment_info, latency_summary, peak_rss_mb, write_report
+)
+from create_test_document import render_test_document, document_ground_truth, encode_document
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESOLUTIONS = "800x1100,1600x2200,2480x3508"
+DEFAULT_STYLES = "printed,handwritten"
+DEFAULT_NOISE = "0,0.05,0.2"
+
+def generate_corpus(resolutions: List[tuple], styles: List[str], noise_levels: List[float],
+                    skew_angles: List[float] = (0.0,), seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    Build the synthetic page corpus
+
+    Args:
+        resolutions: (width, height) pairs
+        styles: Page styles ("printed", "handwritten")
+        noise_levels: Degradation levels between 0 and 1
+        skew_angles: Page rotations in degrees
+        seed: Base random seed
+
+    Returns:
+        List of page dictionaries with JPEG bytes and ground-truth text
+    """
+    corpus = []
+    ground_truth = document_ground_truth()
+
+    for width, height in resolutions:
+        for style in styles:
+            for noise in noise_levels:
+                for skew in skew_angles:
+                    page_seed = seed + len(corpus)
+                    img = render_test_document(width, height, style=style, noise=noise,
+                                               skew_angle=skew, seed=page_seed)
+                    variant = f"{style}/{width}x{height}/noise{noise:.2f}"
+                    if skew:
+                        variant += f"/skew{skew:+.1f}"
+                    corpus.append({
+                        "id": f"page-{len(corpus):03d}",
+                        "variant": variant,
+                        "style": style,
+                        "width": width,
+                        "height": height,
+                        "noise": noise,
+                        "skew": skew,
+                        "data": encode_document(img),
+                        "ground_truth": ground_truth
+                    })
+
+    return corpus
+
+def text_accuracy(extracted: str, expected: str) -> float:
+    """Character-level similarity between extracted and expected text (0-1)"""
+    return SequenceMatcher(None, " ".join(extracted.split()), " ".join(expected.split())).ratio()
+
+def _summarize(samples: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """Aggregate per-page samples into the report section for one mode"""
+    engine_times = defaultdict(list)
+    for sample in samples:
+        for engine, seconds in sample.get("engine_times", {}).items():
+            engine_times[engine].append(seconds)
+
+    by_variant = defaultdict(list)
+    for sample in samples:
+        by_variant[sample["variant"]].append(sample)
+
+    summary = {
+        "pages": len(samples),
+        "wall_time": elapsed,
+        "pages_per_sec": len(samples) / elapsed if elapsed > 0 else 0.0,
+        "latency": latency_summary([s["latency"] for s in samples]),
+        "accuracy": sum(s["accuracy"] for s in samples) / max(len(samples), 1),
+        "failures": len([s for s in samples if not s["text"]]),
+        "engine_time": {
+            engine: {"calls": len(times), "total": sum(times), **latency_summary(times)}
+            for engine, times in sorted(engine_times.items())
+        },
+        "by_variant": {
+            variant: {
+                "latency": latency_summary([s["latency"] for s in variant_samples]),
+                "accuracy": sum(s["accuracy"] for s in variant_samples) / len(variant_samples)
+            }
+            for variant, variant_samples in sorted(by_variant.items())
+        }
+    }
+
+    stage_times = defaultdict(list)
+    for sample in samples:
+        for stage, seconds in sample.get("stages", {}).items():
+            stage_times[stage].append(seconds)
+    if stage_times:
+        summary["stages"] = {stage: latency_summary(times) for stage, times in sorted(stage_times.items())}
+
+    return summary
+
+def run_inprocess(corpus: List[Dict[str, Any]], language: str, repeat: int, warmup: int,
+                  preprocess: bool, deskew: bool = False, engines: List[str] = None,
+                  ocr_service=None, enhance_all: bool = False) -> Dict[str, Any]:
+    """
+    Drive OCRService and ImagePreprocessor directly in this process
+
+    Args:
+        engines: Restrict OCR to these engines (default: all loaded)
+        ocr_service: Reuse an already loaded OCRService (default: create one)
+        enhance_all: Treat every page as handwriting, so handwriting-only engines see printed pages too
+    """
+    from services.ocr_service import OCRService
+    from services.image_preprocessor import ImagePreprocessor
+
+    with Stopwatch() as init_timer:
+        ocr_service = ocr_service or OCRService()
+        preprocessor = ImagePreprocessor()
+
+    print(f"🔧 Engines: {engines or ocr_service.get_available_engines()} (init {init_timer.elapsed:.2f}s)")
+
+    for page in corpus[:warmup]:
+        ocr_service.extract_text(page["data"], language=language, engines=engines)
+
+    samples = []
+    with Stopwatch() as total:
+        for _ in range(repeat):
+            for page in corpus:
+                enhance = enhance_all or page["style"] == "handwritten"
+                stages = {}
+                straightened = False
+                deskew_info = None
+
+                with Stopwatch() as page_timer:
+                    image_data = page["data"]
+                    if deskew:
+                        with Stopwatch() as stage_timer:
+                            image_data, deskew_info = preprocessor.deskew(image_data)
+                        stages["deskew"] = stage_timer.elapsed
+                        straightened = deskew_info["straightened"]
+
+                    if preprocess:
+                        with Stopwatch() as stage_timer:
+                            image_data = preprocessor.preprocess(image_data, enhance_handwriting=enhance)
+                        stages["preprocess"] = stage_timer.elapsed
+
+                    with Stopwatch() as stage_timer:
+                        result = ocr_service.extract_text(image_data, language=language,
+                                                          enhance_handwriting=enhance, engines=engines,
+                                                          page_straightened=straightened)
+                    stages["ocr"] = stage_timer.elapsed
+
+                sample = {
+                    "variant": page["variant"],
+                    "latency": page_timer.elapsed,
+                    "text": result.get("text", ""),
+                    "accuracy": text_accuracy(result.get("text", ""), page["ground_truth"]),
+                    "engine_times": result.get("engine_times", {}),
+                    "stages": stages
+                }
+                if deskew_info is not None:
+                    # Pages are rendered rotated counter-clockwise by skew, so the correction is -skew
+                    sample["skew_error"] = abs(deskew_info["angle"] + page["skew"])
+                    sample["straightened"] = straightened
+                samples.append(sample)
+
+    summary = _summarize(samples, total.elapsed)
+    if deskew:
+        errors = [s["skew_error"] for s in samples]
+        summary["deskew"] = {
+            "mean_abs_error": sum(errors) / len(errors) if errors else 0.0,
+            "max_abs_error": max(errors, default=0.0),
+            "straightened_ratio": sum(s["straightened"] for s in samples) / max(len(samples), 1)
+        }
+    summary["paddle_angle_cls"] = ocr_service.paddle_angle_cls
+    summary["scheduler"] = {key: value for key, value in ocr_service.scheduler.report().items()
+                            if key != "recent_decisions"}
+    summary["engines"] = engines or ocr_service.get_available_engines()
+    summary["init_time"] = init_timer.elapsed
+    summary["peak_rss_mb"] = peak_rss_mb()
+    return summary
+
+def run_engine_comparison(corpus: List[Dict[str, Any]], engines: List[str], language: str, repeat: int,
+                          warmup: int, preprocess: bool) -> Dict[str, Any]:
+    """
+    Run the corpus through each engine alone and compare against the first (the baseline)
+
+    Every page is OCR'd with handwriting settings so PaddleOCR-family engines,
+    which only run on handwriting, see the whole corpus.
+
+    Returns:
+        Per-engine summaries plus accuracy delta and pages/sec speedup versus the baseline
+    """
+    from services.ocr_service import OCRService
+
+    # Load stock PaddleOCR next to its ONNX export so both can be measured in one process
+    os.environ['ONNX_OCR_REPLACES_PADDLE'] = 'false'
+    ocr_service = OCRService()
+    available = ocr_service.get_available_engines()
+
+    results = {}
+    for engine in engines:
+        if engine not in available:
+            print(f"⚠️  {engine}: not loaded, skipped")
+            continue
+        results[engine] = run_inprocess(corpus, language, repeat, warmup, preprocess, engines=[engine],
+                                        ocr_service=ocr_service, enhance_all=True)
+        if engine == 'onnxocr':
+            results[engine]["runtime"] = ocr_service.engines['onnxocr'].describe()
+        print(f"⚡ {engine}: {results[engine]['pages_per_sec']:.2f} pages/s, "
+              f"accuracy {results[engine]['accuracy']:.3f}")
+
+    comparison = {}
+    if results:
+        baseline_name = next(iter(results))
+        baseline = results[baseline_name]
+        for engine, summary in results.items():
+            comparison[engine] = {
+                "baseline": baseline_name,
+                "accuracy_delta": summary["accuracy"] - baseline["accuracy"],
+                "speedup": (summary["pages_per_sec"] / baseline["pages_per_sec"]
+                            if baseline["pages_per_sec"] else 0.0),
+                "latency_p50_delta": summary["latency"]["p50"] - baseline["latency"]["p50"]
+            }
+            if engine != baseline_name:
+                print(f"📊 {engine} vs {baseline_name}: accuracy {comparison[engine]['accuracy_delta']:+.3f}, "
+                      f"{comparison[engine]['speedup']:.2f}x pages/s")
+
+    return {"engines": results, "comparison": comparison}
+
+def run_scheduler_comparison(corpus: List[Dict[str, Any]], modes: List[str], language: str, repeat: int,
+                             warmup: int, preprocess: bool) -> Dict[str, Any]:
+    """
+    Run the corpus under each engine scheduler mode and compare against the first
+
+    The engines are loaded once and each mode starts with fresh statistics,
+    so a cascade pays for learning which engines to trust within the run.
+
+    Returns:
+        Per-mode summaries plus accuracy delta, speedup and engine calls per page versus the baseline
+    """
+    from services.engine_scheduler import EngineScheduler
+    from services.ocr_service import OCRService
+
+    ocr_service = OCRService()
+    results = {}
+    for mode in modes:
+        ocr_service.scheduler = EngineScheduler.from_env(mode=mode)
+        summary = run_inprocess(corpus, language, repeat, warmup, preprocess, ocr_service=ocr_service)
+        calls = sum(engine["calls"] for engine in summary["engine_time"].values())
+        summary["engine_calls_per_page"] = calls / max(summary["pages"], 1)
+        results[mode] = summary
+        print(f"⚡ {mode}: {summary['pages_per_sec']:.2f} pages/s, accuracy {summary['accuracy']:.3f}, "
+              f"{summary['engine_calls_per_page']:.2f} engine calls/page")
+
+    comparison = {}
+    if results:
+        baseline_name = next(iter(results))
+        baseline = results[baseline_name]
+        for mode, summary in results.items():
+            comparison[mode] = {
+                "baseline": baseline_name,
+                "accuracy_delta": summary["accuracy"] - baseline["accuracy"],
+                "speedup": (summary["pages_per_sec"] / baseline["pages_per_sec"]
+                            if baseline["pages_per_sec"] else 0.0),
+                "engine_calls_per_page_delta": summary["engine_calls_per_page"] - baseline["engine_calls_per_page"]
+            }
+
+    return {"modes": results, "comparison": comparison}
+
+def run_http(corpus: List[Dict[str, Any]], url: str, language: str, repeat: int, warmup: int,
+             timeout: int) -> Dict[str, Any]:
+    """Drive a running ML service through /api/ml/ocr"""
+    import requests
+
+    session = requests.Session()
+    endpoint = f"{url.rstrip('/')}/api/ml/ocr"
+
+    def post(page):
+        files = {'image': (f"{page['id']}.jpg", page["data"], 'image/jpeg')}
+        data = {
+            'language': language,
+            'enhance_handwriting': str(page["style"] == "handwritten").lower()
+        }
+        response = session.post(endpoint, files=files, data=data, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    for page in corpus[:warmup]:
+        post(page)
+
+    samples = []
+    with Stopwatch() as total:
+        for _ in range(repeat):
+            for page in corpus:
+                with Stopwatch() as page_timer:
+                    try:
+                        result = post(page)
+                    except Exception as e:
+                        logger.error(f"HTTP OCR failed for {page['id']}: {e}")
+                        result = {}
+                samples.append({
+                    "variant": page["variant"],
+                    "latency": page_timer.elapsed,
+                    "text": result.get("text", ""),
+                    "accuracy": text_accuracy(result.get("text", ""), page["ground_truth"]),
+                    "engine_times": result.get("engine_times", {}),
+                    "stages": {"server_processing": result.get("processing_time", 0.0)}
+                })
+
+    session.close()
+    summary = _summarize(samples, total.elapsed)
+    summary["url"] = url
+    summary["client_peak_rss_mb"] = peak_rss_mb()
+    return summary
+
+def _parse_resolutions(value: str) -> List[tuple]:
+    return [tuple(int(v) for v in item.lower().split('x')) for item in value.split(',') if item]
+
+def _parse_floats(value: str) -> List[float]:
+    return [float(v) for v in value.split(',') if v != '']
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="DeciGarde OCR throughput/latency benchmark")
+    parser.add_argument('--mode', choices=['inprocess', 'http', 'both'], default='inprocess')
+    parser.add_argument('--url', default='http://localhost:8000', help='ML service URL for HTTP mode')
+    parser.add_argument('--resolutions', default=DEFAULT_RESOLUTIONS, help='Comma-separated WxH list')
+    parser.add_argument('--styles', default=DEFAULT_STYLES, help='Comma-separated page styles')
+    parser.add_argument('--noise', default=DEFAULT_NOISE, help='Comma-separated noise levels (0-1)')
+    parser.add_argument('--skew', default='0', help='Comma-separated page rotations in degrees')
+    parser.add_argument('--language', default='eng')
+    parser.add_argument('--repeat', type=int, default=1, help='Passes over the corpus')
+    parser.add_argument('--warmup', type=int, default=1, help='Pages processed before timing')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--timeout', type=int, default=300)
+    parser.add_argument('--no-preprocess', action='store_true', help='Skip ImagePreprocessor in-process')
+    parser.add_argument('--deskew', action='store_true',
+                        help='Deskew pages before OCR in-process (straightened pages skip the angle classifier)')
+    parser.add_argument('--engines', default=None, help='Comma-separated engines to use in-process (default: all)')
+    parser.add_argument('--compare-engines', default=None,
+                        help='Comma-separated engines run one at a time and compared to the first, '
+                             'e.g. paddleocr,onnxocr')
+    parser.add_argument('--compare-schedulers', default=None,
+                        help='Comma-separated engine scheduler modes compared to the first, e.g. all,cascade')
+    parser.add_argument('--output', default='-', help='Report path (default: stdout)')
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    resolutions = _parse_resolutions(args.resolutions)
+    styles = [s for s in args.styles.split(',') if s]
+    noise_levels = _parse_floats(args.noise)
+    skew_angles = _parse_floats(args.skew)
+    engines = [e for e in args.engines.split(',') if e] if args.engines else None
+
+    print("🧪 DeciGarde OCR Benchmark")
+    print("=" * 60)
+
+    with Stopwatch() as corpus_timer:
+        corpus = generate_corpus(resolutions, styles, noise_levels, skew_angles, seed=args.seed)
+    print(f"📄 Generated {len(corpus)} pages in {corpus_timer.elapsed:.2f}s")
+
+    report = {
+        "suite": "ocr",
+        "environment": environment_info(),
+        "config": {
+            "resolutions": [f"{w}x{h}" for w, h in resolutions],
+            "styles": styles,
+            "noise_levels": noise_levels,
+            "skew_angles": skew_angles,
+            "language": args.language,
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+            "seed": args.seed,
+            "preprocess": not args.no_preprocess,
+            "deskew": args.deskew,
+            "engines": engines,
+            "compare_engines": args.compare_engines,
+            "compare_schedulers": args.compare_schedulers
+        },
+        "corpus": {
+            "pages": len(corpus),
+            "total_bytes": sum(len(p["data"]) for p in corpus)
+        }
+    }
+
+    if args.compare_engines:
+        report["engine_comparison"] = run_engine_comparison(
+            corpus, [e for e in args.compare_engines.split(',') if e], args.language, args.repeat,
+            args.warmup, preprocess=not args.no_preprocess
+        )
+    elif args.compare_schedulers:
+        report["scheduler_comparison"] = run_scheduler_comparison(
+            corpus, [m for m in args.compare_schedulers.split(',') if m], args.language, args.repeat,
+            args.warmup, preprocess=not args.no_preprocess
+        )
+    elif args.mode in ('inprocess', 'both'):
+        report["inprocess"] = run_inprocess(corpus, args.language, args.repeat, args.warmup,
+                                            preprocess=not args.no_preprocess, deskew=args.deskew,
+                                            engines=engines)
+        print(f"⚡ In-process: {report['inprocess']['pages_per_sec']:.2f} pages/s, "
+              f"p95 {report['inprocess']['latency']['p95']:.3f}s")
+
+    if args.mode in ('http', 'both'):
+        report["http"] = run_http(corpus, args.url, args.language, args.repeat, args.warmup, args.timeout)
+        print(f"🌐 HTTP: {report['http']['pages_per_sec']:.2f} pages/s, "
+              f"p95 {report['http']['latency']['p95']:.3f}s")
+
+    write_report(report, args.output)
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Image Quality Analysis Benchmark
+Times ImagePreprocessor.analyze_image_quality at its default reduced analysis
+resolution against the original full-decode analysis of the same pages (color
+decode, grayscale conversion, float64 Laplacian, blur threshold 100), and
+checks that the reduced analysis reaches the same decisions: brightness and
+contrast within tolerance, the same brightness, contrast and sharpness
+verdicts and quality level, and the same triage route as triage on an area
+resize of the full decode (the reference the triage thresholds were
+calibrated on). Exits with status 1 when any page drifts further than that.
+
+Usage (from ml-service/):
+    python -m benchmarks.quality_benchmark --output reports/quality.json
+    python -m benchmarks.quality_benchmark --resolutions 4000x3000 --repeat 10
+    python -m benchmarks.quality_benchmark --blur 0,2,6 --max-contrast-delta 4
+"""
+
+import argparse
+import io
+import logging
+import sys
+from typing import Dict, Any, List
+
+import cv2
+import numpy as np
+from PIL import Image, ImageFilter
+
+from benchmarks.common import Stopwatch, environment_info, latency_summary, peak_rss_mb, write_report
+from benchmarks.ocr_benchmark import generate_corpus, _parse_resolutions, _parse_floats
+from create_test_document import encode_document
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESOLUTIONS = "1280x960,2480x3508,4000x3000"
+# Extra Gaussian blur in pixels of a 1600 px wide page, scaled to each page's width
+DEFAULT_BLUR = "0,1.5,4"
+
+def blur_corpus(corpus: List[Dict[str, Any]], radii: List[float]) -> List[Dict[str, Any]]:
+    """Add a softened copy of every page for each non-zero blur radius"""
+    pages = []
+    for page in corpus:
+        for radius in radii:
+            if not radius:
+                pages.append(page)
+                continue
+            img = Image.open(io.BytesIO(page["data"])).filter(ImageFilter.GaussianBlur(radius * page["width"] / 1600))
+            pages.append(dict(page, id=f"{page['id']}-blur{radius:g}", variant=f"{page['variant']}/blur{radius:g}",
+                              data=encode_document(img)))
+    return pages
+
+def _time(func, data: bytes, repeat: int):
+    latencies = []
+    result = None
+    for _ in range(repeat):
+        with Stopwatch() as timer:
+            result = func(data)
+        latencies.append(timer.elapsed)
+    return result, latencies
+
+def baseline_quality(preprocessor, data: bytes) -> Dict[str, Any]:
+    """Statistics and verdicts of the original full-resolution analysis"""
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    height, width = gray.shape[:2]
+    brightness = float(np.mean(gray))
+    contrast = float(np.std(gray))
+    sharpness = float(cv2.Laplacian(gray, cv2.CV_64F).var())
+    assessment = preprocessor.assess_quality(width, height, brightness, contrast, sharpness,
+                                             preprocessor.quality_min_sharpness)
+    return dict(assessment, brightness=brightness, contrast=contrast, sharpness=sharpness)
+
+def _reference_triage_route(preprocessor, data: bytes) -> str:
+    """Triage route from a full decode area-resized to the triage size"""
+    gray = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_GRAYSCALE)
+    small = preprocessor._resize_image(gray, preprocessor.triage_max_dimension, preprocessor.triage_max_dimension)
+    return preprocessor._choose_route(preprocessor._triage_metrics(small))[0]
+
+VERDICTS = {
+    "brightness": lambda result: result["brightness"]["assessment"],
+    "contrast": lambda result: result["contrast"]["assessment"],
+    "sharpness": lambda result: result["sharpness"]["assessment"],
+    "quality_level": lambda result: result["quality_level"]
+}
+
+def run(corpus: List[Dict[str, Any]], repeat: int, max_brightness_delta: float,
+        max_contrast_delta: float) -> Dict[str, Any]:
+    """Analyze each page with the baseline full decode and at default resolution and compare"""
+    from services.image_preprocessor import ImagePreprocessor
+
+    preprocessor = ImagePreprocessor()
+    pages = []
+
+    for page in corpus:
+        baseline, baseline_latencies = _time(lambda data: baseline_quality(preprocessor, data), page["data"], repeat)
+        reduced, reduced_latencies = _time(preprocessor.analyze_image_quality, page["data"], repeat)
+        baseline_time = latency_summary(baseline_latencies)
+        reduced_time = latency_summary(reduced_latencies)
+        baseline_verdicts = {
+            "brightness": baseline["brightness_assessment"],
+            "contrast": baseline["contrast_assessment"],
+            "sharpness": baseline["sharpness_assessment"],
+            "quality_level": baseline["quality_level"]
+        }
+        verdicts = {name: verdict(reduced) for name, verdict in VERDICTS.items()}
+
+        result = {
+            "id": page["id"],
+            "variant": page["variant"],
+            "baseline": baseline_time,
+            "reduced_resolution": reduced_time,
+            "speedup": baseline_time["p50"] / reduced_time["p50"] if reduced_time["p50"] else 0.0,
+            "analysis_resolution": reduced["analysis_resolution"],
+            "brightness_delta": abs(baseline["brightness"] - reduced["brightness"]["mean"]),
+            "contrast_delta": abs(baseline["contrast"] - reduced["contrast"]["value"]),
+            "sharpness_baseline": baseline["sharpness"],
+            "sharpness_reduced": reduced["sharpness"]["analysis_laplacian_variance"],
+            "sharpness_threshold_reduced": reduced["sharpness"]["threshold"],
+            "baseline_verdicts": baseline_verdicts,
+            "verdicts": verdicts,
+            "triage_route": preprocessor.triage(page["data"])["route"],
+            "reference_triage_route": _reference_triage_route(preprocessor, page["data"])
+        }
+        for name in VERDICTS:
+            result[f"same_{name}"] = verdicts[name] == baseline_verdicts[name]
+        result["same_triage_route"] = result["triage_route"] == result["reference_triage_route"]
+
+        failures = []
+        if result["brightness_delta"] > max_brightness_delta:
+            failures.append(f"brightness delta {result['brightness_delta']:.2f}")
+        if result["contrast_delta"] > max_contrast_delta:
+            failures.append(f"contrast delta {result['contrast_delta']:.2f}")
+        for name in VERDICTS:
+            if not result[f"same_{name}"]:
+                failures.append(f"{name} {baseline_verdicts[name]} -> {verdicts[name]}")
+        if not result["same_triage_route"]:
+            failures.append(f"triage route {result['reference_triage_route']} -> {result['triage_route']}")
+        result["failures"] = failures
+        pages.append(result)
+
+        status = "✅" if not failures else "❌"
+        print(f"{status} {page['variant']:48s} {result['speedup']:6.1f}x "
+              f"(Δbrightness {result['brightness_delta']:.2f}, Δcontrast {result['contrast_delta']:.2f}, "
+              f"sharpness {result['sharpness_baseline']:.0f}/100 -> {result['sharpness_reduced']:.0f}"
+              f"/{result['sharpness_threshold_reduced']:.0f}, route {result['triage_route']})"
+              + (f" {'; '.join(failures)}" if failures else ""))
+
+    def agreement(key):
+        return sum(p[key] for p in pages) / len(pages) if pages else 0.0
+
+    return {
+        "pages": pages,
+        "max_brightness_delta": max((p["brightness_delta"] for p in pages), default=0.0),
+        "max_contrast_delta": max((p["contrast_delta"] for p in pages), default=0.0),
+        **{f"{name}_agreement": agreement(f"same_{name}") for name in VERDICTS},
+        "triage_route_agreement": agreement("same_triage_route"),
+        "failed_pages": sum(1 for p in pages if p["failures"])
+    }
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="DeciGarde image quality analysis benchmark")
+    parser.add_argument('--resolutions', default=DEFAULT_RESOLUTIONS, help='Comma-separated WxH list')
+    parser.add_argument('--styles', default='printed,handwritten', help='Comma-separated page styles')
+    parser.add_argument('--noise', default='0,0.2', help='Comma-separated noise levels (0-1)')
+    parser.add_argument('--blur', default=DEFAULT_BLUR,
+                        help='Comma-separated extra blur radii (pixels at 1600 px page width)')
+    parser.add_argument('--repeat', type=int, default=5, help='Analyses per page and mode')
+    parser.add_argument('--max-brightness-delta', type=float, default=1.0,
+                        help='Largest allowed baseline-vs-reduced brightness difference (gray levels)')
+    parser.add_argument('--max-contrast-delta', type=float, default=6.0,
+                        help='Largest allowed baseline-vs-reduced contrast difference (gray levels)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='-', help='Report path (default: stdout)')
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    print("🧪 DeciGarde Quality Analysis Benchmark")
+    print("=" * 60)
+
+    resolutions = _parse_resolutions(args.resolutions)
+    styles = [s for s in args.styles.split(',') if s]
+    noise_levels = _parse_floats(args.noise)
+    blur_radii = _parse_floats(args.blur)
+    corpus = blur_corpus(generate_corpus(resolutions, styles, noise_levels, seed=args.seed), blur_radii)
+
+    report = {
+        "suite": "quality",
+        "environment": environment_info(),
+        "config": {
+            "resolutions": [f"{w}x{h}" for w, h in resolutions],
+            "styles": styles,
+            "noise_levels": noise_levels,
+            "blur_radii": blur_radii,
+            "repeat": args.repeat,
+            "max_brightness_delta": args.max_brightness_delta,
+            "max_contrast_delta": args.max_contrast_delta
+        },
+        "results": run(corpus, args.repeat, args.max_brightness_delta, args.max_contrast_delta),
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+    write_report(report, args.output)
+    if report["results"]["failed_pages"]:
+        print(f"❌ {report['results']['failed_pages']} of {len(corpus)} pages drift beyond tolerance")
+        sys.exit(1)
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Stand-in ML service for client benchmarks
+Answers the /health, /api/ml/* endpoints used by integration_client with
+canned JSON after a configurable delay, so client-side throughput can be
+measured without OCR engines or models. HTTP/1.1 keep-alive is supported,
+so connection reuse shows up in the numbers. Faults (error statuses, dropped
+connections) can be queued to exercise client retries and circuit breaking.
+
+Usage (from ml-service/):
+    python -m benchmarks.stub_server --port 8010 --latency-ms 20
+"""
+
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional
+
+CANNED_RESPONSES = {
+    "/health": {"status": "healthy", "services": {"ocr": True, "marking": True}},
+    "/api/ml/capabilities": {
+        "ocr": {"engines": ["stub"]},
+        "marking": {"methods": ["stub"]},
+        "image_preprocessing": {"working_resolution": {"handwriting": {"width": 2000, "height": 3000},
+                                                       "printed": {"width": 3000, "height": 4000}}}
+    },
+    "/api/ml/ocr": {"success": True, "text": "stub text", "confidence": 0.9, "provider": "stub"},
+    "/api/ml/ocr/raw": {"success": True, "text": "stub text", "confidence": 0.9, "provider": "stub"},
+    "/api/ml/batch-ocr": {"success": True, "results": [], "total_images": 0},
+    "/api/ml/mark": {"success": True, "score": 7, "max_score": 10, "confidence": 0.8},
+    "/api/ml/batch-mark": {"success": True, "results": []},
+    "/api/ml/analyze-quality": {"quality_level": "good", "quality_score": 80},
+}
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; avoid the Nagle/delayed-ACK stall
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+
+        server = self.server
+        with server.stats_lock:
+            server.stats["requests"] += 1
+            server.stats["bytes_received"] += length
+            fault = server.faults.popleft() if server.faults else None
+        if server.latency:
+            time.sleep(server.latency)
+
+        if fault and fault["status"] is None:
+            # Dropped connection: close without answering
+            self.close_connection = True
+            return
+
+        body = CANNED_RESPONSES.get(self.path.split('?')[0])
+        status = 200 if body is not None else 404
+        if fault:
+            status, body = fault["status"], {"detail": "Injected fault"}
+        payload = json.dumps(body if body is not None else {"detail": "Not Found"}).encode()
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if fault and fault["retry_after"] is not None:
+            self.send_header('Retry-After', str(fault["retry_after"]))
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = _respond
+    do_POST = _respond
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded stub server counting requests and connections, with injectable faults"""
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0), latency: float = 0.0):
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.stats: Dict[str, Any] = {"requests": 0, "connections": 0, "bytes_received": 0}
+        self.stats_lock = threading.Lock()
+        self.faults = deque()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def process_request(self, request, client_address):
+        with self.stats_lock:
+            self.stats["connections"] += 1
+        super().process_request(request, client_address)
+
+    def inject_faults(self, count: int = 1, status: int = 500, retry_after: Optional[float] = None):
+        """Answer the next ``count`` requests with an error status"""
+        with self.stats_lock:
+            self.faults.extend({"status": status, "retry_after": retry_after} for _ in range(count))
+
+    def inject_drops(self, count: int = 1):
+        """Close the connection on the next ``count`` requests without answering"""
+        with self.stats_lock:
+            self.faults.extend({"status": None, "retry_after": None} for _ in range(count))
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.stats = {"requests": 0, "connections": 0, "bytes_received": 0}
+
+    def start(self) -> "StubServer":
+        """Serve from a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DeciGarde stub ML service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8010)
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='Delay added to every response')
+    parser.add_argument('--fail-first', type=int, default=0, help='Answer the first N requests with HTTP 503')
+    args = parser.parse_args(argv)
+
+    server = StubServer((args.host, args.port), latency=args.latency_ms / 1000.0)
+    server.inject_faults(args.fail_first, status=503)
+    print(f"🚀 Stub ML service on {server.url} ({args.latency_ms:.0f} ms per request)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Thread Allocation Benchmark
+Runs the same concurrent OCR or marking workload against the in-process app
+under several thread budgets (request workers x threads per library) and an
+unmanaged run where every library sizes its own pools, and reports throughput
+and latency for each. Every allocation runs in a fresh process because
+library thread pools are sized when the libraries load.
+
+Usage (from ml-service/):
+    python -m benchmarks.thread_benchmark --workload ocr --output reports/threads.json
+    python -m benchmarks.thread_benchmark --workload mark --allocations 1x8,2x4,4x2,8x1,unmanaged
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+from typing import Dict, Any, List
+
+from benchmarks.common import Stopwatch, environment_info, latency_summary, write_report
+
+logger = logging.getLogger(__name__)
+
+UNMANAGED = "unmanaged"
+RESULT_PREFIX = "THREAD_BENCHMARK_RESULT "
+
+def default_allocations(cpus: int) -> List[str]:
+    """Worker counts from 1 to the CPU count, each using the remaining CPUs per library"""
+    workers = sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)))
+    return [f"{w}x{max(1, cpus // w)}" for w in workers] + [UNMANAGED]
+
+def allocation_env(allocation: str, cpus: int) -> Dict[str, str]:
+    """Environment for one allocation; unmanaged keeps library defaults with one worker per CPU"""
+    env = {var: value for var, value in os.environ.items()
+           if var not in ('ML_CPU_BUDGET', 'ML_WORKER_THREADS', 'ML_LIBRARY_THREADS', 'ML_THREAD_BUDGET')}
+    if allocation == UNMANAGED:
+        env.update(ML_THREAD_BUDGET="false", ML_WORKER_THREADS=str(cpus))
+    else:
+        workers, threads = allocation.lower().split('x')
+        env.update(ML_THREAD_BUDGET="true", ML_CPU_BUDGET=str(cpus), ML_WORKER_THREADS=workers,
+                   ML_LIBRARY_THREADS=threads)
+    return env
+
+def build_requests(workload: str, count: int, seed: int) -> List[Dict[str, Any]]:
+    """Request payloads for httpx: raw-body OCR pages or marking forms"""
+    if workload == "ocr":
+        from benchmarks.ocr_benchmark import generate_corpus
+        corpus = generate_corpus([(1600, 2200)], ["handwritten", "printed"], [0.05], seed=seed)
+        return [{
+            "url": "/api/ml/ocr/raw",
+            "content": corpus[i % len(corpus)]["data"],
+            "params": {"enhance_handwriting": str(corpus[i % len(corpus)]["style"] == "handwritten").lower()},
+            "headers": {"Content-Type": "image/jpeg"}
+        } for i in range(count)]
+
+    from benchmarks.marking_corpus import build_corpus
+    # Empty answers are rejected as missing form fields, so they would only measure validation
+    corpus = [case for case in build_corpus(seed=seed) if case["answer"].strip()]
+    return [{
+        "url": "/api/ml/mark",
+        "data": {
+            "question": case["question"], "answer": case["answer"], "rubric": json.dumps(case["rubric"]),
+            "max_score": str(case["max_score"]), "subject": case["subject"]
+        }
+    } for case in (corpus[i % len(corpus)] for i in range(count))]
+
+async def _drive(app, payloads: List[Dict[str, Any]], concurrency: int) -> Dict[str, Any]:
+    import httpx
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], []
+
+    async def send(client, payload):
+        async with semaphore:
+            with Stopwatch() as timer:
+                response = await client.post(**payload)
+            latencies.append(timer.elapsed)
+            statuses.append(response.status_code)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=600) as client:
+        # One request per worker first, so model warm-up is not timed
+        await asyncio.gather(*(send(client, p) for p in payloads[:concurrency]))
+        latencies.clear()
+        statuses.clear()
+        with Stopwatch() as total:
+            await asyncio.gather(*(send(client, p) for p in payloads))
+
+    return {
+        "requests": len(latencies),
+        "seconds": total.elapsed,
+        "throughput_rps": len(latencies) / total.elapsed if total.elapsed else 0.0,
+        "latency": latency_summary(latencies),
+        "non_2xx": sum(1 for status in statuses if status >= 300)
+    }
+
+def run_child(args) -> Dict[str, Any]:
+    """Measure one allocation in this process (the parent set the budget environment)"""
+    logging.basicConfig(level=logging.WARNING)
+    import app
+
+    payloads = build_requests(args.workload, args.requests, args.seed)
+    result = asyncio.run(_drive(app.app, payloads, args.concurrency))
+    result["runtime"] = app.thread_budget.effective_settings()
+    return result
+
+def run_allocation(allocation: str, args, cpus: int) -> Dict[str, Any]:
+    """Run one allocation in a fresh interpreter and collect its result"""
+    command = [sys.executable, "-m", "benchmarks.thread_benchmark", "--child",
+               "--workload", args.workload, "--requests", str(args.requests),
+               "--concurrency", str(args.concurrency), "--seed", str(args.seed)]
+    completed = subprocess.run(command, env=allocation_env(allocation, cpus), capture_output=True, text=True,
+                               timeout=args.timeout)
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    logger.error(f"{allocation} failed: {completed.stderr[-2000:]}")
+    return {"error": completed.stderr[-2000:] or f"exit code {completed.returncode}"}
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="DeciGarde thread allocation benchmark")
+    parser.add_argument('--workload', choices=['ocr', 'mark'], default='ocr')
+    parser.add_argument('--allocations', default=None,
+                        help="Comma-separated WORKERSxTHREADS list plus 'unmanaged' (default: derived from CPUs)")
+    parser.add_argument('--cpus', type=int, default=0, help='CPUs to budget (default: available CPUs)')
+    parser.add_argument('--requests', type=int, default=48, help='Timed requests per allocation')
+    parser.add_argument('--concurrency', type=int, default=0, help='Requests in flight (default: 2x CPUs)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--timeout', type=int, default=1800, help='Seconds allowed per allocation')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--output', default='-', help='Report path (default: stdout)')
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.child:
+        print(RESULT_PREFIX + json.dumps(run_child(args)))
+        return
+
+    from services.runtime_config import available_cpus
+
+    logging.basicConfig(level=logging.WARNING)
+    cpus = args.cpus or available_cpus()
+    args.concurrency = args.concurrency or 2 * cpus
+    allocations = [a for a in args.allocations.split(',') if a] if args.allocations else default_allocations(cpus)
+
+    print("🧪 DeciGarde Thread Allocation Benchmark")
+    print("=" * 60)
+    print(f"🔧 {cpus} CPUs, {args.workload} workload, {args.concurrency} requests in flight")
+
+    results = {}
+    for allocation in allocations:
+        results[allocation] = run_allocation(allocation, args, cpus)
+        if "error" in results[allocation]:
+            print(f"❌ {allocation:10s} failed")
+            continue
+        summary = results[allocation]
+        print(f"⚡ {allocation:10s} {summary['throughput_rps']:7.2f} req/s, p50 {summary['latency']['p50']:.3f}s, "
+              f"p95 {summary['latency']['p95']:.3f}s ({summary['non_2xx']} non-2xx)")
+
+    report = {
+        "suite": "threads",
+        "environment": environment_info(),
+        "config": {
+            "workload": args.workload,
+            "cpus": cpus,
+            "allocations": allocations,
+            "requests": args.requests,
+            "concurrency": args.concurrency
+        },
+        "results": results
+    }
+    write_report(report, args.output)
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+OCR Transport Benchmark
+Sends the same pages to /api/ml/ocr (multipart form, JSON response) and to
+/api/ml/ocr/raw (raw body, JSON or MessagePack response) and reports request
+latency, the part of it not spent in OCR, and request/response sizes. A
+serialization micro-benchmark compares JSON and MessagePack on a typical OCR
+response. Runs the app in-process by default; --url targets a live service.
+
+Usage (from ml-service/):
+    python -m benchmarks.transport_benchmark --output reports/transport.json
+    python -m benchmarks.transport_benchmark --url http://localhost:8000 --resolutions 4000x3000
+"""
+
+import argparse
+import json
+import logging
+from typing import Dict, Any, List
+
+from benchmarks.common import Stopwatch, environment_info, latency_summary, write_report
+from benchmarks.ocr_benchmark import generate_corpus, _parse_resolutions
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESOLUTIONS = "1280x960,2480x3508,4000x3000"
+
+MODES = {
+    "multipart_json": {"path": "/api/ml/ocr", "raw": False, "accept": "application/json"},
+    "raw_json": {"path": "/api/ml/ocr/raw", "raw": True, "accept": "application/json"},
+    "raw_msgpack": {"path": "/api/ml/ocr/raw", "raw": True, "accept": "application/msgpack"},
+}
+
+# Quality gate and deskew off, so the modes differ only in transport
+OCR_OPTIONS = {"auto_route": "false", "deskew": "false"}
+
+def _decode(response) -> Dict[str, Any]:
+    if response.headers.get('content-type', '').startswith('application/msgpack'):
+        return msgpack.unpackb(response.content, raw=False)
+    return response.json()
+
+def _send(client, mode: Dict[str, Any], data: bytes, language: str):
+    options = dict(OCR_OPTIONS, language=language)
+    if mode["raw"]:
+        return client.post(mode["path"], content=data, params=dict(options, filename="page.jpg"),
+                           headers={"Content-Type": "image/jpeg", "Accept": mode["accept"]})
+    return client.post(mode["path"], files={"image": ("page.jpg", data, "image/jpeg")},
+                       data=options, headers={"Accept": mode["accept"]})
+
+def run_transport(client, corpus: List[Dict[str, Any]], repeat: int, language: str = "eng") -> Dict[str, Any]:
+    """Time every page through every transport mode"""
+    results = {}
+    for name, mode in MODES.items():
+        if mode["accept"] == "application/msgpack" and not MSGPACK_AVAILABLE:
+            print(f"⚠️  {name}: skipped (msgpack not installed)")
+            continue
+
+        pages = []
+        for page in corpus:
+            latencies, overheads = [], []
+            response = None
+            for _ in range(repeat):
+                with Stopwatch() as timer:
+                    response = _send(client, mode, page["data"], language)
+                    body = _decode(response)
+                latencies.append(timer.elapsed)
+                overheads.append(max(0.0, timer.elapsed - float(body.get("processing_time", 0) or 0)))
+
+            pages.append({
+                "variant": page["variant"],
+                "status": response.status_code,
+                "request_bytes": len(page["data"]),
+                "response_bytes": len(response.content),
+                "content_type": response.headers.get('content-type'),
+                "latency": latency_summary(latencies),
+                "non_ocr_time": latency_summary(overheads)
+            })
+            print(f"⚡ {name:15s} {page['variant']:35s} p50 {pages[-1]['latency']['p50'] * 1000:7.1f} ms "
+                  f"(non-OCR {pages[-1]['non_ocr_time']['p50'] * 1000:6.1f} ms, response {pages[-1]['response_bytes']} B)")
+        results[name] = pages
+    return results
+
+def run_serialization(repeat: int = 2000) -> Dict[str, Any]:
+    """Encode/decode a representative OCR response with JSON and MessagePack"""
+    sample = {
+        "success": True,
+        "text": "Photosynthesis is the process by which green plants use sunlight to make food. " * 20,
+        "confidence": 0.9132,
+        "provider": "paddleocr",
+        "processing_time": 1.284,
+        "engine_times": {"paddleocr": 1.21, "tesseract": 0.64},
+        "language": "eng",
+        "route": "full",
+        "quality": {"route_taken": "full", "sharpness": 412.5, "contrast": 61.2, "reason": "handwriting"}
+    }
+
+    codecs = {"json": (lambda obj: json.dumps(obj, separators=(',', ':')).encode(), json.loads)}
+    if MSGPACK_AVAILABLE:
+        codecs["msgpack"] = (lambda obj: msgpack.packb(obj, use_bin_type=True),
+                             lambda data: msgpack.unpackb(data, raw=False))
+
+    results = {}
+    for name, (encode, decode) in codecs.items():
+        with Stopwatch() as encode_timer:
+            for _ in range(repeat):
+                encoded = encode(sample)
+        with Stopwatch() as decode_timer:
+            for _ in range(repeat):
+                decode(encoded)
+        results[name] = {
+            "bytes": len(encoded),
+            "encode_us": encode_timer.elapsed / repeat * 1e6,
+            "decode_us": decode_timer.elapsed / repeat * 1e6
+        }
+        print(f"📦 {name:8s} {results[name]['bytes']:6d} B, encode {results[name]['encode_us']:6.1f} µs, "
+              f"decode {results[name]['decode_us']:6.1f} µs")
+    return results
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="DeciGarde OCR transport benchmark")
+    parser.add_argument('--url', default=None, help='ML service URL (default: in-process app)')
+    parser.add_argument('--resolutions', default=DEFAULT_RESOLUTIONS, help='Comma-separated WxH list')
+    parser.add_argument('--repeat', type=int, default=10, help='Requests per page and mode')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='-', help='Report path (default: stdout)')
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    print("🧪 DeciGarde Transport Benchmark")
+    print("=" * 60)
+
+    resolutions = _parse_resolutions(args.resolutions)
+    corpus = generate_corpus(resolutions, ["handwritten"], [0.2], seed=args.seed)
+
+    if args.url:
+        import httpx
+        client = httpx.Client(base_url=args.url, timeout=300)
+    else:
+        from fastapi.testclient import TestClient
+        import app
+        client = TestClient(app.app)
+
+    with client:
+        transport = run_transport(client, corpus, args.repeat)
+
+    report = {
+        "suite": "transport",
+        "environment": environment_info(),
+        "config": {
+            "url": args.url or "in-process",
+            "resolutions": [f"{w}x{h}" for w, h in resolutions],
+            "repeat": args.repeat,
+            "msgpack_available": MSGPACK_AVAILABLE
+        },
+        "results": {
+            "transport": transport,
+            "serialization": run_serialization()
+        }
+    }
+
+    write_report(report, args.output)
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+ONNX Model Export Script
+Converts models to ONNX, applies dynamic int8 quantization and writes the
+model directories read at run time:
+- ocr: PaddleOCR detection and recognition, for the onnxocr engine (ONNX_OCR_MODEL_DIR)
+- embedding: the sentence-transformers model used for semantic marking
+  (EMBEDDING_BACKEND=onnx, EMBEDDING_MODEL_DIR)
+
+Dynamic quantization speeds up MatMul/LSTM-heavy graphs such as the
+recognizer. Convolution-heavy graphs such as the DB detector usually run
+slower as dynamic int8 on CPU, so only the recognizer is quantized unless
+--quantize says otherwise; compare both with benchmarks.ocr_benchmark.
+
+Usage (from ml-service/, with paddleocr, paddle2onnx and onnx installed):
+    python export_onnx_models.py ocr --output models/onnx-ocr
+    python export_onnx_models.py ocr --output models/onnx-ocr --quantize det,rec
+    python export_onnx_models.py ocr --det-model-dir ~/.paddleocr/.../det --rec-model-dir ... --rec-dict ...
+
+    (with sentence-transformers, torch and onnx installed)
+    python export_onnx_models.py embedding --output models/onnx-minilm --tolerance 0.02
+"""
+
+import argparse
+import inspect
+import json
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Any, List
+
+from services.onnx_ocr import MANIFEST_NAME
+
+OPSET = 11
+EMBEDDING_OPSET = 14
+
+def find_paddleocr_models(lang: str = 'en') -> Dict[str, Any]:
+    """
+    Locate the inference models PaddleOCR downloads for a language
+
+    Returns:
+        det/rec model directories, the character dictionary and the recognizer input shape
+    """
+    from paddleocr import PaddleOCR
+
+    # Constructing PaddleOCR downloads the models if needed and resolves their paths
+    args = PaddleOCR(lang=lang, use_angle_cls=False, show_log=False).args
+    return {
+        "det_model_dir": args.det_model_dir,
+        "rec_model_dir": args.rec_model_dir,
+        "rec_dict": args.rec_char_dict_path,
+        "rec_image_shape": [int(v) for v in str(args.rec_image_shape).split(',')],
+        "use_space_char": bool(args.use_space_char)
+    }
+
+def paddle_to_onnx(model_dir: str, output_path: Path):
+    """Convert a Paddle inference model directory with the paddle2onnx CLI"""
+    subprocess.run([
+        'paddle2onnx',
+        '--model_dir', str(model_dir),
+        '--model_filename', 'inference.pdmodel',
+        '--params_filename', 'inference.pdiparams',
+        '--save_file', str(output_path),
+        '--opset_version', str(OPSET),
+        '--enable_onnx_checker', 'True'
+    ], check=True)
+    print(f"✅ Exported {output_path.name}")
+
+def quantize(fp32_path: Path, int8_path: Path, weight_type: str = 'qint8'):
+    """Dynamic int8 quantization (weights quantized offline, activations at run time)"""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    quantize_dynamic(str(fp32_path), str(int8_path),
+                     weight_type=QuantType.QInt8 if weight_type == 'qint8' else QuantType.QUInt8)
+    size_change = int8_path.stat().st_size / fp32_path.stat().st_size
+    print(f"✅ Quantized {int8_path.name} ({size_change:.0%} of fp32 size)")
+
+def export_ocr(args) -> Dict[str, Any]:
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+
+    models = find_paddleocr_models(args.lang) if not (args.det_model_dir and args.rec_model_dir) else {
+        "det_model_dir": args.det_model_dir,
+        "rec_model_dir": args.rec_model_dir,
+        "rec_dict": args.rec_dict,
+        "rec_image_shape": [int(v) for v in args.rec_image_shape.split(',')],
+        "use_space_char": not args.no_space_char
+    }
+    if not models["rec_dict"]:
+        raise SystemExit("❌ --rec-dict is required with explicit model directories")
+
+    to_quantize = [m.strip() for m in args.quantize.split(',') if m.strip()]
+    manifest = {"source": {}, "quantized": to_quantize}
+    for model in ('det', 'rec'):
+        model_dir = models[f"{model}_model_dir"]
+        fp32_path = output / f"{model}.onnx"
+        paddle_to_onnx(model_dir, fp32_path)
+        manifest[model] = {"fp32": fp32_path.name}
+        manifest["source"][model] = str(model_dir)
+
+        if model in to_quantize:
+            int8_path = output / f"{model}.int8.onnx"
+            quantize(fp32_path, int8_path, args.weight_type)
+            manifest[model]["int8"] = int8_path.name
+
+    shutil.copy(models["rec_dict"], output / "dict.txt")
+    manifest.update({
+        "dict": "dict.txt",
+        "rec_image_shape": models["rec_image_shape"],
+        "use_space_char": models["use_space_char"]
+    })
+
+    with open(output / MANIFEST_NAME, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"📁 Wrote {output / MANIFEST_NAME}; set ONNX_OCR_MODEL_DIR={output}")
+    return manifest
+
+def verify_embedding(model, model_dir: Path, precisions: List[str], pairs: List[tuple]) -> Dict[str, Any]:
+    """
+    Compare cosine similarities from the exported models with the PyTorch model
+
+    Args:
+        model: Loaded SentenceTransformer (the reference)
+        model_dir: Export directory
+        precisions: Exported precisions to check ('fp32', 'int8')
+        pairs: (question, answer) texts scored as MarkingService does
+
+    Returns:
+        Largest and mean absolute cosine difference per precision
+    """
+    import numpy as np
+    from services.embedding_backends import ONNXEmbeddingBackend
+
+    def cosines(encode):
+        embeddings = encode([text for pair in pairs for text in pair])
+        a, b = embeddings[0::2], embeddings[1::2]
+        return (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+    reference = cosines(lambda texts: model.encode(texts, convert_to_numpy=True))
+    results = {}
+    for precision in precisions:
+        backend = ONNXEmbeddingBackend(str(model_dir), precision=precision)
+        deltas = np.abs(cosines(backend.encode) - reference)
+        results[precision] = {"max_abs_delta": float(deltas.max()), "mean_abs_delta": float(deltas.mean())}
+        print(f"📐 {precision}: max |Δcos| {results[precision]['max_abs_delta']:.4f} over {len(pairs)} pairs")
+    return results
+
+def export_embedding(args) -> Dict[str, Any]:
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    output = Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+
+    model = SentenceTransformer(args.model, device='cpu')
+    transformer = model[0].auto_model.eval()
+    tokenizer = model[0].tokenizer
+    max_seq_length = args.max_seq_length or model.max_seq_length
+
+    sample = tokenizer(["Photosynthesis converts light energy into chemical energy."], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['token_embeddings'] = {0: 'batch', 1: 'sequence'}
+
+    class TokenEmbeddings(torch.nn.Module):
+        def __init__(self, transformer):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, *inputs):
+            return self.transformer(**dict(zip(input_names, inputs))).last_hidden_state
+
+    export_kwargs = {}
+    if 'dynamo' in inspect.signature(torch.onnx.export).parameters:
+        # Newer PyTorch defaults to the dynamo exporter; the TorchScript one handles dynamic_axes
+        export_kwargs['dynamo'] = False
+
+    fp32_path = output / "model.onnx"
+    with torch.no_grad():
+        torch.onnx.export(TokenEmbeddings(transformer), tuple(sample[name] for name in input_names), str(fp32_path),
+                          input_names=input_names, output_names=['token_embeddings'], dynamic_axes=dynamic_axes,
+                          opset_version=EMBEDDING_OPSET, **export_kwargs)
+    print(f"✅ Exported {fp32_path.name}")
+
+    manifest = {"model": {"fp32": fp32_path.name}}
+    if not args.no_quantize:
+        int8_path = output / "model.int8.onnx"
+        quantize(fp32_path, int8_path, args.weight_type)
+        manifest["model"]["int8"] = int8_path.name
+
+    tokenizer.save_pretrained(str(output))
+    manifest.update({
+        "tokenizer": "tokenizer.json",
+        "pad_token_id": tokenizer.pad_token_id or 0,
+        "max_seq_length": max_seq_length,
+        "pooling": "mean",
+        "normalize": any(type(module).__name__ == 'Normalize' for module in model),
+        "source": args.model
+    })
+    with open(output / MANIFEST_NAME, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    from benchmarks.marking_corpus import build_corpus
+    pairs = [(case["question"], case["answer"]) for case in build_corpus()]
+    manifest["verification"] = verify_embedding(model, output, list(manifest["model"]), pairs)
+    with open(output / MANIFEST_NAME, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"📁 Wrote {output / MANIFEST_NAME}; set EMBEDDING_BACKEND=onnx EMBEDDING_MODEL_DIR={output}")
+    worst = max((v["max_abs_delta"] for v in manifest["verification"].values()), default=0.0)
+    if worst > args.tolerance:
+        print(f"❌ Cosine similarity drifted by {worst:.4f} (tolerance {args.tolerance}); "
+              f"use EMBEDDING_PRECISION=fp32 or re-export with --no-quantize")
+        sys.exit(1)
+    return manifest
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Export DeciGarde models to ONNX")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ocr = subparsers.add_parser('ocr', help='PaddleOCR detection and recognition models')
+    ocr.add_argument('--output', default='models/onnx-ocr', help='Model directory to write')
+    ocr.add_argument('--lang', default='en', help='PaddleOCR language whose models are exported')
+    ocr.add_argument('--det-model-dir', help='Paddle detection inference model (default: PaddleOCR download)')
+    ocr.add_argument('--rec-model-dir', help='Paddle recognition inference model (default: PaddleOCR download)')
+    ocr.add_argument('--rec-dict', help='Recognition character dictionary')
+    ocr.add_argument('--rec-image-shape', default='3,48,320', help='Recognizer input C,H,W')
+    ocr.add_argument('--no-space-char', action='store_true', help='The recognizer has no space class')
+    ocr.add_argument('--quantize', default='rec', help="Models to quantize to int8: 'rec', 'det,rec' or ''")
+    ocr.add_argument('--weight-type', choices=['qint8', 'quint8'], default='qint8')
+    ocr.set_defaults(func=export_ocr)
+
+    embedding = subparsers.add_parser('embedding', help='sentence-transformers model for semantic marking')
+    embedding.add_argument('--output', default='models/onnx-minilm', help='Model directory to write')
+    embedding.add_argument('--model', default='all-MiniLM-L6-v2', help='sentence-transformers model name or path')
+    embedding.add_argument('--max-seq-length', type=int, default=0, help='Tokens kept per text (0 = model default)')
+    embedding.add_argument('--no-quantize', action='store_true', help='Export fp32 only')
+    embedding.add_argument('--weight-type', choices=['qint8', 'quint8'], default='qint8')
+    embedding.add_argument('--tolerance', type=float, default=0.02,
+                           help='Largest cosine-similarity difference from the PyTorch model accepted')
+    embedding.set_defaults(func=export_embedding)
+    return parser
+
+def main(argv: List[str] = None):
+    args = build_parser().parse_args(argv)
+    print("🧪 DeciGarde ONNX Export")
+    print("=" * 60)
+    try:
+        return args.func(args)
+    except subprocess.CalledProcessError as e:
+        print(f"❌ paddle2onnx failed: {e}")
+        sys.exit(1)
+    except ImportError as e:
+        print(f"❌ Missing export dependency: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,216 +1,725 @@
 import requests
+from requests.adapters import HTTPAdapter
+import asyncio
+import io
 import json
 import logging
-from typing import Dict, Any, List, Optional, Union
+import mimetypes
+import os
+import random
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
+from typing import Dict, Any, List, Optional, Union, Iterable, Tuple
 from pathlib import Path
 import time
 
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
-class DeciGardeMLClient:
+DEFAULT_BASE_URL = os.getenv('ML_SERVICE_URL', 'http://localhost:8000')
+DEFAULT_REPLICA_URLS = [url.strip() for url in os.getenv('ML_SERVICE_REPLICA_URLS', '').split(',') if url.strip()]
+DEFAULT_POOL_SIZE = 10
+DEFAULT_DOWNSCALE_UPLOADS = os.getenv('ML_CLIENT_DOWNSCALE_UPLOADS', 'false').lower() == 'true'
+DEFAULT_UPLOAD_QUALITY = int(os.getenv('ML_CLIENT_UPLOAD_QUALITY', '85'))
+
+# Used when the server does not advertise its working resolution (matches ImagePreprocessor)
+DEFAULT_WORKING_RESOLUTION = {"handwriting": (2000, 3000), "printed": (3000, 4000)}
+
+EXIF_ORIENTATION_TAG = 0x0112
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+
+_IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF8', 'image/gif'),
+    (b'BM', 'image/bmp'),
+    (b'II*\x00', 'image/tiff'),
+    (b'MM\x00*', 'image/tiff'),
+)
+
+def _ocr_form(language: str, enhance_handwriting: bool) -> Dict[str, Any]:
+    return {
+        'language': language,
+        'enhance_handwriting': str(enhance_handwriting).lower()
+    }
+
+def _mark_form(question: str, answer: str, rubric: dict, max_score: int, subject: str) -> Dict[str, Any]:
+    return {
+        'question': question,
+        'answer': answer,
+        'rubric': json.dumps(rubric),
+        'max_score': max_score,
+        'subject': subject
+    }
+
+def guess_content_type(filename: str, data: bytes) -> str:
+    """
+    Content type of an upload, from its file name or, failing that, its leading bytes
+
+    Args:
+        filename: Upload file name
+        data: File contents
+
+    Returns:
+        MIME type (application/octet-stream if unrecognised)
+    """
+    content_type, _ = mimetypes.guess_type(filename)
+    if content_type and content_type.startswith('image/'):
+        return content_type
+    for signature, signature_type in _IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return signature_type
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    return content_type or 'application/octet-stream'
+
+def encode_for_upload(data: bytes, max_size: Tuple[int, int], quality: int = DEFAULT_UPLOAD_QUALITY) -> Optional[Tuple[bytes, str]]:
+    """
+    Downscale an image to fit max_size and recompress it for upload
+
+    JPEGs are decoded in Pillow draft mode (libjpeg DCT scaling), so large phone
+    photos never decode at full resolution. EXIF orientation is applied to the
+    pixels because the metadata is not carried over. PNGs stay lossless; other
+    formats are sent as JPEG.
+
+    Args:
+        data: Original image bytes
+        max_size: (width, height) the server works at
+        quality: JPEG quality (1-95)
+
+    Returns:
+        (encoded bytes, content type), or None when the original should be sent
+        unchanged (already small enough, unreadable, or not smaller after re-encoding)
+    """
+    if not PIL_AVAILABLE:
+        return None
+
+    max_width, max_height = max_size
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            source_format = img.format
+            width, height = img.size
+            transposed = img.getexif().get(EXIF_ORIENTATION_TAG, 1) in (5, 6, 7, 8)
+            if transposed:
+                width, height = height, width
+
+            scale = min(max_width / width, max_height / height)
+            if scale >= 1.0:
+                return None
+            target = (max(1, int(width * scale)), max(1, int(height * scale)))
+
+            if source_format == 'JPEG':
+                img.draft('L' if img.mode == 'L' else 'RGB', target[::-1] if transposed else target)
+            image = ImageOps.exif_transpose(img)
+            image = image.resize(target, Image.LANCZOS)
+
+        output = io.BytesIO()
+        if source_format == 'PNG':
+            image.save(output, 'PNG', optimize=True)
+            content_type = 'image/png'
+        else:
+            if image.mode not in ('L', 'RGB'):
+                image = image.convert('RGB')
+            image.save(output, 'JPEG', quality=quality, optimize=True)
+            content_type = 'image/jpeg'
+    except Exception as e:
+        logger.warning(f"Client-side downscale skipped: {e}")
+        return None
+
+    encoded = output.getvalue()
+    if len(encoded) >= len(data):
+        return None
+    logger.debug(f"Upload downscaled {width}x{height} -> {target[0]}x{target[1]}: {len(data)} -> {len(encoded)} bytes")
+    return encoded, content_type
+
+def _image_file(image_path: Union[str, Path], field: str = 'image', max_size: Optional[Tuple[int, int]] = None,
+                quality: int = DEFAULT_UPLOAD_QUALITY):
+    path = Path(image_path)
+    data = path.read_bytes()
+    filename = path.name
+
+    encoded = encode_for_upload(data, max_size, quality) if max_size else None
+    if encoded is not None:
+        data, content_type = encoded
+        if content_type == 'image/jpeg' and path.suffix.lower() not in ('.jpg', '.jpeg'):
+            filename = f"{path.stem}.jpg"
+        return (field, (filename, data, content_type))
+
+    return (field, (filename, data, guess_content_type(filename, data)))
+
+def _raw_ocr_params(language: str, enhance_handwriting: bool, filename: str) -> Dict[str, Any]:
+    return {
+        'language': language,
+        'enhance_handwriting': str(enhance_handwriting).lower(),
+        'filename': filename
+    }
+
+def _raw_ocr_headers(content_type: str, binary_response: bool) -> Dict[str, str]:
+    headers = {'Content-Type': content_type}
+    if binary_response and MSGPACK_AVAILABLE:
+        headers['Accept'] = f"{MSGPACK_MEDIA_TYPE}, application/json;q=0.5"
+    return headers
+
+def _decode_body(headers, content: bytes) -> Dict[str, Any]:
+    """Decode a JSON or MessagePack response body"""
+    if MSGPACK_AVAILABLE and headers.get('Content-Type', '').startswith(MSGPACK_MEDIA_TYPE):
+        return msgpack.unpackb(content, raw=False)
+    return json.loads(content)
+
+def _parse_working_resolution(capabilities: Dict[str, Any]) -> Optional[Dict[str, Tuple[int, int]]]:
+    advertised = capabilities.get("image_preprocessing", {}).get("working_resolution")
+    if not advertised:
+        return None
+    try:
+        return {mode: (int(size["width"]), int(size["height"])) for mode, size in advertised.items()}
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return None
+
+def _failure(status_code: Optional[int] = None, error: Optional[str] = None) -> Dict[str, Any]:
+    return {"success": False, "error": f"HTTP {status_code}" if status_code is not None else error}
+
+# Outcome of one request to one instance
+_Attempt = namedtuple('_Attempt', ['result', 'retryable', 'retry_after'])
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter for idempotent requests
+
+    Attempt n (n >= 1) waits a random time between 0 and
+    min(backoff_max, backoff_base * 2 ** (n - 1)), or the server's Retry-After
+    when it is larger, so clients recovering from the same outage spread out.
+    """
+
+    def __init__(self, max_attempts: int = 3, backoff_base: float = 0.25, backoff_max: float = 5.0,
+                 retry_statuses: Iterable[int] = (429, 500, 502, 503, 504)):
+        """
+        Initialize the policy
+
+        Args:
+            max_attempts: Total attempts per call, including the first
+            backoff_base: Backoff cap of the first retry in seconds
+            backoff_max: Largest backoff cap in seconds
+            retry_statuses: HTTP statuses worth retrying
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before retry number ``attempt``"""
+        cap = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        delay = random.uniform(0, cap)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+class CircuitBreaker:
+    """
+    Per-instance circuit breaker
+
+    After ``failure_threshold`` consecutive failures (transport errors or 5xx)
+    the circuit opens and requests skip the instance. Once ``reset_timeout``
+    has passed, a single probe request is let through: success closes the
+    circuit, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now (claims the probe slot when half-open)"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self.state = self.CLOSED
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self._failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+class LatencyTracker:
+    """Sliding window of successful request latencies"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Latency percentile, or None until min_samples requests have completed"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100.0))]
+
+class _ResilientTransport:
+    """Replica routing, retry and hedging state shared by the sync and async clients"""
+
+    def _init_resilience(self, base_url: str, replica_urls: Optional[List[str]], retry_policy: Optional[RetryPolicy],
+                         hedge_percentile: Optional[float], hedge_after: Optional[float],
+                         breaker_threshold: int, breaker_reset: float):
+        self.base_url = base_url.rstrip('/')
+        self.urls = [self.base_url]
+        for url in replica_urls or []:
+            url = url.rstrip('/')
+            if url not in self.urls:
+                self.urls.append(url)
+
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.hedge_percentile = hedge_percentile
+        self.hedge_after = hedge_after
+        self.breakers = {url: CircuitBreaker(breaker_threshold, breaker_reset) for url in self.urls}
+        self._latencies: Dict[str, LatencyTracker] = {}
+        self._stats = {"retries": 0, "hedges": 0, "hedge_wins": 0, "circuit_rejections": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def resilience_status(self) -> Dict[str, Any]:
+        """Retry/hedge counters and the circuit state of every instance"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        return {"stats": stats, "breakers": {url: breaker.state for url, breaker in self.breakers.items()}}
+
+    def _pick_url(self, exclude: Iterable[str] = ()) -> Optional[str]:
+        """First instance (primary, then replicas) whose circuit admits a request"""
+        for url in self.urls:
+            if url not in exclude and self.breakers[url].allow():
+                return url
+        return None
+
+    def _hedge_delay(self, path: str) -> Optional[float]:
+        """How long to wait for an instance before hedging to another (None = no hedging)"""
+        if len(self.urls) < 2:
+            return None
+        delay = None
+        if self.hedge_percentile is not None:
+            delay = self._latencies.setdefault(path, LatencyTracker()).percentile(self.hedge_percentile)
+        if self.hedge_after is not None:
+            delay = max(delay or 0.0, self.hedge_after)
+        return delay
+
+    def _attempt_from_response(self, url: str, path: str, operation: str, status_code: int, headers,
+                               content: bytes, elapsed: float) -> _Attempt:
+        breaker = self.breakers[url]
+        if status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+        if status_code == 200:
+            try:
+                result = _decode_body(headers, content)
+            except Exception as e:
+                logger.error(f"{operation} returned an undecodable body from {url}: {e}")
+                return _Attempt(_failure(error=str(e)), False, None)
+            self._latencies.setdefault(path, LatencyTracker()).record(elapsed)
+            return _Attempt(result, False, None)
+
+        retryable = status_code in self.retry_policy.retry_statuses
+        retry_after = None
+        try:
+            retry_after = float(headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            pass
+        log = logger.warning if retryable else logger.error
+        log(f"{operation} request to {url} failed: {status_code} - {content.decode('utf-8', 'replace')[:500]}")
+        return _Attempt(_failure(status_code=status_code), retryable, retry_after)
+
+    def _transport_failure(self, url: str, operation: str, error: Exception) -> _Attempt:
+        self.breakers[url].record_failure()
+        logger.warning(f"{operation} request to {url} failed: {error}")
+        return _Attempt(_failure(error=str(error)), True, None)
+
+    def _circuit_open(self, operation: str) -> _Attempt:
+        self._count("circuit_rejections")
+        logger.error(f"{operation} not sent: circuit open for every ML service instance")
+        return _Attempt(_failure(error="Circuit open for every ML service instance"), False, None)
+
+class _UploadEncoding:
+    """Optional client-side downscaling of OCR uploads to the server's working resolution"""
+
+    def _init_uploads(self, downscale_uploads: bool, upload_quality: int, upload_max_size: Optional[Tuple[int, int]]):
+        self.downscale_uploads = downscale_uploads
+        self.upload_quality = upload_quality
+        self.upload_max_size = upload_max_size
+        self._working_resolution = None
+
+    def _resolve_upload_size(self, enhance_handwriting: bool, capabilities: Optional[Dict[str, Any]]) -> Tuple[int, int]:
+        if self._working_resolution is None and capabilities is not None:
+            # Cached only once the server has answered; until then the defaults apply
+            self._working_resolution = _parse_working_resolution(capabilities) or DEFAULT_WORKING_RESOLUTION
+        resolution = self._working_resolution or DEFAULT_WORKING_RESOLUTION
+        return resolution.get("handwriting" if enhance_handwriting else "printed", DEFAULT_WORKING_RESOLUTION["handwriting"])
+
+class DeciGardeMLClient(_ResilientTransport, _UploadEncoding):
     """
     Client for integrating DeciGarde with the ML Service
+
+    Requests share a pooled keep-alive session, so the client is cheap to call
+    repeatedly and safe to use from several threads (see map_ocr/map_mark).
+    Calls are retried with backoff on transient failures, instances that keep
+    failing are skipped by a circuit breaker, and slow OCR requests can be
+    hedged to a replica.
     """
-    
-    def __init__(self, base_url: str = "http://localhost:8000", timeout: int = 300):
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, timeout: int = 300, pool_size: int = DEFAULT_POOL_SIZE,
+                 keep_alive: bool = True, check_health: bool = False, replica_urls: Optional[List[str]] = None,
+                 retry_policy: Optional[RetryPolicy] = None, hedge_percentile: Optional[float] = None,
+                 hedge_after: Optional[float] = None, breaker_threshold: int = 5, breaker_reset: float = 30.0,
+                 downscale_uploads: bool = DEFAULT_DOWNSCALE_UPLOADS, upload_quality: int = DEFAULT_UPLOAD_QUALITY,
+                 upload_max_size: Optional[Tuple[int, int]] = None, tenant_id: Optional[str] = None):
         """
         Initialize the ML service client
-        
+
         Args:
             base_url: Base URL of the ML service
             timeout: Request timeout in seconds
+            pool_size: Maximum pooled connections (and default concurrency of map_* helpers)
+            keep_alive: Reuse connections between requests
+            check_health: Probe /health now instead of leaving it to check_connection()
+            replica_urls: Further ML service instances used for failover and hedging
+            retry_policy: Retry/backoff policy (default: 3 attempts; RetryPolicy(max_attempts=1) disables retries)
+            hedge_percentile: Hedge an OCR request once it is slower than this percentile of recent OCR latencies
+            hedge_after: Fixed hedge delay in seconds; with hedge_percentile, the minimum delay
+            breaker_threshold: Consecutive failures that open an instance's circuit
+            breaker_reset: Seconds before an open circuit lets a probe request through
+            downscale_uploads: Shrink OCR uploads to the server's advertised working resolution and recompress
+            upload_quality: JPEG quality used when recompressing uploads
+            upload_max_size: (width, height) to shrink to instead of the advertised working resolution
+            tenant_id: Sent as X-Tenant-ID so the service shares workers fairly between tenants (lecturers)
         """
-        self.base_url = base_url.rstrip('/')
+        self._init_resilience(base_url, replica_urls, retry_policy, hedge_percentile, hedge_after,
+                              breaker_threshold, breaker_reset)
+        self._init_uploads(downscale_uploads, upload_quality, upload_max_size)
         self.timeout = timeout
+        self.pool_size = pool_size
         self.session = requests.Session()
-        
-        # Test connection
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+        if tenant_id:
+            self.session.headers['X-Tenant-ID'] = tenant_id
+        self._hedge_executor = None
+        self._hedge_executor_lock = threading.Lock()
+
+        if check_health:
+            self.check_connection()
+
+    def check_connection(self) -> bool:
+        """
+        Probe the service health endpoint
+
+        Returns:
+            True if the service answered 200
+        """
         try:
             response = self.session.get(f"{self.base_url}/health", timeout=10)
             if response.status_code == 200:
                 logger.info("✅ ML Service connection established")
-            else:
-                logger.warning(f"⚠️  ML Service health check failed: {response.status_code}")
+                return True
+            logger.warning(f"⚠️  ML Service health check failed: {response.status_code}")
         except Exception as e:
             logger.error(f"❌ Failed to connect to ML Service: {e}")
-    
+        return False
+
+    def _post(self, path: str, operation: str, idempotent: bool = True, hedge: bool = False, **kwargs) -> Dict[str, Any]:
+        """
+        POST to the service and return the JSON body or a failure dictionary
+
+        Args:
+            path: Endpoint path
+            operation: Description used in log messages
+            idempotent: Safe to retry (and to send to a second instance)
+            hedge: Hedge to a replica when the request is slow
+            kwargs: Passed to requests (files, data)
+
+        Returns:
+            Response JSON, or {"success": False, "error": ...}
+        """
+        attempts = self.retry_policy.max_attempts if idempotent else 1
+        tried = set()
+        attempt = None
+
+        for number in range(attempts):
+            if number:
+                self._count("retries")
+                time.sleep(self.retry_policy.delay(number, attempt.retry_after))
+
+            # Prefer an instance that has not failed this call yet
+            url = self._pick_url(exclude=tried) or self._pick_url()
+            if url is None:
+                return self._circuit_open(operation).result
+
+            if hedge and idempotent:
+                attempt = self._send_hedged(url, path, operation, kwargs, tried)
+            else:
+                attempt = self._send(url, path, operation, kwargs)
+            tried.add(url)
+            if not attempt.retryable:
+                break
+
+        if attempt.retryable:
+            logger.error(f"{operation} failed after {attempts} attempt(s): {attempt.result.get('error')}")
+        return attempt.result
+
+    def _send(self, url: str, path: str, operation: str, kwargs: Dict[str, Any]) -> _Attempt:
+        start = time.perf_counter()
+        try:
+            response = self.session.post(f"{url}{path}", timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            return self._transport_failure(url, operation, e)
+        return self._attempt_from_response(url, path, operation, response.status_code, response.headers,
+                                           response.content, time.perf_counter() - start)
+
+    def _send_hedged(self, url: str, path: str, operation: str, kwargs: Dict[str, Any], tried: set) -> _Attempt:
+        """Send to url; if no answer arrives within the hedge delay, race a second instance"""
+        delay = self._hedge_delay(path)
+        if delay is None:
+            return self._send(url, path, operation, kwargs)
+
+        executor = self._get_hedge_executor()
+        primary = executor.submit(self._send, url, path, operation, kwargs)
+        try:
+            return primary.result(timeout=delay)
+        except FuturesTimeout:
+            pass
+
+        backup_url = self._pick_url(exclude=tried | {url})
+        if backup_url is None:
+            return primary.result()
+
+        self._count("hedges")
+        logger.info(f"⏱️  {operation} slower than {delay:.2f}s on {url}; hedging to {backup_url}")
+        backup = executor.submit(self._send, backup_url, path, operation, kwargs)
+
+        # The losing request cannot be cancelled mid-flight; its result is discarded
+        attempt = None
+        for future in as_completed([primary, backup]):
+            attempt = future.result()
+            if not attempt.retryable:
+                if future is backup:
+                    self._count("hedge_wins")
+                return attempt
+        return attempt
+
+    def _upload_size(self, enhance_handwriting: bool) -> Optional[Tuple[int, int]]:
+        """Size OCR uploads are shrunk to, or None to upload files unchanged"""
+        if not self.downscale_uploads:
+            return None
+        if self.upload_max_size:
+            return self.upload_max_size
+        capabilities = None
+        if self._working_resolution is None:
+            capabilities = self.get_marking_capabilities()
+            if "error" in capabilities:
+                capabilities = None
+        return self._resolve_upload_size(enhance_handwriting, capabilities)
+
+    def _get_hedge_executor(self) -> ThreadPoolExecutor:
+        with self._hedge_executor_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=self.pool_size * 2,
+                                                          thread_name_prefix="decigarde-hedge")
+            return self._hedge_executor
+
     def process_ocr(self, image_path: Union[str, Path], language: str = "eng", enhance_handwriting: bool = True) -> Dict[str, Any]:
         """
         Process OCR on a single image
-        
+
         Args:
             image_path: Path to the image file
             language: Language code for OCR
             enhance_handwriting: Whether to use handwriting optimization
-            
+
         Returns:
             OCR results dictionary
         """
         try:
-            with open(image_path, 'rb') as f:
-                files = {'image': f}
-                data = {
-                    'language': language,
-                    'enhance_handwriting': enhance_handwriting
-                }
-                
-                response = self.session.post(
-                    f"{self.base_url}/api/ml/ocr",
-                    files=files,
-                    data=data,
-                    timeout=self.timeout
-                )
-                
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    logger.error(f"OCR request failed: {response.status_code} - {response.text}")
-                    return {"success": False, "error": f"HTTP {response.status_code}"}
-                    
+            files = [_image_file(image_path, max_size=self._upload_size(enhance_handwriting), quality=self.upload_quality)]
         except Exception as e:
             logger.error(f"OCR processing failed: {e}")
-            return {"success": False, "error": str(e)}
-    
+            return _failure(error=str(e))
+
+        return self._post("/api/ml/ocr", "OCR", hedge=True, files=files, data=_ocr_form(language, enhance_handwriting))
+
+    def process_ocr_raw(self, image_path: Union[str, Path], language: str = "eng", enhance_handwriting: bool = True,
+                        binary_response: bool = True) -> Dict[str, Any]:
+        """
+        Process OCR on a single image via the raw-body endpoint (no multipart encoding)
+
+        Args:
+            image_path: Path to the image file
+            language: Language code for OCR
+            enhance_handwriting: Whether to use handwriting optimization
+            binary_response: Ask for a MessagePack response (when msgpack is installed)
+
+        Returns:
+            OCR results dictionary, as from process_ocr
+        """
+        try:
+            _, (filename, data, content_type) = _image_file(
+                image_path, max_size=self._upload_size(enhance_handwriting), quality=self.upload_quality)
+        except Exception as e:
+            logger.error(f"OCR processing failed: {e}")
+            return _failure(error=str(e))
+
+        return self._post("/api/ml/ocr/raw", "Raw OCR", hedge=True, data=data,
+                          params=_raw_ocr_params(language, enhance_handwriting, filename),
+                          headers=_raw_ocr_headers(content_type, binary_response))
+
     def process_batch_ocr(self, image_paths: List[Union[str, Path]], language: str = "eng", enhance_handwriting: bool = True) -> Dict[str, Any]:
         """
         Process OCR on multiple images
-        
+
         Args:
             image_paths: List of image file paths
             language: Language code for OCR
             enhance_handwriting: Whether to use handwriting optimization
-            
+
         Returns:
             Batch OCR results dictionary
         """
         try:
-            files = []
-            for i, path in enumerate(image_paths):
-                with open(path, 'rb') as f:
-                    files.append(('images', (Path(path).name, f.read(), 'image/jpeg')))
-            
-            data = {
-                'language': language,
-                'enhance_handwriting': enhance_handwriting
-            }
-            
-            response = self.session.post(
-                f"{self.base_url}/api/ml/batch-ocr",
-                files=files,
-                data=data,
-                timeout=self.timeout
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"Batch OCR request failed: {response.status_code} - {response.text}")
-                return {"success": False, "error": f"HTTP {response.status_code}"}
-                
+            max_size = self._upload_size(enhance_handwriting)
+            files = [_image_file(path, 'images', max_size, self.upload_quality) for path in image_paths]
         except Exception as e:
             logger.error(f"Batch OCR processing failed: {e}")
-            return {"success": False, "error": str(e)}
-    
+            return _failure(error=str(e))
+
+        return self._post("/api/ml/batch-ocr", "Batch OCR", files=files, data=_ocr_form(language, enhance_handwriting))
+
     def mark_answer(self, question: str, answer: str, rubric: dict, max_score: int, subject: str = "general") -> Dict[str, Any]:
         """
         Mark a student answer using AI
-        
+
         Args:
             question: The question text
             answer: The student's answer text
             rubric: Marking criteria dictionary
             max_score: Maximum possible score
             subject: Subject area for specialized marking
-            
+
         Returns:
             Marking results dictionary
         """
-        try:
-            data = {
-                'question': question,
-                'answer': answer,
-                'rubric': json.dumps(rubric),
-                'max_score': max_score,
-                'subject': subject
-            }
-            
-            response = self.session.post(
-                f"{self.base_url}/api/ml/mark",
-                data=data,
-                timeout=self.timeout
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"Marking request failed: {response.status_code} - {response.text}")
-                return {"success": False, "error": f"HTTP {response.status_code}"}
-                
-        except Exception as e:
-            logger.error(f"Answer marking failed: {e}")
-            return {"success": False, "error": str(e)}
-    
+        return self._post("/api/ml/mark", "Marking", data=_mark_form(question, answer, rubric, max_score, subject))
+
     def mark_batch_answers(self, marking_data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Mark multiple answers in batch
-        
+
         Args:
             marking_data: List of marking requests with question, answer, rubric, max_score, subject
-            
+
         Returns:
             Batch marking results dictionary
         """
-        try:
-            data = {
-                'marking_data': json.dumps(marking_data)
-            }
-            
-            response = self.session.post(
-                f"{self.base_url}/api/ml/batch-mark",
-                data=data,
-                timeout=self.timeout
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"Batch marking request failed: {response.status_code} - {response.text}")
-                return {"success": False, "error": f"HTTP {response.status_code}"}
-                
-        except Exception as e:
-            logger.error(f"Batch answer marking failed: {e}")
-            return {"success": False, "error": str(e)}
-    
+        return self._post("/api/ml/batch-mark", "Batch marking", data={'marking_data': json.dumps(marking_data)})
+
     def analyze_image_quality(self, image_path: Union[str, Path]) -> Dict[str, Any]:
         """
         Analyze image quality for OCR readiness
-        
+
         Args:
             image_path: Path to the image file
-            
+
         Returns:
             Quality analysis results
         """
         try:
-            with open(image_path, 'rb') as f:
-                files = {'image': f}
-                
-                response = self.session.post(
-                    f"{self.base_url}/api/ml/analyze-quality",
-                    files=files,
-                    timeout=self.timeout
-                )
-                
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    logger.error(f"Quality analysis failed: {response.status_code} - {response.text}")
-                    return {"error": f"HTTP {response.status_code}"}
-                    
+            files = [_image_file(image_path)]
         except Exception as e:
             logger.error(f"Image quality analysis failed: {e}")
             return {"error": str(e)}
-    
+
+        return self._post("/api/ml/analyze-quality", "Quality analysis", files=files)
+
+    def map_ocr(self, image_paths: List[Union[str, Path]], language: str = "eng", enhance_handwriting: bool = True,
+                max_in_flight: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Run process_ocr over many images concurrently
+
+        Args:
+            image_paths: Image file paths
+            language: Language code for OCR
+            enhance_handwriting: Whether to use handwriting optimization
+            max_in_flight: Maximum concurrent requests (default: pool_size)
+
+        Returns:
+            OCR results in the same order as image_paths
+        """
+        return self._map(lambda path: self.process_ocr(path, language, enhance_handwriting), image_paths, max_in_flight)
+
+    def map_mark(self, marking_data: List[Dict[str, Any]], max_in_flight: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Run mark_answer over many answers concurrently
+
+        Args:
+            marking_data: List of dicts with question, answer, rubric, max_score and optional subject
+            max_in_flight: Maximum concurrent requests (default: pool_size)
+
+        Returns:
+            Marking results in the same order as marking_data
+        """
+        return self._map(lambda item: self.mark_answer(**item), marking_data, max_in_flight)
+
+    def _map(self, call, items: List[Any], max_in_flight: Optional[int]) -> List[Dict[str, Any]]:
+        if not items:
+            return []
+        workers = max(1, min(max_in_flight or self.pool_size, len(items)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decigarde-client") as executor:
+            return list(executor.map(call, items))
+
     def get_service_status(self) -> Dict[str, Any]:
         """Get ML service status and capabilities"""
         try:
@@ -221,7 +730,7 @@ class DeciGardeMLClient:
                 return {"status": "unhealthy", "error": f"HTTP {response.status_code}"}
         except Exception as e:
             return {"status": "unreachable", "error": str(e)}
-    
+
     def get_marking_capabilities(self) -> Dict[str, Any]:
         """Get available marking capabilities"""
         try:
@@ -232,70 +741,314 @@ class DeciGardeMLClient:
                 return {"error": f"HTTP {response.status_code}"}
         except Exception as e:
             return {"error": str(e)}
-    
+
     def close(self):
         """Close the client session"""
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
         self.session.close()
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class AsyncDeciGardeMLClient(_ResilientTransport, _UploadEncoding):
+    """
+    asyncio client for the ML Service, built on a pooled httpx.AsyncClient
+
+    Use as ``async with AsyncDeciGardeMLClient() as client: ...``.
+    """
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, timeout: int = 300, pool_size: int = DEFAULT_POOL_SIZE,
+                 keep_alive: bool = True, replica_urls: Optional[List[str]] = None,
+                 retry_policy: Optional[RetryPolicy] = None, hedge_percentile: Optional[float] = None,
+                 hedge_after: Optional[float] = None, breaker_threshold: int = 5, breaker_reset: float = 30.0,
+                 downscale_uploads: bool = DEFAULT_DOWNSCALE_UPLOADS, upload_quality: int = DEFAULT_UPLOAD_QUALITY,
+                 upload_max_size: Optional[Tuple[int, int]] = None, tenant_id: Optional[str] = None):
+        """
+        Initialize the async ML service client
+
+        Args:
+            base_url: Base URL of the ML service
+            timeout: Request timeout in seconds
+            pool_size: Maximum connections (and default concurrency of map_* helpers)
+            keep_alive: Reuse connections between requests
+            replica_urls, retry_policy, hedge_percentile, hedge_after, breaker_threshold, breaker_reset,
+            downscale_uploads, upload_quality, upload_max_size, tenant_id: As for DeciGardeMLClient
+        """
+        if not HTTPX_AVAILABLE:
+            raise ImportError("AsyncDeciGardeMLClient requires httpx (pip install httpx)")
+
+        self._init_resilience(base_url, replica_urls, retry_policy, hedge_percentile, hedge_after,
+                              breaker_threshold, breaker_reset)
+        self._init_uploads(downscale_uploads, upload_quality, upload_max_size)
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            headers={'X-Tenant-ID': tenant_id} if tenant_id else None,
+            limits=httpx.Limits(max_connections=pool_size,
+                                max_keepalive_connections=pool_size if keep_alive else 0)
+        )
+
+    async def _post(self, path: str, operation: str, idempotent: bool = True, hedge: bool = False, **kwargs) -> Dict[str, Any]:
+        """POST to the service and return the JSON body or a failure dictionary (see DeciGardeMLClient._post)"""
+        attempts = self.retry_policy.max_attempts if idempotent else 1
+        tried = set()
+        attempt = None
+
+        for number in range(attempts):
+            if number:
+                self._count("retries")
+                await asyncio.sleep(self.retry_policy.delay(number, attempt.retry_after))
+
+            url = self._pick_url(exclude=tried) or self._pick_url()
+            if url is None:
+                return self._circuit_open(operation).result
+
+            if hedge and idempotent:
+                attempt = await self._send_hedged(url, path, operation, kwargs, tried)
+            else:
+                attempt = await self._send(url, path, operation, kwargs)
+            tried.add(url)
+            if not attempt.retryable:
+                break
+
+        if attempt.retryable:
+            logger.error(f"{operation} failed after {attempts} attempt(s): {attempt.result.get('error')}")
+        return attempt.result
+
+    async def _send(self, url: str, path: str, operation: str, kwargs: Dict[str, Any]) -> _Attempt:
+        start = time.perf_counter()
+        try:
+            response = await self.client.post(f"{url}{path}", **kwargs)
+        except httpx.HTTPError as e:
+            return self._transport_failure(url, operation, e)
+        return self._attempt_from_response(url, path, operation, response.status_code, response.headers,
+                                           response.content, time.perf_counter() - start)
+
+    async def _send_hedged(self, url: str, path: str, operation: str, kwargs: Dict[str, Any], tried: set) -> _Attempt:
+        """Send to url; if no answer arrives within the hedge delay, race a second instance and cancel the loser"""
+        delay = self._hedge_delay(path)
+        if delay is None:
+            return await self._send(url, path, operation, kwargs)
+
+        primary = asyncio.ensure_future(self._send(url, path, operation, kwargs))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        backup_url = self._pick_url(exclude=tried | {url})
+        if backup_url is None:
+            return await primary
+
+        self._count("hedges")
+        logger.info(f"⏱️  {operation} slower than {delay:.2f}s on {url}; hedging to {backup_url}")
+        backup = asyncio.ensure_future(self._send(backup_url, path, operation, kwargs))
+        pending = {primary, backup}
+        attempt = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    attempt = task.result()
+                    if not attempt.retryable:
+                        if task is backup:
+                            self._count("hedge_wins")
+                        return attempt
+            return attempt
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _upload_size(self, enhance_handwriting: bool) -> Optional[Tuple[int, int]]:
+        """Size OCR uploads are shrunk to, or None to upload files unchanged"""
+        if not self.downscale_uploads:
+            return None
+        if self.upload_max_size:
+            return self.upload_max_size
+        capabilities = None
+        if self._working_resolution is None:
+            capabilities = await self.get_marking_capabilities()
+            if "error" in capabilities:
+                capabilities = None
+        return self._resolve_upload_size(enhance_handwriting, capabilities)
+
+    async def _get(self, path: str) -> Dict[str, Any]:
+        response = await self.client.get(f"{self.base_url}{path}", timeout=10)
+        if response.status_code == 200:
+            return response.json()
+        return {"error": f"HTTP {response.status_code}"}
+
+    async def process_ocr(self, image_path: Union[str, Path], language: str = "eng", enhance_handwriting: bool = True) -> Dict[str, Any]:
+        """Process OCR on a single image (see DeciGardeMLClient.process_ocr)"""
+        try:
+            max_size = await self._upload_size(enhance_handwriting)
+            files = [await asyncio.to_thread(_image_file, image_path, 'image', max_size, self.upload_quality)]
+        except Exception as e:
+            logger.error(f"OCR processing failed: {e}")
+            return _failure(error=str(e))
+
+        return await self._post("/api/ml/ocr", "OCR", hedge=True, files=files, data=_ocr_form(language, enhance_handwriting))
+
+    async def process_ocr_raw(self, image_path: Union[str, Path], language: str = "eng", enhance_handwriting: bool = True,
+                              binary_response: bool = True) -> Dict[str, Any]:
+        """Process OCR via the raw-body endpoint (see DeciGardeMLClient.process_ocr_raw)"""
+        try:
+            max_size = await self._upload_size(enhance_handwriting)
+            _, (filename, data, content_type) = await asyncio.to_thread(
+                _image_file, image_path, 'image', max_size, self.upload_quality)
+        except Exception as e:
+            logger.error(f"OCR processing failed: {e}")
+            return _failure(error=str(e))
+
+        return await self._post("/api/ml/ocr/raw", "Raw OCR", hedge=True, content=data,
+                                params=_raw_ocr_params(language, enhance_handwriting, filename),
+                                headers=_raw_ocr_headers(content_type, binary_response))
+
+    async def process_batch_ocr(self, image_paths: List[Union[str, Path]], language: str = "eng", enhance_handwriting: bool = True) -> Dict[str, Any]:
+        """Process OCR on multiple images in one request (see DeciGardeMLClient.process_batch_ocr)"""
+        try:
+            max_size = await self._upload_size(enhance_handwriting)
+            files = [await asyncio.to_thread(_image_file, path, 'images', max_size, self.upload_quality)
+                     for path in image_paths]
+        except Exception as e:
+            logger.error(f"Batch OCR processing failed: {e}")
+            return _failure(error=str(e))
+
+        return await self._post("/api/ml/batch-ocr", "Batch OCR", files=files, data=_ocr_form(language, enhance_handwriting))
+
+    async def mark_answer(self, question: str, answer: str, rubric: dict, max_score: int, subject: str = "general") -> Dict[str, Any]:
+        """Mark a student answer (see DeciGardeMLClient.mark_answer)"""
+        return await self._post("/api/ml/mark", "Marking", data=_mark_form(question, answer, rubric, max_score, subject))
+
+    async def mark_batch_answers(self, marking_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Mark multiple answers in one request (see DeciGardeMLClient.mark_batch_answers)"""
+        return await self._post("/api/ml/batch-mark", "Batch marking", data={'marking_data': json.dumps(marking_data)})
+
+    async def analyze_image_quality(self, image_path: Union[str, Path]) -> Dict[str, Any]:
+        """Analyze image quality for OCR readiness (see DeciGardeMLClient.analyze_image_quality)"""
+        try:
+            files = [await asyncio.to_thread(_image_file, image_path)]
+        except Exception as e:
+            logger.error(f"Image quality analysis failed: {e}")
+            return {"error": str(e)}
+
+        return await self._post("/api/ml/analyze-quality", "Quality analysis", files=files)
+
+    async def map_ocr(self, image_paths: List[Union[str, Path]], language: str = "eng", enhance_handwriting: bool = True,
+                      max_in_flight: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Run process_ocr over many images with at most max_in_flight requests outstanding"""
+        return await self._map(lambda path: self.process_ocr(path, language, enhance_handwriting), image_paths, max_in_flight)
+
+    async def map_mark(self, marking_data: List[Dict[str, Any]], max_in_flight: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Run mark_answer over many answers with at most max_in_flight requests outstanding"""
+        return await self._map(lambda item: self.mark_answer(**item), marking_data, max_in_flight)
+
+    async def _map(self, call, items: List[Any], max_in_flight: Optional[int]) -> List[Dict[str, Any]]:
+        semaphore = asyncio.Semaphore(max(1, max_in_flight or self.pool_size))
+
+        async def bounded(item):
+            async with semaphore:
+                return await call(item)
+
+        return list(await asyncio.gather(*(bounded(item) for item in items)))
+
+    async def get_service_status(self) -> Dict[str, Any]:
+        """Get ML service status and capabilities"""
+        try:
+            response = await self.client.get(f"{self.base_url}/health", timeout=10)
+            if response.status_code == 200:
+                return response.json()
+            return {"status": "unhealthy", "error": f"HTTP {response.status_code}"}
+        except Exception as e:
+            return {"status": "unreachable", "error": str(e)}
+
+    async def get_marking_capabilities(self) -> Dict[str, Any]:
+        """Get available marking capabilities"""
+        try:
+            return await self._get("/api/ml/capabilities")
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def aclose(self):
+        """Close the pooled connections"""
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
 # Convenience functions for easy integration
-def create_ml_client(base_url: str = "http://localhost:8000") -> DeciGardeMLClient:
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def create_ml_client(base_url: str = DEFAULT_BASE_URL) -> DeciGardeMLClient:
     """Create and return an ML service client"""
     return DeciGardeMLClient(base_url)
 
+def get_default_client() -> DeciGardeMLClient:
+    """Shared pooled client used by quick_ocr/quick_mark (ML_SERVICE_URL, ML_SERVICE_REPLICA_URLS)"""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = DeciGardeMLClient(DEFAULT_BASE_URL, replica_urls=DEFAULT_REPLICA_URLS)
+    return _default_client
+
 def quick_ocr(image_path: str, language: str = "eng") -> str:
     """
     Quick OCR function for simple text extraction
-    
+
     Args:
         image_path: Path to image file
         language: Language code
-        
+
     Returns:
         Extracted text or empty string if failed
     """
-    client = DeciGardeMLClient()
-    try:
-        result = client.process_ocr(image_path, language)
-        if result.get('success'):
-            return result.get('text', '')
-        else:
-            logger.error(f"OCR failed: {result.get('error')}")
-            return ''
-    finally:
-        client.close()
+    result = get_default_client().process_ocr(image_path, language)
+    if result.get('success'):
+        return result.get('text', '')
+    else:
+        logger.error(f"OCR failed: {result.get('error')}")
+        return ''
 
 def quick_mark(question: str, answer: str, rubric: dict, max_score: int) -> Dict[str, Any]:
     """
     Quick marking function for single answer evaluation
-    
+
     Args:
         question: Question text
         answer: Student answer
         rubric: Marking criteria
         max_score: Maximum score
-        
+
     Returns:
         Marking results
     """
-    client = DeciGardeMLClient()
-    try:
-        return client.mark_answer(question, answer, rubric, max_score)
-    finally:
-        client.close()
+    return get_default_client().mark_answer(question, answer, rubric, max_score)
 
 # Example usage
 if __name__ == "__main__":
     # Example of how to use the client
     client = DeciGardeMLClient()
-    
+
     # Check service status
     status = client.get_service_status()
     print(f"Service Status: {status}")
-    
+
     # Example OCR processing
     # result = client.process_ocr("path/to/image.jpg")
     # print(f"OCR Result: {result}")
-    
+
+    # Example concurrent OCR over a folder of scans
+    # results = client.map_ocr(sorted(Path("scans").glob("*.jpg")), max_in_flight=8)
+
     # Example marking
     # marking_result = client.mark_answer(
     #     question="What is photosynthesis?",
@@ -304,5 +1057,5 @@ if __name__ == "__main__":
     #     max_score=10
     # )
     # print(f"Marking Result: {marking_result}")
-    
+
     client.close()
@@ -0,0 +1,115 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Tuple
+
+from services.metrics import record_cache_lookup
+
+# Text normalization applied to questions and answers before marking
+WHITESPACE = re.compile(r'\s+')
+DISALLOWED_CHARACTERS = re.compile(r'[^\w\s\.\,\!\?\;\:\-\(\)\[\]\{\}]')
+
+# Patterns counted for each subject group (matching is case-insensitive)
+SUBJECT_PATTERNS = {
+    'quantitative': {
+        'math_expressions': r'(\d+[\+\-\*/]\d+|\d+[=<>]\d+|\d+[xyz]\d*|\b(sin|cos|tan|log|sqrt)\b)',
+        'units': r'\b(kg|m|s|N|J|W|V|A|Ω|°C|°F)\b'
+    },
+    'written': {
+        'descriptive_words': r'\b(very|extremely|quite|rather|somewhat|clearly|obviously)\b'
+    },
+    'general': {}
+}
+
+SUBJECT_GROUPS = {
+    'mathematics': 'quantitative', 'math': 'quantitative', 'physics': 'quantitative', 'chemistry': 'quantitative',
+    'english': 'written', 'literature': 'written', 'history': 'written', 'geography': 'written'
+}
+
+def subject_group(subject: str) -> str:
+    """Pattern group of a subject: 'quantitative', 'written' or 'general'"""
+    return SUBJECT_GROUPS.get(subject.lower(), 'general')
+
+class AnswerFeatures:
+    """Features of one answer, shared by the marking approaches"""
+
+    def __init__(self, text: str, group: str, counts: Dict[str, int]):
+        self.text = text
+        self.group = group
+        self.lower = text.lower()
+        self.words = text.split()
+        self.word_count = len(self.words)
+        self.char_count = len(text)
+        # Pieces between full stops, the structure measure of written answers
+        self.sentence_count = text.count('.') + 1
+        self.counts = counts
+
+    def count(self, feature: str) -> int:
+        """Matches of one subject pattern (0 when the subject group does not count it)"""
+        return self.counts.get(feature, 0)
+
+    def contains(self, phrase: str) -> bool:
+        """Case-insensitive substring test"""
+        return phrase.lower() in self.lower
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.counts, group=self.group, word_count=self.word_count, char_count=self.char_count,
+                    sentence_count=self.sentence_count)
+
+class FeatureExtractor:
+    """
+    Computes AnswerFeatures with patterns compiled once per subject group
+
+    Results are kept in a small LRU keyed by (group, text), so approaches and
+    re-marking runs over the same answer share one extraction.
+    """
+
+    def __init__(self, cache_size: int = 1024):
+        self.patterns = {
+            group: {name: re.compile(pattern, re.IGNORECASE) for name, pattern in patterns.items()}
+            for group, patterns in SUBJECT_PATTERNS.items()
+        }
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, str], AnswerFeatures]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def extract(self, text: str, subject: str = "general") -> AnswerFeatures:
+        """
+        Features of a normalized answer
+
+        Args:
+            text: Answer after normalize()
+            subject: Subject the answer is marked under
+
+        Returns:
+            AnswerFeatures (shared between callers, treat as read-only)
+        """
+        group = subject_group(subject)
+        key = (group, text)
+        with self._lock:
+            features = self._cache.get(key)
+            if features is not None:
+                self._cache.move_to_end(key)
+        record_cache_lookup('answer_features', features is not None)
+        if features is not None:
+            return features
+
+        counts = {name: len(pattern.findall(text)) for name, pattern in self.patterns[group].items()}
+        features = AnswerFeatures(text, group, counts)
+        if self.cache_size > 0:
+            with self._lock:
+                self._cache[key] = features
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return features
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapse whitespace and drop characters that interfere with analysis"""
+        if not text:
+            return ""
+        return DISALLOWED_CHARACTERS.sub('', WHITESPACE.sub(' ', text.strip()))
+
+    def describe(self) -> Dict[str, List[str]]:
+        """Features counted per subject group"""
+        return {group: list(patterns) for group, patterns in self.patterns.items()}
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from services.metrics import time_stage
+
+logger = logging.getLogger(__name__)
+
+def content_hash(image_data: bytes) -> str:
+    """SHA-256 of the encoded image bytes"""
+    with time_stage('content_hash'):
+        return hashlib.sha256(image_data).hexdigest()
+
+class DuplicateIndex:
+    """
+    Exact-duplicate page index holding the OCR result of every indexed page
+
+    Pages are keyed by the SHA-256 of their bytes, so only the same file
+    uploaded again (e.g. by two TAs) is reused. Near-duplicates are not
+    detected: pages with different answers on the same exam template are
+    only a few bits apart in a perceptual hash, and no cheap comparison of
+    the answer region separated a one-character change from a recompressed
+    or shifted copy of the same page. Lookups also match on the OCR settings
+    that produced the stored result. The index can be persisted as JSON
+    Lines, appended after each batch, so duplicates are also found across
+    batches and restarts.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 10000):
+        """
+        Initialize the index
+
+        Args:
+            path: JSON Lines file the index is loaded from and appended to (None = memory only)
+            max_entries: Most recent entries kept; the file is compacted once it holds twice as many
+        """
+        self.path = Path(path) if path else None
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._pending = []
+        self._file_entries = 0
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+
+        if self.path and self.path.exists():
+            self.load()
+
+    @classmethod
+    def from_env(cls) -> "DuplicateIndex":
+        """Build the index from DEDUP_* environment variables"""
+        return cls(
+            path=os.getenv('DEDUP_INDEX_PATH') or None,
+            max_entries=int(os.getenv('DEDUP_MAX_ENTRIES', '10000'))
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(digest: str, settings: Dict[str, Any]) -> tuple:
+        return (digest,) + tuple(sorted(settings.items()))
+
+    def find(self, digest: str, **settings) -> Optional[Dict[str, Any]]:
+        """
+        Indexed copy of a page that was processed with the same settings
+
+        Args:
+            digest: Content hash of the page (see content_hash)
+            settings: OCR settings the stored result must match (e.g. language)
+
+        Returns:
+            Stored entry, or None
+        """
+        with self._lock:
+            return self._entries.get(self._key(digest, settings))
+
+    def add(self, digest: str, settings: Dict[str, Any], record: Dict[str, Any]):
+        """Index a page and the OCR result to reuse for its duplicates"""
+        entry = dict(record, **settings, content_hash=digest, settings=sorted(settings), indexed_at=time.time())
+        key = self._key(digest, settings)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._pending.append(entry)
+
+    def _insert_locked(self, entry: Dict[str, Any]):
+        settings = {name: entry.get(name) for name in entry.get('settings', [])}
+        key = self._key(entry['content_hash'], settings)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+
+    def load(self):
+        """Load the newest entries from the index file (lines cut short by a crash are skipped)"""
+        entries = []
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except Exception as e:
+            logger.warning(f"Failed to load duplicate index {self.path}: {e}")
+            return
+
+        self._file_entries = len(entries)
+        with self._lock:
+            self._entries.clear()
+            for entry in entries:
+                if 'content_hash' in entry:
+                    self._insert_locked(entry)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._pending = []
+        logger.info(f"✅ Loaded {len(self._entries)} pages into the duplicate index")
+
+    def save(self):
+        """
+        Append pages indexed since the last save to the index file
+
+        Only new entries are written; once the file holds more than twice
+        max_entries it is rewritten with the current ones. Blocking file I/O,
+        so async callers run it in a thread. No-op without a path or changes.
+        """
+        if self.path is None:
+            return
+
+        with self._save_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                if not pending:
+                    return
+                compact = self._file_entries + len(pending) > self.max_entries * 2
+                entries: List[Dict[str, Any]] = list(self._entries.values()) if compact else pending
+
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                lines = ''.join(json.dumps(entry) + '\n' for entry in entries)
+                if compact:
+                    tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+                    with open(tmp_path, 'w') as f:
+                        f.write(lines)
+                    os.replace(tmp_path, self.path)
+                    self._file_entries = len(entries)
+                else:
+                    with open(self.path, 'a') as f:
+                        f.write(lines)
+                    self._file_entries += len(entries)
+            except Exception as e:
+                logger.warning(f"Failed to save duplicate index {self.path}: {e}")
+                # Retry these entries with the next save
+                with self._lock:
+                    self._pending = pending + self._pending
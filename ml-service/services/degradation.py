@@ -0,0 +1,184 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+import numpy as np
+
+from services.metrics import QUEUE_DEPTH, DEGRADATION_LEVEL, DEGRADED_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Response header carrying the level applied to a request
+DEGRADATION_HEADER = "X-DeciGarde-Degradation"
+
+class DegradationPolicy:
+    """What the service gives up at one degradation level"""
+
+    def __init__(self, level: int, mode: str, marking_approaches: Optional[Tuple[str, ...]] = None,
+                 max_ocr_engines: Optional[int] = None, max_image_side: Optional[int] = None):
+        """
+        Args:
+            level: 0 (normal) upwards
+            mode: Short name reported to clients
+            marking_approaches: Marking approaches that run (default: all)
+            max_ocr_engines: OCR engines per page (default: as scheduled)
+            max_image_side: Pages are downscaled to this longest side before OCR (default: full resolution)
+        """
+        self.level = level
+        self.mode = mode
+        self.marking_approaches = marking_approaches
+        self.max_ocr_engines = max_ocr_engines
+        self.max_image_side = max_image_side
+
+    def describe(self) -> Dict[str, Any]:
+        return {"level": self.level, "mode": self.mode}
+
+def build_policies(max_image_side: int = 2000, minimal_max_image_side: int = 1400) -> List[DegradationPolicy]:
+    """
+    Degradation levels from normal service to the cheapest useful answer
+
+    Each level keeps the savings of the levels below it.
+    """
+    return [
+        DegradationPolicy(0, 'normal'),
+        DegradationPolicy(1, 'no_llm', marking_approaches=('keyword', 'semantic', 'content')),
+        DegradationPolicy(2, 'single_ocr_engine', marking_approaches=('keyword', 'semantic', 'content'),
+                          max_ocr_engines=1, max_image_side=max_image_side),
+        DegradationPolicy(3, 'keyword_only', marking_approaches=('keyword',),
+                          max_ocr_engines=1, max_image_side=minimal_max_image_side)
+    ]
+
+def _parse_thresholds(value: str) -> List[float]:
+    """'8,16,32' -> thresholds for levels 1, 2, 3 (empty or 0 entries never trigger)"""
+    return [float(item) for item in value.split(',') if item.strip()]
+
+class DegradationController:
+    """
+    Picks the degradation level for each request from load signals
+
+    Two signals raise the level: requests waiting for a model worker (level n
+    once the depth reaches the n-th queue threshold) and the p95 latency of
+    recent requests relative to the latency SLO (level n once p95 / SLO
+    reaches the n-th ratio). The higher of the two applies. The level rises
+    as soon as a signal crosses a threshold but falls one step at a time, at
+    most once per ``cooldown`` seconds, so it does not flap at the boundary.
+    """
+
+    def __init__(self, policies: Optional[List[DegradationPolicy]] = None, enabled: bool = True,
+                 queue_thresholds: Optional[List[float]] = None, latency_slo: float = 0.0,
+                 latency_ratios: Optional[List[float]] = None, window: int = 50, cooldown: float = 15.0,
+                 forced_level: Optional[int] = None, queue_depth: Optional[Callable[[], float]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            policies: Levels, index = level (default: build_policies())
+            enabled: When false every request runs at level 0 unless a level is forced
+            queue_thresholds: Waiting requests that trigger levels 1, 2, 3...
+            latency_slo: p95 request latency target in seconds (0 = latency never degrades)
+            latency_ratios: p95 / SLO ratios that trigger levels 1, 2, 3...
+            window: Recent request latencies the p95 is taken over
+            cooldown: Seconds between one-step decreases of the level
+            forced_level: Always use this level (operations and load tests)
+            queue_depth: Load signal (default: requests waiting for the request worker pool)
+            clock: Time source
+        """
+        self.policies = policies or build_policies()
+        self.enabled = enabled
+        self.queue_thresholds = queue_thresholds or []
+        self.latency_slo = latency_slo
+        self.latency_ratios = latency_ratios or [1.0, 1.5, 2.5]
+        self.cooldown = cooldown
+        self.forced_level = forced_level
+        self._queue_depth = queue_depth or QUEUE_DEPTH.labels(queue='worker_pool').get
+        self._clock = clock
+        self._latencies = deque(maxlen=window)
+        self._level = 0
+        self._changed_at = clock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "DegradationController":
+        """Build the controller from ML_DEGRADATION* and ML_LATENCY_SLO_SECONDS settings"""
+        forced = os.getenv('ML_DEGRADATION_FORCE_LEVEL', '')
+        return cls(
+            policies=build_policies(int(os.getenv('ML_DEGRADE_MAX_SIDE', '2000')),
+                                    int(os.getenv('ML_DEGRADE_MINIMAL_MAX_SIDE', '1400'))),
+            enabled=os.getenv('ML_DEGRADATION', 'true').lower() == 'true',
+            queue_thresholds=_parse_thresholds(os.getenv('ML_DEGRADE_QUEUE_DEPTHS', '8,16,32')),
+            latency_slo=float(os.getenv('ML_LATENCY_SLO_SECONDS', '0')),
+            latency_ratios=_parse_thresholds(os.getenv('ML_DEGRADE_LATENCY_RATIOS', '1.0,1.5,2.5')),
+            window=int(os.getenv('ML_DEGRADE_WINDOW', '50')),
+            cooldown=float(os.getenv('ML_DEGRADE_COOLDOWN_SECONDS', '15')),
+            forced_level=int(forced) if forced.strip() else None
+        )
+
+    @property
+    def max_level(self) -> int:
+        return len(self.policies) - 1
+
+    def record_latency(self, seconds: float):
+        """Add one completed request to the latency window"""
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def latency_p95(self) -> float:
+        with self._lock:
+            latencies = list(self._latencies)
+        return float(np.percentile(latencies, 95)) if latencies else 0.0
+
+    @staticmethod
+    def _level_for(value: float, thresholds: List[float]) -> int:
+        return sum(1 for threshold in thresholds if threshold > 0 and value >= threshold)
+
+    def target_level(self) -> int:
+        """Level the load signals call for right now"""
+        level = self._level_for(self._queue_depth(), self.queue_thresholds)
+        if self.latency_slo > 0:
+            level = max(level, self._level_for(self.latency_p95() / self.latency_slo, self.latency_ratios))
+        return min(level, self.max_level)
+
+    def current(self) -> DegradationPolicy:
+        """Policy for a request starting now"""
+        if self.forced_level is not None:
+            return self.policies[min(max(self.forced_level, 0), self.max_level)]
+        if not self.enabled:
+            return self.policies[0]
+
+        target = self.target_level()
+        now = self._clock()
+        with self._lock:
+            previous = self._level
+            if target > self._level:
+                self._level = target
+                self._changed_at = now
+            elif target < self._level and now - self._changed_at >= self.cooldown:
+                self._level -= 1
+                self._changed_at = now
+            level = self._level
+
+        if level != previous:
+            DEGRADATION_LEVEL.set(level)
+            log = logger.warning if level > previous else logger.info
+            log(f"🚦 Degradation level {previous} -> {level} ({self.policies[level].mode})")
+        return self.policies[level]
+
+    def tag(self, policy: DegradationPolicy):
+        """Count a request served at the policy's level"""
+        DEGRADED_REQUESTS.labels(level=str(policy.level), mode=policy.mode).inc()
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "forced_level": self.forced_level,
+            "level": self._level if self.forced_level is None else self.forced_level,
+            "queue_depth": self._queue_depth(),
+            "queue_thresholds": self.queue_thresholds,
+            "latency_slo": self.latency_slo,
+            "latency_ratios": self.latency_ratios,
+            "latency_p95": self.latency_p95(),
+            "cooldown": self.cooldown,
+            "levels": [policy.describe() for policy in self.policies]
+        }
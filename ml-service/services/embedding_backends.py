@@ -0,0 +1,168 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+
+try:
+    from tokenizers import Tokenizer
+    from services.onnx_ocr import create_session, ONNXRUNTIME_AVAILABLE
+    ONNX_EMBEDDING_AVAILABLE = ONNXRUNTIME_AVAILABLE
+except ImportError:
+    ONNX_EMBEDDING_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+MANIFEST_NAME = 'manifest.json'
+
+class SentenceTransformerBackend:
+    """Embeddings from the sentence-transformers model in PyTorch (fp32)"""
+
+    name = 'sentence_transformer'
+
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, max_seq_length: Optional[int] = None,
+                 threads: int = 0):
+        """
+        Load the model
+
+        Args:
+            model_name: sentence-transformers model name or local path
+            max_seq_length: Tokens kept per text (default: the model's own limit)
+            threads: PyTorch intra-op threads (0 = PyTorch default)
+        """
+        if threads > 0:
+            import torch
+            torch.set_num_threads(threads)
+        self.model = SentenceTransformer(model_name, device='cpu')
+        if max_seq_length:
+            self.model.max_seq_length = max_seq_length
+        self.model_name = model_name
+        self.threads = threads
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of texts; one row per text"""
+        return self.model.encode(texts, batch_size=max(len(texts), 1), convert_to_numpy=True)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "model": self.model_name,
+            "max_seq_length": self.model.max_seq_length,
+            "threads": self.threads
+        }
+
+class ONNXEmbeddingBackend:
+    """
+    Embeddings from an ONNX export of the sentence-transformers model
+
+    Reads a directory written by ``export_onnx_models.py embedding``: the
+    transformer as fp32 and int8 ONNX, its tokenizer.json and a manifest. Token
+    embeddings are mean-pooled over the attention mask and L2-normalized, as the
+    sentence-transformers pipeline for all-MiniLM-L6-v2 does.
+    """
+
+    name = 'sentence_transformer_onnx'
+
+    def __init__(self, model_dir: str, precision: str = 'int8', threads: int = 0,
+                 max_seq_length: Optional[int] = None):
+        """
+        Load the exported model
+
+        Args:
+            model_dir: Directory containing manifest.json
+            precision: 'int8' (quantized model, fp32 if not exported) or 'fp32'
+            threads: ONNX Runtime intra-op threads (0 = one per core)
+            max_seq_length: Tokens kept per text (default: the limit recorded at export)
+        """
+        if not ONNX_EMBEDDING_AVAILABLE:
+            raise ImportError("onnxruntime and tokenizers are required for the ONNX embedding backend")
+
+        self.model_dir = Path(model_dir)
+        with open(self.model_dir / MANIFEST_NAME) as f:
+            self.manifest = json.load(f)
+
+        self.model_file = self.manifest['model'].get(precision) or self.manifest['model']['fp32']
+        self.session = create_session(self.model_dir / self.model_file, intra_op_threads=threads)
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        self.threads = threads
+        self.max_seq_length = max_seq_length or self.manifest.get('max_seq_length', 256)
+        self.normalize = self.manifest.get('normalize', True)
+
+        self.tokenizer = Tokenizer.from_file(str(self.model_dir / self.manifest['tokenizer']))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding(pad_id=self.manifest.get('pad_token_id', 0))
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of texts; one row per text"""
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        mask = attention_mask[:, :, np.newaxis].astype(np.float32)
+        embeddings = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "model": self.model_file,
+            "source": self.manifest.get('source'),
+            "max_seq_length": self.max_seq_length,
+            "threads": self.threads
+        }
+
+def create_embedding_backend(backend: Optional[str] = None):
+    """
+    Build the embedding backend selected by configuration
+
+    Args:
+        backend: 'sentence_transformers', 'onnx' or 'none' (default: EMBEDDING_BACKEND)
+
+    Environment:
+        SENTENCE_TRANSFORMER_MODEL: sentence-transformers model name (default all-MiniLM-L6-v2)
+        EMBEDDING_MODEL_DIR: Directory from ``export_onnx_models.py embedding`` (onnx backend)
+        EMBEDDING_PRECISION: int8 or fp32 (onnx backend)
+        EMBEDDING_THREADS: Inference threads (0 = library default)
+        EMBEDDING_MAX_SEQ_LENGTH: Tokens kept per text (0 = model default)
+
+    Returns:
+        Backend with encode()/describe(), or None when no backend can be loaded
+    """
+    backend = (backend or os.getenv('EMBEDDING_BACKEND', 'sentence_transformers')).lower()
+    threads = int(os.getenv('EMBEDDING_THREADS') or 0)
+    max_seq_length = int(os.getenv('EMBEDDING_MAX_SEQ_LENGTH', '0')) or None
+
+    if backend == 'none':
+        return None
+
+    if backend == 'onnx':
+        model_dir = os.getenv('EMBEDDING_MODEL_DIR')
+        if not model_dir:
+            logger.warning("⚠️  EMBEDDING_BACKEND=onnx but EMBEDDING_MODEL_DIR is not set")
+        elif not ONNX_EMBEDDING_AVAILABLE:
+            logger.warning("⚠️  EMBEDDING_BACKEND=onnx but onnxruntime/tokenizers are not installed")
+        else:
+            return ONNXEmbeddingBackend(model_dir, precision=os.getenv('EMBEDDING_PRECISION', 'int8'),
+                                        threads=threads, max_seq_length=max_seq_length)
+        logger.info("ℹ️  Falling back to the sentence-transformers embedding backend")
+
+    if SENTENCE_TRANSFORMERS_AVAILABLE:
+        return SentenceTransformerBackend(os.getenv('SENTENCE_TRANSFORMER_MODEL', DEFAULT_EMBEDDING_MODEL),
+                                          max_seq_length=max_seq_length, threads=threads)
+    return None
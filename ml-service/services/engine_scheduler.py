@@ -0,0 +1,248 @@
+import logging
+import os
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+from services.metrics import QUEUE_DEPTH, OCR_ENGINE_DECISIONS
+from services.ocr_engines import OCREngine
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_MODES = ('all', 'cascade')
+
+# Quality assumed for an engine before it has been compared with other engines
+PRIOR_AGREEMENT = 0.5
+
+def _ewma(current: Optional[float], sample: float, alpha: float) -> float:
+    return sample if current is None else current + alpha * (sample - current)
+
+class EngineStats:
+    """Running quality statistics of one OCR engine"""
+
+    def __init__(self):
+        self.runs = 0
+        self.empty_rate = 0.0
+        self.confidence = None
+        # Text similarity with the other engines' readings, only sampled when several engines produced text
+        self.agreement = None
+        self.agreement_samples = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "empty_rate": self.empty_rate,
+            "confidence": self.confidence,
+            "agreement": self.agreement,
+            "agreement_samples": self.agreement_samples
+        }
+
+class SchedulePlan:
+    """Engines chosen for one page, and what became of the others"""
+
+    def __init__(self, mode: str, engines: List[OCREngine], skipped: Dict[str, str], cascade: bool,
+                 estimated_seconds: float, queue_depth: float, shedding: bool):
+        self.mode = mode
+        self.engines = engines
+        self.skipped = skipped
+        self.cascade = cascade
+        self.estimated_seconds = estimated_seconds
+        self.queue_depth = queue_depth
+        self.shedding = shedding
+        self.ran: List[str] = []
+        self.stopped_early = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "order": [engine.name for engine in self.engines],
+            "ran": self.ran,
+            "skipped": self.skipped,
+            "stopped_early": self.stopped_early,
+            "estimated_seconds": self.estimated_seconds,
+            "queue_depth": self.queue_depth,
+            "shedding": self.shedding
+        }
+
+class EngineScheduler:
+    """
+    Chooses which OCR engines read each page, from running engine statistics
+
+    Each engine's cost comes from its measured seconds per megapixel; its
+    quality from how often it returns nothing and how closely its text agrees
+    with the other engines' readings of the same page. In ``cascade`` mode engines run cheapest-per-quality
+    first and the page stops as soon as a trusted engine (enough agreement
+    samples, agreement above ``min_agreement``) reads it at ``target_confidence``.
+    Until engines are trusted, and on every ``explore_every``-th page, all
+    engines run so the statistics stay current. ``all`` mode runs every engine,
+    as OCRService always did. In either mode, once ``shed_queue_depth`` requests
+    are waiting for a worker only the best-value engine runs.
+    """
+
+    def __init__(self, mode: str = 'cascade', target_confidence: float = 0.85, min_agreement: float = 0.7,
+                 min_samples: int = 10, explore_every: int = 25, shed_queue_depth: int = 0,
+                 alpha: float = 0.1, queue_depth: Optional[Callable[[], float]] = None, history: int = 50):
+        """
+        Args:
+            mode: 'cascade' or 'all'
+            target_confidence: Confidence at which a trusted engine's reading ends a cascade
+            min_agreement: Agreement with other engines an engine needs to be trusted
+            min_samples: Agreement samples an engine needs to be trusted
+            explore_every: Run every engine on one page in this many (0 = never once trusted)
+            shed_queue_depth: Waiting requests at which only one engine runs (0 = never shed)
+            alpha: Weight of each new sample in the running statistics
+            queue_depth: Load signal (default: requests waiting for the request worker pool)
+            history: Recent decisions kept for report()
+        """
+        if mode not in SCHEDULER_MODES:
+            raise ValueError(f"Unknown OCR scheduler mode '{mode}' (expected one of {SCHEDULER_MODES})")
+        self.mode = mode
+        self.target_confidence = target_confidence
+        self.min_agreement = min_agreement
+        self.min_samples = min_samples
+        self.explore_every = explore_every
+        self.shed_queue_depth = shed_queue_depth
+        self.alpha = alpha
+        self._queue_depth = queue_depth or QUEUE_DEPTH.labels(queue='worker_pool').get
+        self._stats: Dict[str, EngineStats] = {}
+        self._pages = 0
+        self._decisions = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, mode: Optional[str] = None) -> "EngineScheduler":
+        """
+        Build the scheduler from OCR_SCHEDULER* and OCR_SHED_QUEUE_DEPTH settings
+
+        Args:
+            mode: Override OCR_SCHEDULER
+        """
+        return cls(
+            mode=(mode or os.getenv('OCR_SCHEDULER', 'cascade')).lower(),
+            target_confidence=float(os.getenv('OCR_TARGET_CONFIDENCE', '0.85')),
+            min_agreement=float(os.getenv('OCR_SCHEDULER_MIN_AGREEMENT', '0.7')),
+            min_samples=int(os.getenv('OCR_SCHEDULER_MIN_SAMPLES', '10')),
+            explore_every=int(os.getenv('OCR_SCHEDULER_EXPLORE_EVERY', '25')),
+            shed_queue_depth=int(os.getenv('OCR_SHED_QUEUE_DEPTH', '0'))
+        )
+
+    def stats(self, name: str) -> EngineStats:
+        with self._lock:
+            return self._stats.setdefault(name, EngineStats())
+
+    def is_trusted(self, name: str) -> bool:
+        stats = self.stats(name)
+        return stats.agreement_samples >= self.min_samples and stats.agreement >= self.min_agreement
+
+    def quality(self, name: str) -> float:
+        """Expected usefulness of an engine's reading, between 0 and 1"""
+        stats = self.stats(name)
+        agreement = stats.agreement if stats.agreement is not None else PRIOR_AGREEMENT
+        return agreement * (1.0 - stats.empty_rate)
+
+    def rank(self, engines: List[OCREngine], image_shape: Tuple[int, ...]) -> List[OCREngine]:
+        """Engines by expected seconds per unit of quality, best value first"""
+        return sorted(engines, key=lambda e: e.cost_estimate(image_shape) / max(self.quality(e.name), 0.05))
+
+    def plan(self, candidates: List[OCREngine], image_shape: Tuple[int, ...],
+             max_engines: Optional[int] = None) -> SchedulePlan:
+        """
+        Choose the engines for one page
+
+        Args:
+            candidates: Engines eligible for the request, in registration order
+            image_shape: Shape of the page
+            max_engines: Run at most this many engines (default: no limit)
+
+        Returns:
+            SchedulePlan; call finish() once the engines have run
+        """
+        queue_depth = self._queue_depth()
+        shedding = self.shed_queue_depth > 0 and queue_depth >= self.shed_queue_depth
+        if shedding:
+            max_engines = 1
+
+        with self._lock:
+            self._pages += 1
+            explore = self.explore_every > 0 and self._pages % self.explore_every == 0
+
+        cascade = self.mode == 'cascade' and not explore
+        ordered = self.rank(candidates, image_shape) if (self.mode == 'cascade' or max_engines) else list(candidates)
+        skipped = {}
+        if max_engines is not None and len(ordered) > max_engines:
+            for engine in ordered[max_engines:]:
+                skipped[engine.name] = 'shed' if shedding else 'engine_limit'
+            ordered = ordered[:max_engines]
+
+        return SchedulePlan(
+            mode=self.mode,
+            engines=ordered,
+            skipped=skipped,
+            cascade=cascade,
+            estimated_seconds=sum(engine.cost_estimate(image_shape) for engine in ordered),
+            queue_depth=queue_depth,
+            shedding=shedding
+        )
+
+    def satisfied(self, plan: SchedulePlan, results: List[Dict[str, Any]]) -> bool:
+        """Whether a cascade can stop: a trusted engine read the page at the target confidence"""
+        return plan.cascade and any(
+            result['text'].strip() and result['confidence'] >= self.target_confidence
+            and self.is_trusted(result['provider'])
+            for result in results
+        )
+
+    def finish(self, plan: SchedulePlan, outcomes: Dict[str, Tuple[str, float]], agreements: Dict[str, float]):
+        """
+        Record what the engines returned
+
+        Args:
+            plan: The page's plan; engines that were not reached are marked skipped
+            outcomes: {engine: (text, confidence)} for each engine that ran
+            agreements: {engine: similarity with the other engines' text}, empty when fewer than two read text
+        """
+        for engine in plan.engines:
+            if engine.name not in outcomes and engine.name not in plan.skipped:
+                plan.skipped[engine.name] = 'target_met'
+        plan.stopped_early = any(reason == 'target_met' for reason in plan.skipped.values())
+
+        for name, (text, confidence) in outcomes.items():
+            stats = self.stats(name)
+            with self._lock:
+                stats.runs += 1
+                stats.empty_rate = _ewma(stats.empty_rate if stats.runs > 1 else None,
+                                         0.0 if text.strip() else 1.0, self.alpha)
+                if text.strip():
+                    stats.confidence = _ewma(stats.confidence, confidence, self.alpha)
+                if name in agreements:
+                    stats.agreement = _ewma(stats.agreement, agreements[name], self.alpha)
+                    stats.agreement_samples += 1
+            OCR_ENGINE_DECISIONS.labels(engine=name, decision='ran').inc()
+
+        for name, reason in plan.skipped.items():
+            OCR_ENGINE_DECISIONS.labels(engine=name, decision=reason).inc()
+
+        with self._lock:
+            self._decisions.append(plan.to_dict())
+
+    def report(self) -> Dict[str, Any]:
+        """Settings, per-engine statistics and recent decisions"""
+        with self._lock:
+            engines = {name: stats.to_dict() for name, stats in self._stats.items()}
+            recent = list(self._decisions)
+        for name, stats in engines.items():
+            stats["trusted"] = self.is_trusted(name)
+            stats["quality"] = self.quality(name)
+
+        return {
+            "mode": self.mode,
+            "target_confidence": self.target_confidence,
+            "min_agreement": self.min_agreement,
+            "min_samples": self.min_samples,
+            "explore_every": self.explore_every,
+            "shed_queue_depth": self.shed_queue_depth,
+            "queue_depth": self._queue_depth(),
+            "pages": self._pages,
+            "engines": engines,
+            "recent_decisions": recent
+        }
@@ -3,9 +3,14 @@ import numpy as np
 from PIL import Image
 import io
 import logging
+import os
 from typing import Union, Tuple
 import time
 
+from services.image_decoder import decode_image
+from services.metrics import time_stage
+from services.tracing import span
+
 logger = logging.getLogger(__name__)
 
 class ImagePreprocessor:
@@ -16,6 +21,39 @@ class ImagePreprocessor:
     def __init__(self):
         self.supported_formats = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff']
         
+        # Largest (width, height) each pipeline works at; pages are decoded no larger than this
+        self.handwriting_max_size = (2000, 3000)
+        self.printed_max_size = (3000, 4000)
+        
+        # Quality gate thresholds, measured on the downsampled triage image
+        self.triage_max_dimension = int(os.getenv('TRIAGE_MAX_DIMENSION', '800'))
+        # Page deskew: projection-profile search on a downsampled copy
+        self.deskew_max_dimension = int(os.getenv('DESKEW_MAX_DIMENSION', '1000'))
+        self.deskew_max_angle = float(os.getenv('DESKEW_MAX_ANGLE', '15'))
+        self.deskew_min_angle = float(os.getenv('DESKEW_MIN_ANGLE', '0.3'))
+        self.deskew_min_confidence = float(os.getenv('DESKEW_MIN_CONFIDENCE', '0.3'))
+        self.deskew_max_points = 40000
+        
+        # Quality analysis runs on a downsampled copy; 0 analyzes at full resolution
+        self.quality_max_dimension = int(os.getenv('QUALITY_ANALYSIS_MAX_DIMENSION', '1600'))
+        # Laplacian variance below which a page is blurry, at full resolution
+        self.quality_min_sharpness = 100.0
+        self.quality_min_contrast = 30.0
+        # Largest full-vs-reduced brightness drift; closer to a threshold, analyze at full size
+        self.quality_brightness_margin = 1.0
+        self.triage_thresholds = {
+            # Reject: blank, featureless or hopelessly blurred pages
+            'reject_min_components': int(os.getenv('TRIAGE_REJECT_MIN_COMPONENTS', '3')),
+            'reject_min_contrast': float(os.getenv('TRIAGE_REJECT_MIN_CONTRAST', '8')),
+            'reject_min_sharpness': float(os.getenv('TRIAGE_REJECT_MIN_SHARPNESS', '10')),
+            # Light path: clean printed pages
+            'printed_max_height_cv': float(os.getenv('TRIAGE_PRINTED_MAX_HEIGHT_CV', '0.35')),
+            'light_min_ink_contrast': float(os.getenv('TRIAGE_LIGHT_MIN_INK_CONTRAST', '60')),
+            'light_min_sharpness': float(os.getenv('TRIAGE_LIGHT_MIN_SHARPNESS', '150')),
+            'light_min_brightness': float(os.getenv('TRIAGE_LIGHT_MIN_BRIGHTNESS', '40')),
+            'light_max_brightness': float(os.getenv('TRIAGE_LIGHT_MAX_BRIGHTNESS', '254'))
+        }
+        
     def preprocess(self, image_data: bytes, enhance_handwriting: bool = True) -> bytes:
         """
         Preprocess image for optimal OCR performance
@@ -30,9 +68,11 @@ class ImagePreprocessor:
         try:
             start_time = time.time()
             
-            # Convert bytes to numpy array
-            nparr = np.frombuffer(image_data, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            # Decode straight to grayscale at no more than the pipeline's working size
+            max_width, max_height = self.handwriting_max_size if enhance_handwriting else self.printed_max_size
+            with time_stage('decode', input_bytes=len(image_data)) as decode_span:
+                image, _ = decode_image(image_data, max_width=max_width, max_height=max_height, grayscale=True)
+                decode_span.set_image(image)
             
             if image is None:
                 raise ValueError("Failed to decode image")
@@ -40,13 +80,15 @@ class ImagePreprocessor:
             logger.info(f"Starting image preprocessing. Original size: {image.shape}")
             
             # Apply preprocessing pipeline
-            if enhance_handwriting:
-                processed_image = self._preprocess_for_handwriting(image)
-            else:
-                processed_image = self._preprocess_for_printed_text(image)
+            with time_stage('preprocess', mode='handwriting' if enhance_handwriting else 'printed'):
+                if enhance_handwriting:
+                    processed_image = self._preprocess_for_handwriting(image)
+                else:
+                    processed_image = self._preprocess_for_printed_text(image)
             
             # Convert back to bytes
-            success, buffer = cv2.imencode('.png', processed_image)
+            with time_stage('encode'):
+                success, buffer = cv2.imencode('.png', processed_image)
             if not success:
                 raise ValueError("Failed to encode processed image")
             
@@ -72,33 +114,49 @@ class ImagePreprocessor:
         """
         try:
             # Step 1: Resize if too large (maintain aspect ratio)
-            image = self._resize_image(image, max_width=2000, max_height=3000)
+            with span('resize') as step:
+                image = self._resize_image(image, *self.handwriting_max_size)
+                step.set_image(image)
             
             # Step 2: Convert to grayscale
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            with span('grayscale') as step:
+                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+                step.set_image(gray)
             
             # Step 3: Noise reduction using bilateral filter
-            denoised = cv2.bilateralFilter(gray, 9, 75, 75)
+            with span('bilateral_filter') as step:
+                denoised = cv2.bilateralFilter(gray, 9, 75, 75)
+                step.set_image(denoised)
             
             # Step 4: Contrast enhancement using CLAHE
-            clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-            enhanced = clahe.apply(denoised)
+            with span('clahe') as step:
+                clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+                enhanced = clahe.apply(denoised)
+                step.set_image(enhanced)
             
             # Step 5: Adaptive thresholding for better text separation
-            binary = cv2.adaptiveThreshold(
-                enhanced, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                cv2.THRESH_BINARY, 11, 2
-            )
+            with span('adaptive_threshold') as step:
+                binary = cv2.adaptiveThreshold(
+                    enhanced, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+                    cv2.THRESH_BINARY, 11, 2
+                )
+                step.set_image(binary)
             
             # Step 6: Morphological operations to clean up text
-            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
-            cleaned = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
+            with span('morphology_close') as step:
+                kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2, 2))
+                cleaned = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
+                step.set_image(cleaned)
             
             # Step 7: Remove small noise
-            cleaned = self._remove_small_noise(cleaned, min_area=50)
+            with span('remove_small_noise') as step:
+                cleaned = self._remove_small_noise(cleaned, min_area=50)
+                step.set_image(cleaned)
             
             # Step 8: Final enhancement
-            final = self._enhance_text_edges(cleaned)
+            with span('enhance_text_edges') as step:
+                final = self._enhance_text_edges(cleaned)
+                step.set_image(final)
             
             return final
             
@@ -118,20 +176,30 @@ class ImagePreprocessor:
         """
         try:
             # Step 1: Resize if too large
-            image = self._resize_image(image, max_width=3000, max_height=4000)
+            with span('resize') as step:
+                image = self._resize_image(image, *self.printed_max_size)
+                step.set_image(image)
             
             # Step 2: Convert to grayscale
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            with span('grayscale') as step:
+                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+                step.set_image(gray)
             
             # Step 3: Simple noise reduction
-            denoised = cv2.medianBlur(gray, 3)
+            with span('median_blur') as step:
+                denoised = cv2.medianBlur(gray, 3)
+                step.set_image(denoised)
             
             # Step 4: Contrast enhancement
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-            enhanced = clahe.apply(denoised)
+            with span('clahe') as step:
+                clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+                enhanced = clahe.apply(denoised)
+                step.set_image(enhanced)
             
             # Step 5: Binary thresholding
-            _, binary = cv2.threshold(enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            with span('otsu_threshold') as step:
+                _, binary = cv2.threshold(enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+                step.set_image(binary)
             
             return binary
             
@@ -227,105 +295,432 @@ class ImagePreprocessor:
             logger.warning(f"Edge enhancement failed: {e}")
             return image
     
-    def analyze_image_quality(self, image_data: bytes) -> dict:
+    def triage(self, image_data: bytes) -> dict:
         """
-        Analyze image quality and provide recommendations
+        Cheap quality and content triage deciding which OCR pipeline a page needs
+        
+        Runs on a downsampled grayscale copy. Clean printed pages are routed to the
+        light (Tesseract-only) path, handwritten or low-quality pages to the full
+        multi-engine path, and unreadable pages are rejected.
         
         Args:
             image_data: Raw image bytes
             
         Returns:
-            Quality analysis results
+            Triage result with route ('light', 'full' or 'reject'), reason and metrics
         """
+        start_time = time.time()
+        
         try:
-            # Convert bytes to numpy array
-            nparr = np.frombuffer(image_data, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            with time_stage('triage') as triage_span:
+                # Sharpness thresholds were calibrated on an area resize of the full decode
+                small, (width, height) = decode_image(image_data, self.triage_max_dimension,
+                                                      self.triage_max_dimension, grayscale=True, oversample=2)
+                
+                if small is None:
+                    return {"route": "reject", "reason": "Failed to decode image", "processing_time": time.time() - start_time}
+                
+                triage_span.set_image(small)
+                
+                metrics = self._triage_metrics(small)
+                route, reason = self._choose_route(metrics)
+                triage_span.set_attribute('route', route)
             
-            if image is None:
-                return {"error": "Failed to decode image"}
+            return {
+                "route": route,
+                "reason": reason,
+                "is_handwritten": metrics["height_cv"] > self.triage_thresholds['printed_max_height_cv'],
+                "dimensions": {"width": width, "height": height},
+                "metrics": metrics,
+                "processing_time": time.time() - start_time
+            }
             
-            height, width = image.shape[:2]
+        except Exception as e:
+            logger.error(f"Image triage failed: {e}")
+            # Fall back to the full pipeline rather than rejecting a page we could not assess
+            return {"route": "full", "reason": f"Triage failed: {str(e)}", "processing_time": time.time() - start_time}
+    
+    def _triage_metrics(self, gray: np.ndarray) -> dict:
+        """
+        Compute brightness, contrast, sharpness and text-shape statistics
+        
+        Args:
+            gray: Downsampled grayscale image
+            
+        Returns:
+            Dictionary of triage metrics
+        """
+        mean, std = cv2.meanStdDev(gray)
+        sharpness = cv2.Laplacian(gray, cv2.CV_32F).var()
+        
+        # Ink mask and connected components approximate characters/strokes
+        _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        
+        # Separation between paper and ink levels; unlike the global std this stays
+        # high on clean pages that are mostly white paper
+        ink_mask = ink > 0
+        if ink_mask.any() and not ink_mask.all():
+            ink_contrast = float(gray[~ink_mask].mean() - gray[ink_mask].mean())
+        else:
+            ink_contrast = 0.0
+        
+        _, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+        heights = stats[1:, cv2.CC_STAT_HEIGHT]
+        widths = stats[1:, cv2.CC_STAT_WIDTH]
+        
+        # Ignore specks, ruled lines, margins and page borders
+        glyphs = (heights >= 4) & (heights < gray.shape[0] * 0.1) & (widths < gray.shape[1] * 0.3)
+        glyph_heights = heights[glyphs]
+        
+        # Printed glyphs have very regular heights; handwriting varies a lot
+        if len(glyph_heights) > 1:
+            height_cv = float(np.std(glyph_heights) / np.mean(glyph_heights))
+        else:
+            height_cv = 0.0
+        
+        return {
+            "brightness": float(mean[0][0]),
+            "contrast": float(std[0][0]),
+            "sharpness": float(sharpness),
+            "ink_contrast": ink_contrast,
+            "ink_ratio": float(np.count_nonzero(ink)) / ink.size,
+            "components": int(np.count_nonzero(glyphs)),
+            "height_cv": height_cv
+        }
+    
+    def _choose_route(self, metrics: dict) -> Tuple[str, str]:
+        """Map triage metrics to an OCR route and a human-readable reason"""
+        t = self.triage_thresholds
+        
+        if metrics["components"] < t['reject_min_components']:
+            return "reject", "No text detected (blank page)"
+        if metrics["contrast"] < t['reject_min_contrast']:
+            return "reject", "Contrast too low to read"
+        if metrics["sharpness"] < t['reject_min_sharpness']:
+            return "reject", "Image too blurry to read"
+        
+        if metrics["height_cv"] > t['printed_max_height_cv']:
+            return "full", "Handwriting detected"
+        if metrics["ink_contrast"] < t['light_min_ink_contrast']:
+            return "full", "Low contrast"
+        if metrics["sharpness"] < t['light_min_sharpness']:
+            return "full", "Soft focus"
+        if not t['light_min_brightness'] <= metrics["brightness"] <= t['light_max_brightness']:
+            return "full", "Poor exposure"
+        
+        return "light", "Clean printed page"
+    
+    def _profile_score(self, xs: np.ndarray, ys: np.ndarray, angle: float) -> float:
+        """
+        Sharpness of the horizontal projection profile after rotating ink pixels by angle
+        
+        Text lines that are level produce tall, narrow peaks, so the sum of
+        squared bin counts is maximal at the angle that straightens the page.
+        """
+        theta = np.deg2rad(angle)
+        rows = np.round(ys * np.cos(theta) - xs * np.sin(theta)).astype(np.int64)
+        counts = np.bincount(rows - rows.min())
+        return float(np.dot(counts, counts))
+    
+    def _search_skew(self, xs: np.ndarray, ys: np.ndarray) -> Tuple[float, float, float]:
+        """
+        Coarse-to-fine search for the angle with the sharpest projection profile
+        
+        Returns:
+            Tuple of (best angle, best score, mean score over the coarse search)
+        """
+        coarse = np.arange(-self.deskew_max_angle, self.deskew_max_angle + 0.5, 1.0)
+        coarse_scores = [self._profile_score(xs, ys, angle) for angle in coarse]
+        best = float(coarse[int(np.argmax(coarse_scores))])
+        
+        fine = np.arange(best - 1.0, best + 1.05, 0.1)
+        fine_scores = [self._profile_score(xs, ys, angle) for angle in fine]
+        index = int(np.argmax(fine_scores))
+        return float(fine[index]), float(fine_scores[index]), float(np.mean(coarse_scores))
+    
+    def detect_skew(self, gray: np.ndarray) -> dict:
+        """
+        Estimate page skew and orientation from text-line projection profiles
+        
+        Args:
+            gray: Grayscale page (downsampled; a few hundred pixels of text height is enough)
+            
+        Returns:
+            Dictionary with angle (degrees to rotate counter-clockwise to straighten),
+            confidence (0-1) and orientation ('upright', 'sideways' or 'unknown')
+        """
+        # Local threshold keeps pen and print strokes but not dark backgrounds around a photographed page
+        ink = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY_INV, 25, 15)
+        ys, xs = np.nonzero(ink)
+        
+        # Pages that are mostly ink (photos, dark backgrounds) or empty carry no line structure
+        ink_ratio = len(xs) / float(ink.size)
+        if len(xs) < 100 or ink_ratio > 0.5:
+            return {"angle": 0.0, "confidence": 0.0, "orientation": "unknown", "ink_ratio": ink_ratio}
+        
+        if len(xs) > self.deskew_max_points:
+            step = len(xs) // self.deskew_max_points + 1
+            xs, ys = xs[::step], ys[::step]
+        xs = xs.astype(np.float32)
+        ys = ys.astype(np.float32)
+        
+        angle, score, mean_score = self._search_skew(xs, ys)
+        confidence = 1.0 - mean_score / score if score > 0 else 0.0
+        
+        # Text lines running vertically mean the page was photographed sideways; ruled
+        # margins and page edges also produce vertical structure, so leave a band of doubt
+        _, sideways_score, _ = self._search_skew(ys, xs)
+        if sideways_score > 1.5 * score:
+            orientation = "sideways"
+        elif sideways_score > score:
+            orientation = "unknown"
+        else:
+            orientation = "upright"
+        
+        return {
+            "angle": round(angle, 2),
+            "confidence": round(confidence, 3),
+            "orientation": orientation,
+            "ink_ratio": ink_ratio
+        }
+    
+    def deskew_image(self, image: np.ndarray, skew: Union[dict, None] = None) -> Tuple[np.ndarray, dict]:
+        """
+        Rotate a page so its text lines are horizontal
+        
+        Args:
+            image: BGR or grayscale page
+            skew: Result of detect_skew (computed on a downsampled copy if omitted)
             
-            # Calculate image statistics
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        Returns:
+            Tuple of (possibly rotated image, deskew info). info['straightened'] is True
+            when the page is confidently upright after this stage.
+        """
+        if skew is None:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+            gray = self._resize_image(gray, self.deskew_max_dimension, self.deskew_max_dimension)
+            skew = self.detect_skew(gray)
+        
+        confident = skew["confidence"] >= self.deskew_min_confidence and skew["orientation"] == "upright"
+        rotate = confident and abs(skew["angle"]) >= self.deskew_min_angle
+        
+        if rotate:
+            height, width = image.shape[:2]
+            matrix = cv2.getRotationMatrix2D((width / 2, height / 2), skew["angle"], 1.0)
+            image = cv2.warpAffine(image, matrix, (width, height), flags=cv2.INTER_LINEAR,
+                                   borderMode=cv2.BORDER_REPLICATE)
+        
+        return image, dict(skew, rotated=rotate, straightened=confident)
+    
+    def deskew(self, image_data: bytes) -> Tuple[bytes, dict]:
+        """
+        Page-level deskew stage run once before OCR
+        
+        Skew is detected on a reduced grayscale decode; the full image is only
+        decoded, rotated and re-encoded when a correction is needed, so straight
+        pages pass through unchanged.
+        
+        Args:
+            image_data: Raw image bytes
             
-            # Brightness analysis
-            mean_brightness = np.mean(gray)
-            std_brightness = np.std(gray)
+        Returns:
+            Tuple of (image bytes, deskew info with angle, confidence, orientation,
+            rotated and straightened)
+        """
+        start_time = time.time()
+        
+        try:
+            with time_stage('deskew') as deskew_span:
+                gray, _ = decode_image(image_data, self.deskew_max_dimension, self.deskew_max_dimension, grayscale=True)
+                if gray is None:
+                    raise ValueError("Failed to decode image")
+                
+                skew = self.detect_skew(gray)
+                deskew_span.set_attribute('angle', skew['angle'])
+                deskew_span.set_attribute('confidence', skew['confidence'])
+                
+                info = dict(skew, rotated=False,
+                            straightened=skew["confidence"] >= self.deskew_min_confidence and skew["orientation"] == "upright")
+                if info["straightened"] and abs(skew["angle"]) >= self.deskew_min_angle:
+                    image, _ = decode_image(image_data)
+                    image, info = self.deskew_image(image, skew)
+                    # High-quality JPEG: PNG of a noisy phone photo takes ~1s to encode at 12 MP
+                    success, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 95])
+                    if not success:
+                        raise ValueError("Failed to encode deskewed image")
+                    image_data = buffer.tobytes()
+            
+            info["processing_time"] = time.time() - start_time
+            return image_data, info
             
-            # Contrast analysis
-            contrast = np.std(gray)
+        except Exception as e:
+            logger.error(f"Deskew failed: {e}")
+            return image_data, {"angle": 0.0, "confidence": 0.0, "orientation": "unknown",
+                                "rotated": False, "straightened": False,
+                                "processing_time": time.time() - start_time}
+    
+    def _quality_statistics(self, image_data: bytes, max_dimension: int) -> Union[dict, None]:
+        """Brightness, contrast and Laplacian variance of a grayscale decode no larger than max_dimension"""
+        with time_stage('quality_analysis') as analysis_span:
+            gray, (width, height) = decode_image(image_data, max_dimension or None,
+                                                 max_dimension or None, grayscale=True)
+            if gray is None:
+                return None
+            analysis_span.set_image(gray)
+            
+            # Brightness and contrast (std) in a single pass
+            mean, std = cv2.meanStdDev(gray)
             
             # Sharpness analysis (using Laplacian variance)
-            laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
-            
-            # Quality assessment
-            quality_score = 0
-            recommendations = []
-            
-            # Check resolution
-            if width < 800 or height < 600:
-                quality_score += 20
-                recommendations.append("Image resolution is low. Consider using higher resolution images.")
-            elif width >= 2000 or height >= 1500:
-                quality_score += 30
-            else:
-                quality_score += 25
-            
-            # Check brightness
-            if mean_brightness < 50:
-                quality_score += 15
-                recommendations.append("Image is too dark. Consider improving lighting.")
-            elif mean_brightness > 200:
-                quality_score += 15
-                recommendations.append("Image is too bright. Consider reducing exposure.")
-            else:
-                quality_score += 20
-            
-            # Check contrast
-            if contrast < 30:
-                quality_score += 10
-                recommendations.append("Image has low contrast. Consider enhancing contrast.")
-            else:
-                quality_score += 20
-            
-            # Check sharpness
-            if laplacian_var < 100:
-                quality_score += 10
-                recommendations.append("Image is blurry. Consider using a tripod or improving focus.")
-            else:
-                quality_score += 20
-            
-            # Overall quality
-            if quality_score >= 80:
-                quality_level = "Excellent"
-            elif quality_score >= 60:
-                quality_level = "Good"
-            elif quality_score >= 40:
-                quality_level = "Fair"
-            else:
-                quality_level = "Poor"
+            _, laplacian_std = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_32F))
+        
+        return {
+            "width": width,
+            "height": height,
+            "analysis_width": int(gray.shape[1]),
+            "analysis_height": int(gray.shape[0]),
+            "reduction": max(width, height) / max(gray.shape[:2]),
+            "brightness": float(mean[0, 0]),
+            "contrast": float(std[0, 0]),
+            "laplacian_variance": float(laplacian_std[0, 0]) ** 2
+        }
+    
+    def _needs_full_resolution(self, stats: dict) -> bool:
+        """Whether the full-resolution brightness or contrast verdict could differ from the reduced one"""
+        near_brightness = min(abs(stats["brightness"] - 50), abs(stats["brightness"] - 200)) < self.quality_brightness_margin
+        # Downscaling averages pixels and only ever lowers the standard deviation
+        low_contrast = stats["contrast"] < self.quality_min_contrast
+        return near_brightness or low_contrast
+    
+    def assess_quality(self, width: int, height: int, brightness: float, contrast: float,
+                       sharpness: float, sharpness_threshold: float) -> dict:
+        """
+        Score image statistics and list recommendations
+        
+        Args:
+            width: Original image width
+            height: Original image height
+            brightness: Mean gray level
+            contrast: Gray-level standard deviation
+            sharpness: Laplacian variance
+            sharpness_threshold: Laplacian variance below which the image is blurry
+            
+        Returns:
+            Dictionary with quality_score, quality_level, recommendations and per-metric assessments
+        """
+        quality_score = 0
+        recommendations = []
+        
+        # Check resolution
+        if width < 800 or height < 600:
+            quality_score += 20
+            recommendations.append("Image resolution is low. Consider using higher resolution images.")
+        elif width >= 2000 or height >= 1500:
+            quality_score += 30
+        else:
+            quality_score += 25
+        
+        # Check brightness
+        if brightness < 50:
+            quality_score += 15
+            recommendations.append("Image is too dark. Consider improving lighting.")
+        elif brightness > 200:
+            quality_score += 15
+            recommendations.append("Image is too bright. Consider reducing exposure.")
+        else:
+            quality_score += 20
+        
+        # Check contrast
+        if contrast < self.quality_min_contrast:
+            quality_score += 10
+            recommendations.append("Image has low contrast. Consider enhancing contrast.")
+        else:
+            quality_score += 20
+        
+        # Check sharpness
+        if sharpness < sharpness_threshold:
+            quality_score += 10
+            recommendations.append("Image is blurry. Consider using a tripod or improving focus.")
+        else:
+            quality_score += 20
+        
+        # Overall quality
+        if quality_score >= 80:
+            quality_level = "Excellent"
+        elif quality_score >= 60:
+            quality_level = "Good"
+        elif quality_score >= 40:
+            quality_level = "Fair"
+        else:
+            quality_level = "Poor"
+        
+        return {
+            "quality_score": quality_score,
+            "quality_level": quality_level,
+            "recommendations": recommendations,
+            "brightness_assessment": "Good" if 50 <= brightness <= 200 else "Needs improvement",
+            "contrast_assessment": "Good" if contrast >= self.quality_min_contrast else "Low",
+            "sharpness_assessment": "Sharp" if sharpness >= sharpness_threshold else "Blurry"
+        }
+    
+    def analyze_image_quality(self, image_data: bytes, max_dimension: Union[int, None] = None) -> dict:
+        """
+        Analyze image quality and provide recommendations
+        
+        Statistics are computed on a downsampled grayscale copy decoded directly at
+        reduced resolution. Brightness stays within a fraction of a gray level of
+        a full-resolution analysis and contrast can only drop, so pages with
+        brightness that close to a threshold or with low contrast are analyzed
+        again at full resolution and the verdicts match.
+        Laplacian variance has no full-resolution equivalent (downscaling raises
+        it by 0.7x to 19x depending on the page), so it is reported as
+        analysis_laplacian_variance together with the analysis_scale, and compared
+        against quality_min_sharpness scaled by that factor.
+        
+        Args:
+            image_data: Raw image bytes
+            max_dimension: Longest side analyzed (defaults to QUALITY_ANALYSIS_MAX_DIMENSION, 0 = full size)
+            
+        Returns:
+            Quality analysis results
+        """
+        try:
+            max_dimension = self.quality_max_dimension if max_dimension is None else max_dimension
+            
+            stats = self._quality_statistics(image_data, max_dimension)
+            if stats is None:
+                return {"error": "Failed to decode image"}
+            if stats["reduction"] > 1 and self._needs_full_resolution(stats):
+                stats = self._quality_statistics(image_data, 0)
+            
+            # The variance of a blurred page grows faster than the reduction factor,
+            # that of a sharp page much slower; a linear threshold separates both
+            sharpness_threshold = self.quality_min_sharpness * max(stats["reduction"], 1.0)
+            assessment = self.assess_quality(stats["width"], stats["height"], stats["brightness"],
+                                              stats["contrast"], stats["laplacian_variance"], sharpness_threshold)
             
             return {
-                "dimensions": {"width": width, "height": height},
+                "dimensions": {"width": stats["width"], "height": stats["height"]},
                 "brightness": {
-                    "mean": float(mean_brightness),
-                    "std": float(std_brightness),
-                    "assessment": "Good" if 50 <= mean_brightness <= 200 else "Needs improvement"
+                    "mean": stats["brightness"],
+                    "std": stats["contrast"],
+                    "assessment": assessment["brightness_assessment"]
                 },
                 "contrast": {
-                    "value": float(contrast),
-                    "assessment": "Good" if contrast >= 30 else "Low"
+                    "value": stats["contrast"],
+                    "assessment": assessment["contrast_assessment"]
                 },
                 "sharpness": {
-                    "laplacian_variance": float(laplacian_var),
-                    "assessment": "Sharp" if laplacian_var >= 100 else "Blurry"
+                    "analysis_laplacian_variance": stats["laplacian_variance"],
+                    "analysis_scale": stats["reduction"],
+                    "threshold": float(sharpness_threshold),
+                    "assessment": assessment["sharpness_assessment"]
                 },
-                "quality_score": quality_score,
-                "quality_level": quality_level,
-                "recommendations": recommendations,
-                "ocr_readiness": "Ready" if quality_score >= 60 else "Needs preprocessing"
+                "quality_score": assessment["quality_score"],
+                "quality_level": assessment["quality_level"],
+                "recommendations": assessment["recommendations"],
+                "ocr_readiness": "Ready" if assessment["quality_score"] >= 60 else "Needs preprocessing",
+                "analysis_resolution": {"width": stats["analysis_width"], "height": stats["analysis_height"]}
             }
             
         except Exception as e:
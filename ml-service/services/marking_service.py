@@ -2,18 +2,21 @@ import re
 import logging
 import time
 import os
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Iterable, Callable, Set, Tuple
 import json
+import threading
+from collections import OrderedDict
 from difflib import SequenceMatcher
 import numpy as np
 
-# Try to import optional ML libraries
-try:
-    from sentence_transformers import SentenceTransformer
-    SENTENCE_TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    SENTENCE_TRANSFORMERS_AVAILABLE = False
+from services.metrics import (
+    time_stage, time_marking_approach, set_model_loaded, set_model_warm, record_cache_lookup
+)
+from services.embedding_backends import create_embedding_backend
+from services.answer_features import FeatureExtractor, AnswerFeatures
+from services.single_flight import request_key
 
+# Try to import optional ML libraries
 try:
     import openai
     OPENAI_AVAILABLE = True
@@ -22,25 +25,57 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+MARKING_APPROACHES = ('keyword', 'semantic', 'content', 'llm')
+
+# Rubric fields each approach reads; the LLM reads every other field (the criteria text)
+RUBRIC_FIELDS = {'keyword': ('keywords',), 'content': ('key_phrases',)}
+
+def _llm_criteria(rubric: dict) -> dict:
+    excluded = {field for fields in RUBRIC_FIELDS.values() for field in fields}
+    return {field: value for field, value in rubric.items() if field not in excluded}
+
+def rubric_changes(old_rubric: dict, new_rubric: dict) -> Tuple[List[str], Set[str]]:
+    """
+    Compare two versions of a rubric
+
+    Returns:
+        (changed fields, approaches whose result depends on a changed field)
+    """
+    changed = sorted(field for field in set(old_rubric) | set(new_rubric)
+                     if old_rubric.get(field) != new_rubric.get(field))
+    affected = {approach for approach, fields in RUBRIC_FIELDS.items() if set(fields) & set(changed)}
+    if _llm_criteria(old_rubric) != _llm_criteria(new_rubric):
+        affected.add('llm')
+    return changed, affected
+
 class MarkingService:
     """
     Advanced AI marking service with multiple algorithms
     """
     
     def __init__(self):
-        self.sentence_model = None
+        self.embedding_backend = None
         self.openai_client = None
+        self.feature_extractor = FeatureExtractor(int(os.getenv('ANSWER_FEATURE_CACHE_SIZE', '1024')))
+        # Approach results by content hash of their inputs, reused by remark_answer
+        self.result_cache_size = int(os.getenv('MARKING_RESULT_CACHE_SIZE', '8192'))
+        self._result_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._result_cache_lock = threading.Lock()
         self.initialize_models()
         
     def initialize_models(self):
         """Initialize available ML models"""
         try:
-            # Initialize sentence transformers for semantic similarity
-            if SENTENCE_TRANSFORMERS_AVAILABLE:
-                self.sentence_model = SentenceTransformer('all-MiniLM-L6-v2')
-                logger.info("✅ Sentence Transformers initialized successfully")
+            # Initialize the embedding backend for semantic similarity (EMBEDDING_BACKEND)
+            try:
+                self.embedding_backend = create_embedding_backend()
+            except Exception as e:
+                logger.error(f"Embedding backend initialization failed: {e}")
+            if self.embedding_backend is not None:
+                set_model_loaded(self.embedding_backend.name)
+                logger.info(f"✅ Embedding backend initialized successfully ({self.embedding_backend.describe()})")
             else:
-                logger.warning("⚠️  Sentence Transformers not available")
+                logger.warning("⚠️  No embedding backend available, semantic marking uses text similarity")
             
             # Initialize OpenAI if available
             if OPENAI_AVAILABLE:
@@ -61,7 +96,8 @@ class MarkingService:
         except Exception as e:
             logger.error(f"Error initializing ML models: {e}")
     
-    def mark_answer(self, question: str, answer: str, rubric: dict, max_score: int, subject: str = "general") -> Dict[str, Any]:
+    def mark_answer(self, question: str, answer: str, rubric: dict, max_score: int, subject: str = "general",
+                    approaches: Optional[Iterable[str]] = None) -> Dict[str, Any]:
         """
         Mark a student answer using multiple AI algorithms
         
@@ -71,17 +107,61 @@ class MarkingService:
             rubric: Marking criteria dictionary
             max_score: Maximum possible score
             subject: Subject area for specialized marking
+            approaches: Run only these of MARKING_APPROACHES (default: all); approaches left out
+                do not count towards the combined score
             
         Returns:
             Dictionary with marking results
         """
+        return self._mark(question, answer, rubric, max_score, subject, approaches)[0]
+    
+    def remark_answer(self, question: str, answer: str, old_rubric: dict, new_rubric: dict, max_score: int,
+                      subject: str = "general", approaches: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Re-mark an answer after a rubric edit, recomputing only what the edit affects
+        
+        Keyword coverage is recomputed when keywords changed, content analysis
+        when key_phrases changed, and the LLM only when the rest of the rubric
+        (the criteria text) changed. Other approaches reuse the results cached
+        when the answer was last marked, and are computed only on a cache miss.
+        
+        Args:
+            question: The question text
+            answer: The student's answer text
+            old_rubric: Rubric the answer was marked with
+            new_rubric: Edited rubric
+            max_score: Maximum possible score
+            subject: Subject area for specialized marking
+            approaches: As for mark_answer
+            
+        Returns:
+            mark_answer's result for the new rubric, plus 'remark' with the changed rubric fields
+            and the approaches that were recomputed or reused
+        """
+        changed, affected = rubric_changes(old_rubric or {}, new_rubric or {})
+        result, reused = self._mark(question, answer, new_rubric, max_score, subject, approaches,
+                                    reuse=set(MARKING_APPROACHES) - affected)
+        result['remark'] = {
+            "changed_fields": changed,
+            "affected": sorted(affected),
+            "reused": reused,
+            "recomputed": [approach for approach in result.get('approach_scores', {}) if approach not in reused]
+        }
+        return result
+    
+    def _mark(self, question: str, answer: str, rubric: dict, max_score: int, subject: str,
+              approaches: Optional[Iterable[str]], reuse: Iterable[str] = ()) -> Tuple[Dict[str, Any], List[str]]:
+        """Mark an answer, taking the approaches in ``reuse`` from the result cache when possible"""
+        reused = []
         try:
             start_time = time.time()
             logger.info(f"Starting AI marking for {subject} question")
             
             # Clean and normalize text
-            clean_question = self._normalize_text(question)
-            clean_answer = self._normalize_text(answer)
+            with time_stage('normalize') as normalize_span:
+                clean_question = self._normalize_text(question)
+                clean_answer = self._normalize_text(answer)
+                normalize_span.set_attribute('answer_chars', len(clean_answer))
             
             if not clean_answer.strip():
                 return {
@@ -92,41 +172,69 @@ class MarkingService:
                     "semantic_score": 0.0,
                     "improvements": ["Provide a written answer"],
                     "processing_time": time.time() - start_time
-                }
+                }, reused
             
             # Apply multiple marking approaches
             results = {}
+            selected = set(approaches) if approaches is not None else set(MARKING_APPROACHES)
+            reuse = set(reuse)
+            
+            # Answer features shared by the keyword and content approaches
+            with time_stage('features'):
+                features = self.feature_extractor.extract(clean_answer, subject)
+            
+            def run(approach: str, key: str, compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+                if approach in reuse:
+                    cached = self._cached_result(key)
+                    if cached is not None:
+                        reused.append(approach)
+                        return cached
+                with time_marking_approach(approach):
+                    result = compute()
+                self._store_result(key, result)
+                return result
             
             # 1. Keyword-based marking
-            keyword_result = self._mark_by_keywords(clean_answer, rubric, max_score)
-            results['keyword'] = keyword_result
+            if 'keyword' in selected:
+                results['keyword'] = run(
+                    'keyword', request_key('keyword', clean_answer, rubric.get('keywords', []), max_score),
+                    lambda: self._mark_by_keywords(clean_answer, rubric, max_score, features))
             
             # 2. Semantic similarity marking
-            semantic_result = self._mark_by_semantic_similarity(clean_question, clean_answer, max_score)
-            results['semantic'] = semantic_result
+            if 'semantic' in selected:
+                backend = self.embedding_backend.name if self.embedding_backend else None
+                results['semantic'] = run(
+                    'semantic', request_key('semantic', clean_question, clean_answer, max_score, backend),
+                    lambda: self._mark_by_semantic_similarity(clean_question, clean_answer, max_score))
             
             # 3. Content analysis marking
-            content_result = self._mark_by_content_analysis(clean_answer, rubric, max_score, subject)
-            results['content'] = content_result
-            
-            # 4. LLM-based marking (if available)
-            if self.openai_client:
+            if 'content' in selected:
+                results['content'] = run(
+                    'content', request_key('content', clean_answer, rubric.get('key_phrases', []), max_score, subject),
+                    lambda: self._mark_by_content_analysis(clean_answer, rubric, max_score, subject, features))
+            
+            # 4. LLM-based marking (if available). A skipped LLM is left out of the combined score; without
+            # an LLM the placeholder counts as it always has, so skipping it does not change scores
+            if self.openai_client and 'llm' in selected:
                 try:
-                    llm_result = self._mark_by_llm(clean_question, clean_answer, rubric, max_score, subject)
-                    results['llm'] = llm_result
+                    results['llm'] = run(
+                        'llm', request_key('llm', clean_question, clean_answer,
+                                           json.dumps(_llm_criteria(rubric), sort_keys=True), max_score, subject),
+                        lambda: self._mark_by_llm(clean_question, clean_answer, rubric, max_score, subject))
                 except Exception as e:
                     logger.warning(f"LLM marking failed: {e}")
                     results['llm'] = {"score": 0, "confidence": 0.0, "feedback": "LLM evaluation failed"}
-            else:
+            elif not self.openai_client:
                 results['llm'] = {"score": 0, "confidence": 0.0, "feedback": "LLM not available"}
             
             # Combine results using weighted scoring
-            final_result = self._combine_marking_results(results, max_score)
+            with time_marking_approach('combine'):
+                final_result = self._combine_marking_results(results, max_score)
             final_result['processing_time'] = time.time() - start_time
             
             logger.info(f"Marking completed. Final score: {final_result['score']}/{max_score}")
             
-            return final_result
+            return final_result, reused
             
         except Exception as e:
             logger.error(f"AI marking failed: {e}")
@@ -138,9 +246,29 @@ class MarkingService:
                 "semantic_score": 0.0,
                 "improvements": ["Contact administrator for assistance"],
                 "processing_time": time.time() - start_time
-            }
+            }, reused
+    
+    def _cached_result(self, key: str) -> Optional[Dict[str, Any]]:
+        """Approach result stored under key, if still cached"""
+        with self._result_cache_lock:
+            result = self._result_cache.get(key)
+            if result is not None:
+                self._result_cache.move_to_end(key)
+        record_cache_lookup('marking_results', result is not None)
+        return result
     
-    def _mark_by_keywords(self, answer: str, rubric: dict, max_score: int) -> Dict[str, Any]:
+    def _store_result(self, key: str, result: Dict[str, Any]):
+        """Keep an approach result for re-marking (failed LLM calls are not kept)"""
+        if self.result_cache_size <= 0 or str(result.get('feedback', '')).startswith('LLM error'):
+            return
+        with self._result_cache_lock:
+            self._result_cache[key] = result
+            self._result_cache.move_to_end(key)
+            if len(self._result_cache) > self.result_cache_size:
+                self._result_cache.popitem(last=False)
+    
+    def _mark_by_keywords(self, answer: str, rubric: dict, max_score: int,
+                          features: Optional[AnswerFeatures] = None) -> Dict[str, Any]:
         """Mark answer based on keyword matching"""
         try:
             keywords = rubric.get('keywords', [])
@@ -148,7 +276,8 @@ class MarkingService:
                 return {"score": 0, "confidence": 0.0, "matched_keywords": []}
             
             # Convert to lowercase for matching
-            answer_lower = answer.lower()
+            features = features or self.feature_extractor.extract(answer)
+            answer_lower = features.lower
             keywords_lower = [kw.lower() for kw in keywords]
             
             # Find matched keywords
@@ -162,7 +291,7 @@ class MarkingService:
             score = int(keyword_coverage * max_score)
             
             # Calculate confidence based on keyword density
-            total_words = len(answer.split())
+            total_words = features.word_count
             keyword_density = len(matched_keywords) / max(total_words, 1)
             confidence = min(keyword_density * 2, 1.0)  # Normalize to 0-1
             
@@ -180,7 +309,7 @@ class MarkingService:
     def _mark_by_semantic_similarity(self, question: str, answer: str, max_score: int) -> Dict[str, Any]:
         """Mark answer based on semantic similarity to question"""
         try:
-            if not self.sentence_model:
+            if not self.embedding_backend:
                 # Fallback to simple text similarity
                 similarity = self._calculate_text_similarity(question, answer)
                 score = int(similarity * max_score)
@@ -190,9 +319,9 @@ class MarkingService:
                     "similarity": float(similarity)  # Ensure float type
                 }
             
-            # Use sentence transformers for semantic similarity
-            question_embedding = self.sentence_model.encode(question)
-            answer_embedding = self.sentence_model.encode(answer)
+            # Embed question and answer in one batch
+            question_embedding, answer_embedding = self.embedding_backend.encode([question, answer])
+            set_model_warm(self.embedding_backend.name)
             
             # Calculate cosine similarity
             similarity = self._cosine_similarity(question_embedding, answer_embedding)
@@ -210,7 +339,8 @@ class MarkingService:
             logger.error(f"Semantic similarity marking failed: {e}")
             return {"score": 0, "confidence": 0.0, "similarity": 0.0}
     
-    def _mark_by_content_analysis(self, answer: str, rubric: dict, max_score: int, subject: str) -> Dict[str, Any]:
+    def _mark_by_content_analysis(self, answer: str, rubric: dict, max_score: int, subject: str,
+                                  features: Optional[AnswerFeatures] = None) -> Dict[str, Any]:
         """Mark answer based on content analysis and subject-specific criteria"""
         try:
             score = 0
@@ -218,35 +348,34 @@ class MarkingService:
             feedback_points = []
             
             # Analyze answer length
-            word_count = len(answer.split())
-            char_count = len(answer)
+            features = features or self.feature_extractor.extract(answer, subject)
+            word_count = features.word_count
+            char_count = features.char_count
             
             # Subject-specific analysis
-            if subject.lower() in ['mathematics', 'math', 'physics', 'chemistry']:
+            if features.group == 'quantitative':
                 # Check for mathematical expressions and formulas
-                math_patterns = r'(\d+[\+\-\*/]\d+|\d+[=<>]\d+|\d+[xyz]\d*|\b(sin|cos|tan|log|sqrt)\b)'
-                math_matches = len(re.findall(math_patterns, answer, re.IGNORECASE))
+                math_matches = features.count('math_expressions')
                 
                 if math_matches > 0:
                     score += min(math_matches * 2, max_score // 3)
                     feedback_points.append(f"Contains {math_matches} mathematical expressions")
                 
                 # Check for units
-                unit_patterns = r'\b(kg|m|s|N|J|W|V|A|Ω|°C|°F)\b'
-                unit_matches = len(re.findall(unit_patterns, answer, re.IGNORECASE))
+                unit_matches = features.count('units')
                 
                 if unit_matches > 0:
                     score += min(unit_matches, max_score // 6)
                     feedback_points.append(f"Uses appropriate units ({unit_matches} instances)")
             
-            elif subject.lower() in ['english', 'literature', 'history', 'geography']:
+            elif features.group == 'written':
                 # Check for structured writing
-                if len(answer.split('.')) > 2:
+                if features.sentence_count > 2:
                     score += max_score // 4
                     feedback_points.append("Well-structured with multiple sentences")
                 
                 # Check for descriptive language
-                descriptive_words = len(re.findall(r'\b(very|extremely|quite|rather|somewhat|clearly|obviously)\b', answer, re.IGNORECASE))
+                descriptive_words = features.count('descriptive_words')
                 if descriptive_words > 0:
                     score += min(descriptive_words, max_score // 6)
                     feedback_points.append("Uses descriptive language")
@@ -262,7 +391,7 @@ class MarkingService:
             # Check for key phrases from rubric
             key_phrases = rubric.get('key_phrases', [])
             for phrase in key_phrases:
-                if phrase.lower() in answer.lower():
+                if features.contains(phrase):
                     score += max_score // len(key_phrases)
                     feedback_points.append(f"Contains key phrase: '{phrase}'")
             
@@ -517,17 +646,8 @@ class MarkingService:
         return suggestions
     
     def _normalize_text(self, text: str) -> str:
-        """Normalize text for consistent processing"""
-        if not text:
-            return ""
-        
-        # Remove extra whitespace
-        normalized = re.sub(r'\s+', ' ', text.strip())
-        
-        # Remove special characters that might interfere with analysis
-        normalized = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)\[\]\{\}]', '', normalized)
-        
-        return normalized
+        """Normalize text for consistent processing (collapse whitespace, drop special characters)"""
+        return FeatureExtractor.normalize(text)
     
     def _calculate_text_similarity(self, text1: str, text2: str) -> float:
         """Calculate simple text similarity using SequenceMatcher"""
@@ -555,7 +675,7 @@ class MarkingService:
         return {
             "available_approaches": {
                 "keyword_matching": True,
-                "semantic_similarity": SENTENCE_TRANSFORMERS_AVAILABLE,
+                "semantic_similarity": self.embedding_backend is not None,
                 "content_analysis": True,
                 "llm_evaluation": OPENAI_AVAILABLE and self.openai_client is not None
             },
@@ -564,6 +684,7 @@ class MarkingService:
                 "english", "literature", "history", "geography",
                 "general"
             ],
+            "embedding_backend": self.embedding_backend.describe() if self.embedding_backend else None,
             "scoring_range": "0 to max_score (configurable)",
             "confidence_scoring": True,
             "feedback_generation": True,
@@ -0,0 +1,361 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Tuple
+
+from services.tracing import span
+
+# Default latency buckets (seconds), from cheap decode steps up to slow multi-engine OCR
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+class _Metric:
+    """Base class for labelled metrics exposed in the Prometheus text format"""
+
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, **labels):
+        """Return the child metric for a label combination"""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._new_child()
+                self._children[key] = child
+            return child
+
+    def _default_child(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} requires labels {self.labelnames}")
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def collect(self) -> List[Tuple[Dict[str, str], Any]]:
+        with self._lock:
+            items = list(self._children.items())
+        return [(dict(zip(self.labelnames, key)), child) for key, child in items]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for labels, child in self.collect():
+            lines.extend(self._render_child(labels, child))
+        return lines
+
+    def _render_child(self, labels: Dict[str, str], child) -> List[str]:
+        return [f"{self.name}{_format_labels(labels)} {_format_value(child.get())}"]
+
+class _ValueChild:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float):
+        with self._lock:
+            self._value = float(value)
+
+    def get(self) -> float:
+        with self._lock:
+            return self._value
+
+    @contextmanager
+    def track_inprogress(self):
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+
+    type_name = 'counter'
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default_child().inc(amount)
+
+class Gauge(_Metric):
+    """Value that can go up and down (in-flight requests, queue depth, warm state)"""
+
+    type_name = 'gauge'
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def set(self, value: float):
+        self._default_child().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default_child().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default_child().dec(amount)
+
+    def track_inprogress(self):
+        return self._default_child().track_inprogress()
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._buckets = buckets
+        self._counts = [0] * len(buckets)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self._sum += value
+            self._count += 1
+            for i, bound in enumerate(self._buckets):
+                if value <= bound:
+                    self._counts[i] += 1
+                    break
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            return list(self._counts), self._sum, self._count
+
+class Histogram(_Metric):
+    """Latency histogram with cumulative buckets"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        if self.buckets[-1] != float('inf'):
+            self.buckets = self.buckets + (float('inf'),)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default_child().observe(value)
+
+    def time(self):
+        return self._default_child().time()
+
+    def _render_child(self, labels: Dict[str, str], child) -> List[str]:
+        counts, total, count = child.snapshot()
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            bucket_labels = dict(labels, le=_format_value(bound))
+            lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """Collection of metrics rendered together by the /metrics endpoint"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric):
+        with self._lock:
+            if any(m.name == metric.name for m in self._metrics):
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics.append(metric)
+
+    def add_collector(self, collector):
+        """Register a callable run before every render to refresh derived gauges"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format (0.0.4)"""
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics)
+        for collector in collectors:
+            collector()
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+# Request-level metrics
+REQUESTS_TOTAL = Counter(
+    'decigarde_http_requests_total', 'HTTP requests handled',
+    ('method', 'endpoint', 'status')
+)
+REQUEST_DURATION = Histogram(
+    'decigarde_http_request_duration_seconds', 'End-to-end HTTP request latency',
+    ('method', 'endpoint')
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    'decigarde_http_requests_in_flight', 'HTTP requests currently being processed'
+)
+QUEUE_DEPTH = Gauge(
+    'decigarde_queue_depth', 'Work items waiting to be processed',
+    ('queue',)
+)
+
+# Per-stage latency
+STAGE_DURATION = Histogram(
+    'decigarde_stage_duration_seconds', 'Latency of pipeline stages (decode, preprocess, combine, serialization)',
+    ('stage',)
+)
+OCR_ENGINE_DURATION = Histogram(
+    'decigarde_ocr_engine_duration_seconds', 'Latency of individual OCR engine calls',
+    ('engine',)
+)
+MARKING_APPROACH_DURATION = Histogram(
+    'decigarde_marking_approach_duration_seconds', 'Latency of individual marking approaches',
+    ('approach',)
+)
+
+# Routing decisions
+OCR_ROUTES = Counter(
+    'decigarde_ocr_route_total', 'OCR pipeline chosen by the quality gate (light, full, light_escalated, reject)',
+    ('route',)
+)
+OCR_ENGINE_DECISIONS = Counter(
+    'decigarde_ocr_engine_decisions_total', 'OCR engine scheduler decisions per engine (ran, skipped, shed)',
+    ('engine', 'decision')
+)
+QUEUE_WAIT = Histogram(
+    'decigarde_queue_wait_seconds', 'Time requests wait for a model worker, per priority class and tenant',
+    ('priority', 'tenant')
+)
+
+# Load shedding
+DEGRADATION_LEVEL = Gauge(
+    'decigarde_degradation_level', 'Current degradation level (0 = normal service)'
+)
+DEGRADED_REQUESTS = Counter(
+    'decigarde_degraded_requests_total', 'Requests by the degradation level they were served at',
+    ('level', 'mode')
+)
+
+# Request coalescing
+SINGLE_FLIGHT_REQUESTS = Counter(
+    'decigarde_single_flight_requests_total',
+    'Requests that computed a result (computed) or joined an identical in-flight request (shared)',
+    ('endpoint', 'result')
+)
+SINGLE_FLIGHT_DUPLICATE_RATIO = Gauge(
+    'decigarde_single_flight_duplicate_ratio', 'Fraction of requests that were duplicates of one in flight',
+    ('endpoint',)
+)
+
+# Caches and models
+CACHE_REQUESTS = Counter(
+    'decigarde_cache_requests_total', 'Cache lookups by result (hit/miss)',
+    ('cache', 'result')
+)
+CACHE_HIT_RATIO = Gauge(
+    'decigarde_cache_hit_ratio', 'Fraction of cache lookups that were hits',
+    ('cache',)
+)
+MODEL_WARM = Gauge(
+    'decigarde_model_warm', 'Model state: 0 = loaded but never used, 1 = warm (served a request)',
+    ('model',)
+)
+
+@contextmanager
+def time_stage(stage: str, **attributes):
+    """Time a pipeline stage into decigarde_stage_duration_seconds and the active trace"""
+    with span(stage, **attributes) as stage_span, STAGE_DURATION.labels(stage=stage).time():
+        yield stage_span
+
+@contextmanager
+def time_marking_approach(approach: str):
+    """Time a marking approach into its latency histogram and the active trace"""
+    with span(f"marking:{approach}", approach=approach) as approach_span, \
+            MARKING_APPROACH_DURATION.labels(approach=approach).time():
+        yield approach_span
+
+def record_cache_lookup(cache: str, hit: bool):
+    """Count a cache hit or miss"""
+    CACHE_REQUESTS.labels(cache=cache, result='hit' if hit else 'miss').inc()
+
+def set_model_loaded(model: str):
+    """Mark a model as loaded but not yet warm"""
+    MODEL_WARM.labels(model=model).set(0)
+
+def set_model_warm(model: str):
+    """Mark a model as warm after it has served a request"""
+    MODEL_WARM.labels(model=model).set(1)
+
+def _update_cache_hit_ratios():
+    totals = {}
+    for labels, child in CACHE_REQUESTS.collect():
+        hits, lookups = totals.get(labels['cache'], (0.0, 0.0))
+        value = child.get()
+        if labels['result'] == 'hit':
+            hits += value
+        totals[labels['cache']] = (hits, lookups + value)
+    for cache, (hits, lookups) in totals.items():
+        CACHE_HIT_RATIO.labels(cache=cache).set(hits / lookups if lookups else 0.0)
+
+REGISTRY.add_collector(_update_cache_hit_ratios)
+
+def _update_duplicate_ratios():
+    totals = {}
+    for labels, child in SINGLE_FLIGHT_REQUESTS.collect():
+        shared, requests = totals.get(labels['endpoint'], (0.0, 0.0))
+        value = child.get()
+        if labels['result'] == 'shared':
+            shared += value
+        totals[labels['endpoint']] = (shared, requests + value)
+    for endpoint, (shared, requests) in totals.items():
+        SINGLE_FLIGHT_DUPLICATE_RATIO.labels(endpoint=endpoint).set(shared / requests if requests else 0.0)
+
+REGISTRY.add_collector(_update_duplicate_ratios)
+
+def render_metrics() -> str:
+    """Render the default registry"""
+    return REGISTRY.render()
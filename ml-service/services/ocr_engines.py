@@ -0,0 +1,633 @@
+import logging
+import os
+import shutil
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import pytesseract
+
+from services.metrics import set_model_loaded, set_model_warm
+from services.tracing import current_span
+
+try:
+    import easyocr
+    EASYOCR_AVAILABLE = True
+except ImportError:
+    EASYOCR_AVAILABLE = False
+
+try:
+    from paddleocr import PaddleOCR
+    PADDLEOCR_AVAILABLE = True
+except ImportError:
+    PADDLEOCR_AVAILABLE = False
+
+try:
+    from services.onnx_ocr import ONNXOCRPipeline, ONNXRUNTIME_AVAILABLE
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+try:
+    import torch
+    TORCH_AVAILABLE = True
+except ImportError:
+    TORCH_AVAILABLE = False
+
+try:
+    import requests
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Weight given to each new latency sample in an engine's running cost
+COST_EWMA_ALPHA = 0.2
+
+def empty_result(provider: str) -> Dict[str, Any]:
+    return {"text": "", "confidence": 0.0, "provider": provider}
+
+def _megapixels(image_shape: Tuple[int, ...]) -> float:
+    return max(image_shape[0] * image_shape[1] / 1e6, 0.01)
+
+class OCREngine:
+    """
+    Common interface of the OCR engines OCRService combines
+
+    Subclasses set ``name`` and implement ``load`` and ``infer``; batching,
+    warm-up, health and cost tracking work the same for every engine. Engines
+    never raise from ``infer`` for a bad page, they return an empty result.
+    """
+
+    name = None
+    # Only run on requests asking for handwriting-optimized OCR
+    handwriting_only = False
+    # Seconds per megapixel assumed until the engine has been measured
+    default_cost = 1.0
+
+    def __init__(self, weight: float = 1.0):
+        """
+        Args:
+            weight: Multiplier on the engine's confidence when results are ranked (0 = disabled)
+        """
+        self.weight = weight
+        self.model = None
+        self.error = None
+        self.warmed = False
+        self.calls = 0
+        self._seconds_per_megapixel = None
+        self._cost_lock = threading.Lock()
+
+    @classmethod
+    def installed(cls) -> bool:
+        """Whether the engine's library is importable"""
+        return True
+
+    def configured(self) -> bool:
+        """Whether the engine has the configuration it needs to load"""
+        return True
+
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None
+
+    def load(self):
+        """Load the model into ``self.model``; raise on failure"""
+        raise NotImplementedError
+
+    def infer(self, image: np.ndarray, language: str = "eng", enhance_handwriting: bool = True,
+              page_straightened: bool = False) -> Dict[str, Any]:
+        """
+        Read one page
+
+        Args:
+            image: BGR image as a numpy array
+            language: Language code
+            enhance_handwriting: Whether to use handwriting-optimized settings
+            page_straightened: The page was deskewed upstream
+
+        Returns:
+            Dictionary with text, confidence and provider
+        """
+        raise NotImplementedError
+
+    def infer_batch(self, images: List[np.ndarray], **options) -> List[Dict[str, Any]]:
+        """Read several pages; engines with native batching override this"""
+        return [self.infer(image, **options) for image in images]
+
+    def warm(self):
+        """Run one small page so the first request does not pay for lazy initialization"""
+        page = np.full((64, 320, 3), 255, np.uint8)
+        cv2.putText(page, "warm up", (10, 45), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 2)
+        self.infer(page)
+        self.warmed = True
+        set_model_warm(self.name)
+
+    def health(self) -> str:
+        if self.loaded:
+            return 'available'
+        if self.error:
+            return 'error'
+        if not self.installed():
+            return 'not_installed'
+        if not self.configured():
+            return 'not_configured'
+        return 'not_loaded'
+
+    def record_latency(self, seconds: float, image_shape: Tuple[int, ...]):
+        """Fold one measured call into the running seconds-per-megapixel cost"""
+        sample = seconds / _megapixels(image_shape)
+        with self._cost_lock:
+            self.calls += 1
+            if self._seconds_per_megapixel is None:
+                self._seconds_per_megapixel = sample
+            else:
+                self._seconds_per_megapixel += COST_EWMA_ALPHA * (sample - self._seconds_per_megapixel)
+        self.warmed = True
+        set_model_warm(self.name)
+
+    @property
+    def seconds_per_megapixel(self) -> float:
+        return self._seconds_per_megapixel if self._seconds_per_megapixel is not None else self.default_cost
+
+    def cost_estimate(self, image_shape: Optional[Tuple[int, ...]] = None) -> float:
+        """
+        Expected seconds to read a page
+
+        Args:
+            image_shape: Page shape (default: one megapixel)
+
+        Returns:
+            Measured cost when the engine has run, its default cost otherwise
+        """
+        megapixels = _megapixels(image_shape) if image_shape is not None else 1.0
+        return self.seconds_per_megapixel * megapixels
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "status": self.health(),
+            "weight": self.weight,
+            "handwriting_only": self.handwriting_only,
+            "warm": self.warmed,
+            "calls": self.calls,
+            "seconds_per_megapixel": self.seconds_per_megapixel,
+            "cost_measured": self._seconds_per_megapixel is not None
+        }
+
+    @staticmethod
+    def _combine_lines(provider: str, texts: List[str], confidences: List[float]) -> Dict[str, Any]:
+        if not texts:
+            return empty_result(provider)
+        return {
+            "text": " ".join(texts),
+            "confidence": float(np.mean(confidences)) if confidences else 0.0,
+            "provider": provider
+        }
+
+class PaddleOCREngine(OCREngine):
+    """PaddleOCR (best for handwriting, so only used when handwriting is enhanced)"""
+
+    name = 'paddleocr'
+    handwriting_only = True
+    default_cost = 1.5
+
+    def __init__(self, weight: float = 1.0):
+        super().__init__(weight)
+        # PaddleOCR's per-line angle classifier; skipped per call for pages already deskewed
+        self.angle_cls = os.getenv('PADDLEOCR_USE_ANGLE_CLS', 'true').lower() == 'true'
+        # Paddle inference threads per call (PaddleOCR's own default is 10); set by the thread budget
+        self.cpu_threads = int(os.getenv('PADDLEOCR_CPU_THREADS') or 10)
+        self._cls_kwarg = 'cls'
+
+    @classmethod
+    def installed(cls) -> bool:
+        return PADDLEOCR_AVAILABLE
+
+    def load(self):
+        use_gpu = os.getenv('USE_GPU', 'false').lower() == 'true'
+        paddle_gpu = os.getenv('PADDLEOCR_USE_GPU', 'false').lower() == 'true'
+        options = dict(use_angle_cls=self.angle_cls, lang='en', cpu_threads=self.cpu_threads)
+
+        try:
+            if use_gpu and paddle_gpu:
+                self.model = PaddleOCR(use_gpu=True, **options)
+                logger.info("✅ PaddleOCR initialized successfully with GPU support")
+            else:
+                self.model = PaddleOCR(**options)
+                logger.info("✅ PaddleOCR initialized successfully (CPU mode)")
+        except Exception as e:
+            # Fallback to CPU mode if any initialization fails
+            logger.warning(f"PaddleOCR initialization failed: {e}")
+            self.model = PaddleOCR(**options)
+            logger.info("✅ PaddleOCR initialized successfully (CPU mode - fallback)")
+
+    def _run(self, image: np.ndarray, use_angle_cls: bool):
+        """
+        Call PaddleOCR with the angle classifier switched on or off for this page
+
+        PaddleOCR 2.x takes ``cls``; 3.1.0+ removed it in favour of
+        ``use_textline_orientation``. The accepted keyword is remembered after
+        the first call.
+        """
+        for kwarg in dict.fromkeys((self._cls_kwarg, 'cls', 'use_textline_orientation', None)):
+            try:
+                result = self.model.ocr(image, **{kwarg: use_angle_cls}) if kwarg else self.model.ocr(image)
+                self._cls_kwarg = kwarg
+                return result
+            except TypeError:
+                if kwarg is None:
+                    raise
+
+    def infer(self, image: np.ndarray, language: str = "eng", enhance_handwriting: bool = True,
+              page_straightened: bool = False) -> Dict[str, Any]:
+        use_angle_cls = self.angle_cls and not page_straightened
+        active = current_span()
+        if active is not None:
+            active.set_attribute('angle_cls', use_angle_cls)
+
+        try:
+            result = self._run(image, use_angle_cls)
+            logger.debug(f"PaddleOCR raw result: {result}")
+            return self._combine_lines(self.name, *self.parse_result(result))
+        except Exception as e:
+            logger.error(f"PaddleOCR extraction failed: {e}")
+            return empty_result(self.name)
+
+    @staticmethod
+    def parse_result(result) -> Tuple[List[str], List[float]]:
+        """Text lines and scores from either PaddleOCR result format"""
+        texts = []
+        confidences = []
+        if not result or not result[0]:
+            logger.debug("PaddleOCR returned empty result")
+            return texts, confidences
+
+        # PaddleOCR 3.1.0+: result[0] is a dict with 'rec_texts' and 'rec_scores'
+        if isinstance(result[0], dict) and 'rec_texts' in result[0]:
+            for text, score in zip(result[0].get('rec_texts', []), result[0].get('rec_scores', [])):
+                if text and isinstance(text, str) and text.strip():
+                    texts.append(text.strip())
+                    confidences.append(float(score))
+            return texts, confidences
+
+        # PaddleOCR 2.x: [[[x1,y1,x2,y2], (text, confidence)], ...]
+        for i, line in enumerate(result[0]):
+            try:
+                if isinstance(line, list) and len(line) >= 2 and isinstance(line[1], tuple) and len(line[1]) >= 2:
+                    text, confidence = line[1][0], line[1][1]
+                    if text and isinstance(text, str):
+                        texts.append(text)
+                        confidences.append(float(confidence))
+                else:
+                    logger.debug(f"Line {i} has unexpected structure: {line}")
+            except Exception as e:
+                logger.warning(f"Error processing line {i}: {e}, line: {line}")
+        return texts, confidences
+
+class ONNXOCREngine(OCREngine):
+    """PaddleOCR's models on ONNX Runtime (same role as PaddleOCR)"""
+
+    name = 'onnxocr'
+    handwriting_only = True
+    default_cost = 0.8
+
+    @classmethod
+    def installed(cls) -> bool:
+        return ONNXRUNTIME_AVAILABLE
+
+    def configured(self) -> bool:
+        return bool(os.getenv('ONNX_OCR_MODEL_DIR'))
+
+    def load(self):
+        self.model = ONNXOCRPipeline.from_env()
+        logger.info(f"✅ ONNX OCR initialized successfully ({self.model.describe()['models']})")
+
+    def _result(self, lines) -> Dict[str, Any]:
+        return self._combine_lines(self.name, [text.strip() for _, text, _ in lines],
+                                   [score for _, _, score in lines])
+
+    def infer(self, image: np.ndarray, language: str = "eng", enhance_handwriting: bool = True,
+              page_straightened: bool = False) -> Dict[str, Any]:
+        try:
+            return self._result(self.model.ocr(image))
+        except Exception as e:
+            logger.error(f"ONNX OCR extraction failed: {e}")
+            return empty_result(self.name)
+
+    def infer_batch(self, images: List[np.ndarray], **options) -> List[Dict[str, Any]]:
+        """Recognition runs once over the text lines of all pages"""
+        try:
+            return [self._result(lines) for lines in self.model.ocr_batch(images)]
+        except Exception as e:
+            logger.error(f"ONNX OCR batch extraction failed: {e}")
+            return [empty_result(self.name) for _ in images]
+
+    def describe(self) -> Dict[str, Any]:
+        description = super().describe()
+        if self.loaded:
+            description.update(self.model.describe())
+        return description
+
+class EasyOCREngine(OCREngine):
+    """EasyOCR"""
+
+    name = 'easyocr'
+    default_cost = 3.0
+
+    @classmethod
+    def installed(cls) -> bool:
+        return EASYOCR_AVAILABLE
+
+    def load(self):
+        # Check GPU availability and configuration
+        gpu_available = torch.cuda.is_available() if TORCH_AVAILABLE else False
+        easy_gpu = os.getenv('EASYOCR_USE_GPU', 'false').lower() == 'true'
+        use_gpu = os.getenv('USE_GPU', 'false').lower() == 'true'
+
+        try:
+            if gpu_available and easy_gpu and use_gpu:
+                self.model = easyocr.Reader(['en'], gpu=True)
+                logger.info("✅ EasyOCR initialized successfully with GPU support")
+            else:
+                self.model = easyocr.Reader(['en'], gpu=False)
+                logger.info("✅ EasyOCR initialized successfully (CPU mode)")
+        except Exception as e:
+            # Fallback to CPU mode if GPU initialization fails
+            logger.warning(f"EasyOCR initialization failed: {e}")
+            self.model = easyocr.Reader(['en'], gpu=False)
+            logger.info("✅ EasyOCR initialized successfully (CPU mode - fallback)")
+
+    def infer(self, image: np.ndarray, language: str = "eng", enhance_handwriting: bool = True,
+              page_straightened: bool = False) -> Dict[str, Any]:
+        try:
+            detections = self.model.readtext(image)
+            return self._combine_lines(self.name, [d[1] for d in detections], [d[2] for d in detections])
+        except Exception as e:
+            logger.error(f"EasyOCR extraction failed: {e}")
+            return empty_result(self.name)
+
+class TesseractEngine(OCREngine):
+    """Tesseract, with a handwriting-tuned configuration when handwriting is enhanced"""
+
+    name = 'tesseract'
+    default_cost = 0.6
+
+    @classmethod
+    def installed(cls) -> bool:
+        """Whether the tesseract binary pytesseract calls can be found"""
+        return shutil.which(pytesseract.pytesseract.tesseract_cmd) is not None
+
+    def load(self):
+        self.version = pytesseract.get_tesseract_version()
+        # pytesseract needs no model object; the binary's version marks the engine loaded
+        self.model = pytesseract
+        logger.info("✅ Tesseract initialized successfully")
+
+    def health(self) -> str:
+        return f'available (v{self.version})' if self.loaded else super().health()
+
+    @staticmethod
+    def config(enhance_handwriting: bool) -> str:
+        """Get Tesseract configuration string"""
+        if enhance_handwriting:
+            # Configuration optimized for handwritten text
+            return (
+                '--oem 3 '  # LSTM OCR Engine
+                '--psm 6 '  # Assume a uniform block of text
+                '-c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789.,!?;:()[]{}"\'-_+=/\\|@#$%^&*~`<> '
+                '-c textord_heavy_nr=1 '
+                '-c textord_min_linesize=2.5 '
+                '-c preserve_interword_spaces=1'
+            )
+        # Standard configuration for printed text
+        return '--oem 3 --psm 6'
+
+    def infer(self, image: np.ndarray, language: str = "eng", enhance_handwriting: bool = True,
+              page_straightened: bool = False) -> Dict[str, Any]:
+        try:
+            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            config = self.config(enhance_handwriting)
+
+            text = pytesseract.image_to_string(rgb_image, lang=language, config=config)
+            data = pytesseract.image_to_data(rgb_image, lang=language, config=config,
+                                             output_type=pytesseract.Output.DICT)
+            confidences = [int(conf) for conf in data['conf'] if int(conf) > 0]
+
+            return {
+                "text": text.strip(),
+                "confidence": float(np.mean(confidences) / 100.0) if confidences else 0.0,
+                "provider": self.name
+            }
+        except Exception as e:
+            logger.error(f"Tesseract extraction failed: {e}")
+            return empty_result(self.name)
+
+class RemoteOCREngine(OCREngine):
+    """
+    Another DeciGarde ml-service used as an engine
+
+    Pages are sent as JPEG to the remote /api/ml/ocr/raw endpoint with its
+    quality gate and deskew switched off, since this service already did both.
+    """
+
+    default_cost = 2.0
+
+    def __init__(self, name: str, url: str, weight: float = 1.0, timeout: float = 30.0):
+        """
+        Args:
+            name: Engine name used in results, metrics and engine selection
+            url: Full URL of the remote raw OCR endpoint
+            weight: Ranking weight (see OCREngine)
+            timeout: Seconds allowed per page
+        """
+        super().__init__(weight)
+        self.name = name
+        self.url = url
+        self.timeout = timeout
+
+    @classmethod
+    def installed(cls) -> bool:
+        return REQUESTS_AVAILABLE
+
+    def load(self):
+        self.model = requests.Session()
+        logger.info(f"✅ Remote OCR engine {self.name} configured ({self.url})")
+
+    def health(self) -> str:
+        return f'available (remote {self.url})' if self.loaded else super().health()
+
+    def infer(self, image: np.ndarray, language: str = "eng", enhance_handwriting: bool = True,
+              page_straightened: bool = False) -> Dict[str, Any]:
+        try:
+            ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 95])
+            if not ok:
+                raise ValueError("Failed to encode page")
+            response = self.model.post(
+                self.url,
+                data=encoded.tobytes(),
+                params={"language": language, "enhance_handwriting": str(enhance_handwriting).lower(),
+                        "auto_route": "false", "deskew": "false"},
+                headers={"Content-Type": "image/jpeg", "Accept": "application/json"},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            body = response.json()
+            return {"text": body.get("text", ""), "confidence": float(body.get("confidence", 0.0)),
+                    "provider": self.name}
+        except Exception as e:
+            logger.error(f"Remote OCR engine {self.name} failed: {e}")
+            return empty_result(self.name)
+
+    def describe(self) -> Dict[str, Any]:
+        description = super().describe()
+        description["url"] = self.url
+        return description
+
+class EngineRegistry:
+    """
+    The OCR engines a service may run, in the order their results are collected
+
+    Engines are registered whether or not they can load, so status reports
+    cover every known engine; only loaded engines are selected for requests.
+    """
+
+    def __init__(self):
+        self._engines: Dict[str, OCREngine] = {}
+        # Engines only loaded when another engine is not: {engine: engine it is replaced by}
+        self._replaced_by: Dict[str, str] = {}
+
+    def register(self, engine: OCREngine, replaced_by: Optional[str] = None) -> OCREngine:
+        """
+        Add an engine
+
+        Args:
+            engine: Engine instance (its name must be unique)
+            replaced_by: Skip loading this engine when the named engine loads
+
+        Returns:
+            The registered engine
+        """
+        if engine.name in self._engines:
+            raise ValueError(f"OCR engine '{engine.name}' is already registered")
+        self._engines[engine.name] = engine
+        if replaced_by:
+            self._replaced_by[engine.name] = replaced_by
+        return engine
+
+    def get(self, name: str) -> Optional[OCREngine]:
+        return self._engines.get(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._engines
+
+    def __iter__(self):
+        return iter(self._engines.values())
+
+    def loaded(self) -> List[OCREngine]:
+        """Loaded engines, in registration order"""
+        return [engine for engine in self._engines.values() if engine.loaded]
+
+    def load_all(self):
+        """Load every installed and configured engine; failures are logged and kept in engine.error"""
+        # Replaceable engines load last so the engines replacing them have already loaded
+        ordered = sorted(self._engines.values(), key=lambda engine: engine.name in self._replaced_by)
+        for engine in ordered:
+            replacement = self._replaced_by.get(engine.name)
+            if replacement and replacement in self._engines and self._engines[replacement].loaded:
+                logger.info(f"ℹ️  {engine.name} skipped: {replacement} replaces it")
+                continue
+            if not engine.configured():
+                continue
+            if not engine.installed():
+                logger.warning(f"⚠️  {engine.name} not available")
+                continue
+            try:
+                engine.load()
+                set_model_loaded(engine.name)
+            except Exception as e:
+                engine.model = None
+                engine.error = str(e)
+                logger.warning(f"⚠️  {engine.name} failed to load: {e}")
+
+    def warm_all(self):
+        """Warm every loaded engine; an engine that fails to warm stays usable"""
+        for engine in self.loaded():
+            try:
+                engine.warm()
+            except Exception as e:
+                logger.warning(f"⚠️  {engine.name} warm-up failed: {e}")
+
+    def select(self, engines: Optional[List[str]] = None, enhance_handwriting: bool = True) -> List[OCREngine]:
+        """
+        Engines to run for one request
+
+        Args:
+            engines: Restrict to these engine names (default: all loaded)
+            enhance_handwriting: Whether handwriting-only engines may run
+
+        Returns:
+            Loaded, positively weighted engines in registration order
+        """
+        return [
+            engine for engine in self.loaded()
+            if (engines is None or engine.name in engines)
+            and (enhance_handwriting or not engine.handwriting_only)
+            and engine.weight > 0
+        ]
+
+    def weight(self, name: str) -> float:
+        engine = self._engines.get(name)
+        return engine.weight if engine is not None else 1.0
+
+    def status(self) -> Dict[str, str]:
+        status = {}
+        for name, engine in self._engines.items():
+            replacement = self._replaced_by.get(name)
+            if (not engine.loaded and engine.installed() and replacement in self._engines
+                    and self._engines[replacement].loaded):
+                status[name] = f'replaced ({replacement})'
+            else:
+                status[name] = engine.health()
+        return status
+
+    def describe(self) -> Dict[str, Dict[str, Any]]:
+        return {name: engine.describe() for name, engine in self._engines.items()}
+
+def parse_engine_list(value: str) -> Dict[str, str]:
+    """Parse 'name=value,name=value' settings, ignoring blanks"""
+    parsed = {}
+    for item in value.split(','):
+        if '=' in item:
+            name, setting = item.split('=', 1)
+            parsed[name.strip()] = setting.strip()
+    return parsed
+
+def create_default_registry() -> EngineRegistry:
+    """
+    Registry of the built-in engines plus configured remote engines (not loaded yet)
+
+    Environment:
+        OCR_ENGINE_WEIGHTS: 'engine=weight,...' ranking weights (default 1.0, 0 disables an engine)
+        OCR_REMOTE_ENGINES: 'name=url,...' remote /api/ml/ocr/raw endpoints used as engines
+        OCR_REMOTE_TIMEOUT: Seconds allowed per page for remote engines
+        ONNX_OCR_REPLACES_PADDLE: Skip stock PaddleOCR when the ONNX engine loads
+
+    Returns:
+        EngineRegistry in result order: paddleocr, onnxocr, easyocr, tesseract, remote engines
+    """
+    weights = {name: float(weight) for name, weight in parse_engine_list(os.getenv('OCR_ENGINE_WEIGHTS', '')).items()}
+    onnx_replaces_paddle = os.getenv('ONNX_OCR_REPLACES_PADDLE', 'true').lower() == 'true'
+
+    registry = EngineRegistry()
+    # The ONNX engine runs the same models, so stock PaddleOCR is skipped unless both are wanted
+    registry.register(PaddleOCREngine(weights.get('paddleocr', 1.0)),
+                      replaced_by='onnxocr' if onnx_replaces_paddle else None)
+    for engine_type in (ONNXOCREngine, EasyOCREngine, TesseractEngine):
+        registry.register(engine_type(weights.get(engine_type.name, 1.0)))
+
+    timeout = float(os.getenv('OCR_REMOTE_TIMEOUT', '30'))
+    for name, url in parse_engine_list(os.getenv('OCR_REMOTE_ENGINES', '')).items():
+        registry.register(RemoteOCREngine(name, url, weight=weights.get(name, 1.0), timeout=timeout))
+
+    return registry
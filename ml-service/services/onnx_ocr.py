@@ -0,0 +1,362 @@
+import json
+import logging
+import math
+import os
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+
+# PaddleOCR detection preprocessing: ImageNet statistics applied to the BGR image
+DET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+DET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+def create_session(model_path: Path, intra_op_threads: int = 0, inter_op_threads: int = 1):
+    """
+    CPU inference session with explicit thread pools
+
+    Args:
+        model_path: ONNX model file
+        intra_op_threads: Threads used inside one operator (0 = ONNX Runtime default, one per core)
+        inter_op_threads: Operators run concurrently (1 = sequential execution)
+
+    Returns:
+        onnxruntime.InferenceSession
+    """
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = intra_op_threads
+    options.inter_op_num_threads = inter_op_threads
+    options.execution_mode = (ort.ExecutionMode.ORT_PARALLEL if inter_op_threads > 1
+                              else ort.ExecutionMode.ORT_SEQUENTIAL)
+    # Idle workers would otherwise busy-wait and steal cores from concurrent requests
+    options.add_session_config_entry('session.intra_op.allow_spinning', '0')
+    return ort.InferenceSession(str(model_path), sess_options=options, providers=['CPUExecutionProvider'])
+
+def resize_for_detection(image: np.ndarray, limit_side_len: int = 960) -> Tuple[np.ndarray, Tuple[float, float]]:
+    """Shrink so the longest side is at most limit_side_len and both sides are multiples of 32"""
+    height, width = image.shape[:2]
+    ratio = min(1.0, limit_side_len / max(height, width))
+    resize_height = max(32, int(round(height * ratio / 32)) * 32)
+    resize_width = max(32, int(round(width * ratio / 32)) * 32)
+    resized = cv2.resize(image, (resize_width, resize_height))
+    return resized, (resize_height / height, resize_width / width)
+
+def order_box_points(points: np.ndarray) -> np.ndarray:
+    """Order four corners as top-left, top-right, bottom-right, bottom-left"""
+    points = points[np.argsort(points[:, 0])]
+    left = points[:2][np.argsort(points[:2, 1])]
+    right = points[2:][np.argsort(points[2:, 1])]
+    return np.array([left[0], right[0], right[1], left[1]], dtype=np.float32)
+
+def _mini_box(contour: np.ndarray) -> Tuple[np.ndarray, float]:
+    rect = cv2.minAreaRect(contour)
+    return order_box_points(cv2.boxPoints(rect)), min(rect[1])
+
+def _box_score(pred: np.ndarray, points: np.ndarray) -> float:
+    """Mean probability inside the box"""
+    height, width = pred.shape
+    xmin = int(np.clip(np.floor(points[:, 0].min()), 0, width - 1))
+    xmax = int(np.clip(np.ceil(points[:, 0].max()), 0, width - 1))
+    ymin = int(np.clip(np.floor(points[:, 1].min()), 0, height - 1))
+    ymax = int(np.clip(np.ceil(points[:, 1].max()), 0, height - 1))
+
+    mask = np.zeros((ymax - ymin + 1, xmax - xmin + 1), dtype=np.uint8)
+    local = points - np.array([xmin, ymin], dtype=np.float32)
+    cv2.fillPoly(mask, [local.round().astype(np.int32)], 1)
+    return cv2.mean(pred[ymin:ymax + 1, xmin:xmax + 1], mask)[0]
+
+def _unclip(points: np.ndarray, unclip_ratio: float) -> np.ndarray:
+    """
+    Grow a box outward by area * ratio / perimeter (the DB paper's offset)
+
+    The boxes here are rectangles, so offsetting the rotated rectangle gives the
+    same result as a polygon offset followed by minAreaRect.
+    """
+    area = cv2.contourArea(points)
+    perimeter = cv2.arcLength(points, True)
+    distance = area * unclip_ratio / perimeter if perimeter else 0.0
+    (cx, cy), (w, h), angle = cv2.minAreaRect(points)
+    return cv2.boxPoints(((cx, cy), (w + 2 * distance, h + 2 * distance), angle))
+
+def boxes_from_probability_map(pred: np.ndarray, threshold: float = 0.3, box_threshold: float = 0.6,
+                               unclip_ratio: float = 1.5, max_candidates: int = 1000,
+                               min_size: int = 3) -> List[Tuple[np.ndarray, float]]:
+    """
+    DB post-processing: text boxes from the detector's probability map
+
+    Args:
+        pred: Probability map (H x W, values 0-1)
+        threshold: Pixel probability counted as text
+        box_threshold: Minimum mean probability inside a kept box
+        unclip_ratio: How far boxes are grown back out (DB shrinks text regions)
+        max_candidates: Most contours considered
+        min_size: Shortest box side kept, in map pixels
+
+    Returns:
+        List of (4x2 box in map coordinates, score)
+    """
+    bitmap = (pred > threshold).astype(np.uint8) * 255
+    contours, _ = cv2.findContours(bitmap, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+
+    boxes = []
+    for contour in contours[:max_candidates]:
+        points, short_side = _mini_box(contour)
+        if short_side < min_size:
+            continue
+        score = _box_score(pred, points)
+        if score < box_threshold:
+            continue
+        points, short_side = _mini_box(_unclip(points, unclip_ratio))
+        if short_side < min_size + 2:
+            continue
+        boxes.append((points, score))
+    return boxes
+
+def sort_boxes(boxes: List[np.ndarray], line_tolerance: float = 10.0) -> List[np.ndarray]:
+    """Reading order: top to bottom, left to right within a line"""
+    ordered = sorted(boxes, key=lambda box: (box[0][1], box[0][0]))
+    for i in range(len(ordered) - 1):
+        for j in range(i, -1, -1):
+            if abs(ordered[j + 1][0][1] - ordered[j][0][1]) < line_tolerance and \
+                    ordered[j + 1][0][0] < ordered[j][0][0]:
+                ordered[j], ordered[j + 1] = ordered[j + 1], ordered[j]
+            else:
+                break
+    return ordered
+
+def crop_text_region(image: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """Perspective-crop a (possibly rotated) text box; tall crops are turned to horizontal"""
+    points = points.astype(np.float32)
+    width = int(max(np.linalg.norm(points[0] - points[1]), np.linalg.norm(points[2] - points[3])))
+    height = int(max(np.linalg.norm(points[0] - points[3]), np.linalg.norm(points[1] - points[2])))
+    width, height = max(width, 1), max(height, 1)
+    target = np.array([[0, 0], [width, 0], [width, height], [0, height]], dtype=np.float32)
+    matrix = cv2.getPerspectiveTransform(points, target)
+    crop = cv2.warpPerspective(image, matrix, (width, height), flags=cv2.INTER_CUBIC,
+                               borderMode=cv2.BORDER_REPLICATE)
+    if crop.shape[0] / crop.shape[1] >= 1.5:
+        crop = np.ascontiguousarray(np.rot90(crop))
+    return crop
+
+def recognition_batch(crops: List[np.ndarray], image_shape: Tuple[int, int, int],
+                      fixed_width: Optional[int] = None) -> np.ndarray:
+    """
+    Resize crops to the recognizer height, normalize to [-1, 1] and pad to one width
+
+    Args:
+        crops: BGR text-line crops
+        image_shape: (channels, height, minimum width) of the recognizer input
+        fixed_width: Exact input width for models exported with a static width
+
+    Returns:
+        Float32 batch (N, C, H, W)
+    """
+    channels, height, min_width = image_shape
+    if fixed_width:
+        batch_width = fixed_width
+    else:
+        max_ratio = max([min_width / height] + [crop.shape[1] / crop.shape[0] for crop in crops])
+        batch_width = int(math.ceil(height * max_ratio))
+
+    batch = np.zeros((len(crops), channels, height, batch_width), dtype=np.float32)
+    for i, crop in enumerate(crops):
+        resized_width = min(batch_width, int(math.ceil(height * crop.shape[1] / crop.shape[0])))
+        resized = cv2.resize(crop, (resized_width, height)).astype(np.float32)
+        resized = (resized / 255.0 - 0.5) / 0.5
+        batch[i, :, :, :resized_width] = resized.transpose(2, 0, 1)
+    return batch
+
+def ctc_greedy_decode(probs: np.ndarray, characters: List[str]) -> List[Tuple[str, float]]:
+    """
+    Greedy CTC decoding: best class per step, repeats collapsed, blanks (index 0) dropped
+
+    Args:
+        probs: Recognizer output (N, T, C) of per-step class probabilities
+        characters: Class labels, index 0 being the CTC blank
+
+    Returns:
+        List of (text, mean probability of the kept characters)
+    """
+    indices = probs.argmax(axis=2)
+    scores = probs.max(axis=2)
+
+    results = []
+    for index_row, score_row in zip(indices, scores):
+        keep = np.ones(len(index_row), dtype=bool)
+        keep[1:] = index_row[1:] != index_row[:-1]
+        keep &= index_row != 0
+        text = ''.join(characters[i] for i in index_row[keep] if i < len(characters))
+        results.append((text, float(score_row[keep].mean()) if keep.any() else 0.0))
+    return results
+
+def load_characters(dict_path: Path, use_space_char: bool = True) -> List[str]:
+    """CTC labels: blank, the dictionary characters, then optionally a space"""
+    with open(dict_path, encoding='utf-8') as f:
+        characters = [line.rstrip('\r\n') for line in f]
+    if use_space_char:
+        characters.append(' ')
+    return ['blank'] + characters
+
+class ONNXOCRPipeline:
+    """
+    PaddleOCR detection + recognition models running on ONNX Runtime
+
+    Reads a model directory written by ``export_onnx_models.py ocr`` (a manifest
+    plus fp32 and optionally int8 ONNX files). Detection uses DB
+    post-processing and recognition greedy CTC decoding, as PaddleOCR does,
+    without the Paddle runtime.
+    """
+
+    def __init__(self, model_dir: str, precision: str = 'int8', intra_op_threads: int = 0, inter_op_threads: int = 1,
+                 det_limit_side_len: int = 960, det_threshold: float = 0.3, box_threshold: float = 0.6,
+                 unclip_ratio: float = 1.5, rec_batch_size: int = 8, drop_score: float = 0.5):
+        """
+        Load the exported models
+
+        Args:
+            model_dir: Directory containing manifest.json
+            precision: 'int8' (quantized files where exported, fp32 otherwise) or 'fp32'
+            intra_op_threads: ONNX Runtime threads per operator (0 = one per core)
+            inter_op_threads: ONNX Runtime concurrent operators
+            det_limit_side_len: Longest side of the detector input
+            det_threshold: DB pixel threshold
+            box_threshold: DB box score threshold
+            unclip_ratio: DB box expansion
+            rec_batch_size: Text lines recognized per inference call
+            drop_score: Lines recognized below this confidence are discarded
+        """
+        if not ONNXRUNTIME_AVAILABLE:
+            raise ImportError("onnxruntime is not installed")
+
+        self.model_dir = Path(model_dir)
+        with open(self.model_dir / MANIFEST_NAME) as f:
+            self.manifest = json.load(f)
+
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.det_limit_side_len = det_limit_side_len
+        self.det_threshold = det_threshold
+        self.box_threshold = box_threshold
+        self.unclip_ratio = unclip_ratio
+        self.rec_batch_size = rec_batch_size
+        self.drop_score = drop_score
+
+        self.model_files = {}
+        for model in ('det', 'rec'):
+            files = self.manifest[model]
+            self.model_files[model] = files.get(precision) or files['fp32']
+
+        self.det_session = create_session(self.model_dir / self.model_files['det'], intra_op_threads, inter_op_threads)
+        self.rec_session = create_session(self.model_dir / self.model_files['rec'], intra_op_threads, inter_op_threads)
+        self._det_input = self.det_session.get_inputs()[0].name
+        rec_input = self.rec_session.get_inputs()[0]
+        self._rec_input = rec_input.name
+
+        self.rec_image_shape = tuple(self.manifest.get('rec_image_shape', [3, 48, 320]))
+        # Models exported with a static input width must be fed exactly that width
+        self._rec_fixed_width = rec_input.shape[3] if isinstance(rec_input.shape[3], int) else None
+        self.characters = load_characters(self.model_dir / self.manifest['dict'],
+                                          self.manifest.get('use_space_char', True))
+
+    @classmethod
+    def from_env(cls) -> "ONNXOCRPipeline":
+        """Build the pipeline from ONNX_OCR_* environment variables"""
+        return cls(
+            model_dir=os.getenv('ONNX_OCR_MODEL_DIR'),
+            precision=os.getenv('ONNX_OCR_PRECISION', 'int8'),
+            intra_op_threads=int(os.getenv('ONNX_OCR_INTRA_OP_THREADS') or 0),
+            inter_op_threads=int(os.getenv('ONNX_OCR_INTER_OP_THREADS', '1')),
+            det_limit_side_len=int(os.getenv('ONNX_OCR_DET_LIMIT_SIDE_LEN', '960')),
+            rec_batch_size=int(os.getenv('ONNX_OCR_REC_BATCH_SIZE', '8'))
+        )
+
+    def describe(self) -> Dict[str, Any]:
+        """Model files and runtime settings, for status endpoints and benchmark reports"""
+        return {
+            "models": dict(self.model_files),
+            "intra_op_threads": self.intra_op_threads,
+            "inter_op_threads": self.inter_op_threads,
+            "det_limit_side_len": self.det_limit_side_len,
+            "rec_batch_size": self.rec_batch_size
+        }
+
+    def detect(self, image: np.ndarray) -> List[np.ndarray]:
+        """Text boxes (4x2, image coordinates) in reading order"""
+        height, width = image.shape[:2]
+        resized, (ratio_h, ratio_w) = resize_for_detection(image, self.det_limit_side_len)
+        tensor = ((resized.astype(np.float32) / 255.0 - DET_MEAN) / DET_STD).transpose(2, 0, 1)[np.newaxis]
+
+        pred = self.det_session.run(None, {self._det_input: np.ascontiguousarray(tensor)})[0][0, 0]
+        boxes = []
+        for points, _ in boxes_from_probability_map(pred, self.det_threshold, self.box_threshold, self.unclip_ratio):
+            points[:, 0] = np.clip(points[:, 0] / ratio_w, 0, width - 1)
+            points[:, 1] = np.clip(points[:, 1] / ratio_h, 0, height - 1)
+            if min(np.linalg.norm(points[0] - points[1]), np.linalg.norm(points[0] - points[3])) > 3:
+                boxes.append(points)
+        return sort_boxes(boxes)
+
+    def recognize(self, crops: List[np.ndarray]) -> List[Tuple[str, float]]:
+        """Recognize text-line crops; lines of similar aspect ratio are batched together"""
+        results = [("", 0.0)] * len(crops)
+        order = np.argsort([crop.shape[1] / crop.shape[0] for crop in crops])
+        for start in range(0, len(order), self.rec_batch_size):
+            batch_indices = order[start:start + self.rec_batch_size]
+            batch = recognition_batch([crops[i] for i in batch_indices], self.rec_image_shape, self._rec_fixed_width)
+            probs = self.rec_session.run(None, {self._rec_input: batch})[0]
+            for i, decoded in zip(batch_indices, ctc_greedy_decode(probs, self.characters)):
+                results[i] = decoded
+        return results
+
+    def ocr(self, image: np.ndarray) -> List[Tuple[np.ndarray, str, float]]:
+        """
+        Detect and recognize all text lines
+
+        Args:
+            image: BGR (or grayscale) page
+
+        Returns:
+            List of (box, text, confidence) in reading order, low-confidence lines dropped
+        """
+        return self.ocr_batch([image])[0]
+
+    def ocr_batch(self, images: List[np.ndarray]) -> List[List[Tuple[np.ndarray, str, float]]]:
+        """
+        Detect each page, then recognize the text lines of all pages together
+
+        Pooling lines across pages fills recognition batches that a single
+        short page would leave mostly empty.
+
+        Args:
+            images: BGR (or grayscale) pages
+
+        Returns:
+            One list of (box, text, confidence) per page, as ocr() returns
+        """
+        pages = []
+        crops = []
+        for image in images:
+            if image.ndim == 2:
+                image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+            boxes = self.detect(image)
+            pages.append(boxes)
+            crops.extend(crop_text_region(image, box) for box in boxes)
+
+        recognized = iter(self.recognize(crops) if crops else [])
+        results = []
+        for boxes in pages:
+            lines = [(box, *next(recognized)) for box in boxes]
+            results.append([(box, text, score) for box, text, score in lines
+                            if text.strip() and score >= self.drop_score])
+        return results
@@ -0,0 +1,193 @@
+import linecache
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Any, Optional, List
+
+logger = logging.getLogger(__name__)
+
+# Per-thread CPU clocks are available on Linux/macOS; elsewhere CPU mode falls back to idle filtering
+THREAD_CPU_CLOCK_AVAILABLE = hasattr(time, 'pthread_getcpuclockid')
+
+# Leaf frames in these modules are a thread waiting, not working
+_IDLE_MODULES = ('threading.py', 'selectors.py', 'queue.py', 'socket.py', 'ssl.py',
+                 'base_events.py', 'concurrent/futures/thread.py')
+
+# First dotted call on a source line, e.g. "cv2.bilateralFilter" or "self.model.readtext"
+_CALL_PATTERN = re.compile(r"([A-Za-z_][\w\.\[\]'\"]*\.[A-Za-z_]\w*)\s*\(")
+
+class SamplingProfiler:
+    """
+    Statistical profiler that samples the Python stacks of every live thread
+
+    Wall-clock mode counts every sample; CPU mode weights each sample by the
+    CPU time the thread consumed since the previous sample, so threads that
+    are blocked or idle drop out. Native calls (OpenCV, engine inference) show
+    up as a synthetic leaf frame naming the call on the sampled source line,
+    e.g. ``native:cv2.bilateralFilter``.
+    """
+
+    def __init__(self, interval: float = 0.005, mode: str = 'wall', thread_prefixes: Optional[List[str]] = None):
+        """
+        Initialize the profiler
+
+        Args:
+            interval: Seconds between samples
+            mode: 'wall' for wall-clock time, 'cpu' for on-CPU time
+            thread_prefixes: Only sample threads whose name starts with one of these prefixes
+        """
+        if mode not in ('wall', 'cpu'):
+            raise ValueError("mode must be 'wall' or 'cpu'")
+        self.interval = interval
+        self.mode = mode
+        self.thread_prefixes = thread_prefixes or []
+        self.stacks = Counter()
+        self.samples = 0
+        self.duration = 0.0
+        self._cpu_clocks = {}
+        self._last_cpu = {}
+
+    def _thread_names(self) -> Dict[int, str]:
+        return {thread.ident: thread.name for thread in threading.enumerate()}
+
+    def _include_thread(self, name: str) -> bool:
+        if not self.thread_prefixes:
+            return True
+        return any(name.startswith(prefix) for prefix in self.thread_prefixes)
+
+    def _cpu_delta(self, thread_id: int) -> Optional[float]:
+        """CPU seconds consumed by a thread since its previous sample"""
+        try:
+            clock = self._cpu_clocks.get(thread_id)
+            if clock is None:
+                clock = time.pthread_getcpuclockid(thread_id)
+                self._cpu_clocks[thread_id] = clock
+            now = time.clock_gettime(clock)
+        except (OSError, OverflowError, ValueError):
+            return None
+        previous = self._last_cpu.get(thread_id, now)
+        self._last_cpu[thread_id] = now
+        return now - previous
+
+    @staticmethod
+    def _format_frame(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+    @staticmethod
+    def _native_call(frame) -> Optional[str]:
+        """Name the extension call being executed on the leaf frame's line, if any"""
+        line = linecache.getline(frame.f_code.co_filename, frame.f_lineno)
+        match = _CALL_PATTERN.search(line)
+        return f"native:{match.group(1)}" if match else None
+
+    @staticmethod
+    def _is_idle(frame) -> bool:
+        filename = frame.f_code.co_filename.replace('\\', '/')
+        return filename.endswith(_IDLE_MODULES) or frame.f_code.co_name in ('sleep', 'select', 'poll', 'wait')
+
+    def sample(self, skip_thread: Optional[int] = None):
+        """Take one sample of all (matching) threads"""
+        names = self._thread_names()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == skip_thread:
+                continue
+            name = names.get(thread_id, f"thread-{thread_id}")
+            if not self._include_thread(name):
+                continue
+
+            weight = 1
+            if self.mode == 'cpu':
+                if THREAD_CPU_CLOCK_AVAILABLE:
+                    delta = self._cpu_delta(thread_id)
+                    if delta is None:
+                        continue
+                    # Weight in microseconds of CPU time so the flamegraph is proportional to CPU
+                    weight = int(delta * 1e6)
+                    if weight <= 0:
+                        continue
+                elif self._is_idle(frame):
+                    continue
+
+            frames = []
+            leaf = frame
+            while frame is not None:
+                frames.append(self._format_frame(frame))
+                frame = frame.f_back
+            frames.reverse()
+
+            native = self._native_call(leaf)
+            if native:
+                frames.append(native)
+
+            key = ";".join([name.replace(' ', '_')] + [f.replace(';', ':') for f in frames])
+            self.stacks[key] += weight
+        self.samples += 1
+
+    def run(self, duration: float) -> "SamplingProfiler":
+        """
+        Sample for a number of seconds on the calling thread
+
+        Args:
+            duration: Seconds to profile
+
+        Returns:
+            self, with stacks populated
+        """
+        own_thread = threading.get_ident()
+        start = time.perf_counter()
+        deadline = start + duration
+
+        # Prime the CPU clocks so the first sample has a baseline
+        if self.mode == 'cpu' and THREAD_CPU_CLOCK_AVAILABLE:
+            for thread_id in sys._current_frames():
+                self._cpu_delta(thread_id)
+
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            self.sample(skip_thread=own_thread)
+            time.sleep(max(0.0, min(self.interval, deadline - time.perf_counter())))
+
+        self.duration = time.perf_counter() - start
+        return self
+
+    def collapsed(self) -> str:
+        """Render stacks in the collapsed format read by flamegraph.pl, speedscope and inferno"""
+        lines = [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "interval": self.interval,
+            "duration": self.duration,
+            "samples": self.samples,
+            "unique_stacks": len(self.stacks)
+        }
+
+_profile_lock = threading.Lock()
+
+def profile_process(seconds: float, mode: str = 'wall', interval: float = 0.005,
+                    thread_prefixes: Optional[List[str]] = None) -> SamplingProfiler:
+    """
+    Profile the live process, allowing only one profile at a time
+
+    Raises:
+        RuntimeError: If another profile is already running
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("A profile is already running")
+    try:
+        logger.info(f"Starting {mode} profile for {seconds}s (interval {interval * 1000:.1f}ms)")
+        profiler = SamplingProfiler(interval=interval, mode=mode, thread_prefixes=thread_prefixes)
+        profiler.run(seconds)
+        logger.info(f"Profile finished: {profiler.summary()}")
+        return profiler
+    finally:
+        _profile_lock.release()
@@ -0,0 +1,206 @@
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Any, Optional, Tuple, Callable
+
+from services.metrics import QUEUE_WAIT
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_CLASSES = ('interactive', 'bulk')
+DEFAULT_TENANT = "default"
+
+# Request headers naming the tenant (lecturer, department) and asking for bulk scheduling
+TENANT_HEADER = "X-Tenant-ID"
+PRIORITY_HEADER = "X-Request-Priority"
+
+_request_class = contextvars.ContextVar('request_class', default=(DEFAULT_TENANT, 'interactive'))
+
+def set_request_class(tenant: str, priority: str) -> contextvars.Token:
+    """Schedule model work started from this context as (tenant, priority); returns a token for reset"""
+    if priority not in PRIORITY_CLASSES:
+        raise ValueError(f"Unknown priority class '{priority}' (expected one of {PRIORITY_CLASSES})")
+    return _request_class.set((tenant or DEFAULT_TENANT, priority))
+
+def reset_request_class(token: contextvars.Token):
+    _request_class.reset(token)
+
+def current_request_class() -> Tuple[str, str]:
+    """(tenant, priority) of the current request"""
+    return _request_class.get()
+
+class _Waiter:
+    def __init__(self, tenant: str, priority: str, loop: asyncio.AbstractEventLoop, enqueued_at: float):
+        self.tenant = tenant
+        self.priority = priority
+        self.loop = loop
+        self.future = loop.create_future()
+        self.enqueued_at = enqueued_at
+        self.granted = False
+        self.cancelled = False
+
+class FairRequestScheduler:
+    """
+    Hands out model worker slots by priority class, then round-robin across tenants
+
+    Interactive requests (single pages, single answers) go ahead of bulk
+    batch items, but after ``interactive_burst`` interactive grants in a row
+    one waiting bulk item is let through so batches keep draining. Bulk work
+    never holds more than ``slots - reserved_interactive`` slots, so an
+    interactive request only waits for another interactive one. Within a
+    class, tenants take turns: a tenant with 500 queued pages gets one slot
+    per round like a tenant with one.
+    """
+
+    def __init__(self, slots: int, interactive_burst: int = 4, reserved_interactive: Optional[int] = None,
+                 max_tenant_labels: int = 100, clock: Callable[[], float] = time.perf_counter):
+        """
+        Args:
+            slots: Model calls running at once (the worker pool size)
+            interactive_burst: Interactive grants in a row before a waiting bulk item gets a slot
+            reserved_interactive: Slots bulk work may not use (default: 1 when there are several slots)
+            max_tenant_labels: Tenants with their own metric labels; later tenants are labelled 'other'
+            clock: Time source for queue times
+        """
+        self.slots = slots
+        self.interactive_burst = max(1, interactive_burst)
+        if reserved_interactive is None:
+            reserved_interactive = 1 if slots > 1 else 0
+        self.reserved_interactive = min(max(reserved_interactive, 0), slots - 1)
+        self.max_tenant_labels = max_tenant_labels
+        self._clock = clock
+        self._queues: Dict[str, "OrderedDict[str, deque]"] = {priority: OrderedDict() for priority in PRIORITY_CLASSES}
+        self._running = {priority: 0 for priority in PRIORITY_CLASSES}
+        self._interactive_streak = 0
+        self._granted: Dict[str, Dict[str, int]] = {}
+        self._tenant_labels = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, slots: int) -> "FairRequestScheduler":
+        """Build the scheduler from ML_INTERACTIVE_* and ML_TENANT_LABEL_LIMIT settings"""
+        reserved = os.getenv('ML_INTERACTIVE_RESERVED_WORKERS', '')
+        return cls(
+            slots=slots,
+            interactive_burst=int(os.getenv('ML_INTERACTIVE_BURST', '4')),
+            reserved_interactive=int(reserved) if reserved.strip() else None,
+            max_tenant_labels=int(os.getenv('ML_TENANT_LABEL_LIMIT', '100'))
+        )
+
+    @property
+    def bulk_slots(self) -> int:
+        return self.slots - self.reserved_interactive
+
+    async def acquire(self, tenant: str, priority: str):
+        """Wait for a worker slot; call release() with the same priority once the work is done"""
+        waiter = _Waiter(tenant, priority, asyncio.get_running_loop(), self._clock())
+        with self._lock:
+            self._queues[priority].setdefault(tenant, deque()).append(waiter)
+            self._dispatch()
+            if waiter.granted:
+                return
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.granted:
+                    self._release_locked(priority)
+                else:
+                    waiter.cancelled = True
+            raise
+
+    def release(self, priority: str):
+        """Return a slot and grant it to the next waiting request"""
+        with self._lock:
+            self._release_locked(priority)
+
+    def _release_locked(self, priority: str):
+        self._running[priority] -= 1
+        self._dispatch()
+
+    def _has_waiting(self, priority: str) -> bool:
+        queues = self._queues[priority]
+        for tenant in list(queues):
+            waiting = queues[tenant]
+            while waiting and waiting[0].cancelled:
+                waiting.popleft()
+            if waiting:
+                return True
+            del queues[tenant]
+        return False
+
+    def _next_priority(self) -> Optional[str]:
+        interactive = self._has_waiting('interactive')
+        bulk = self._has_waiting('bulk') and self._running['bulk'] < self.bulk_slots
+        if interactive and bulk:
+            if self._interactive_streak >= self.interactive_burst:
+                self._interactive_streak = 0
+                return 'bulk'
+            self._interactive_streak += 1
+            return 'interactive'
+        if interactive:
+            self._interactive_streak = 0
+            return 'interactive'
+        if bulk:
+            self._interactive_streak = 0
+            return 'bulk'
+        return None
+
+    def _dispatch(self):
+        """Grant free slots; the lock is held"""
+        while sum(self._running.values()) < self.slots:
+            priority = self._next_priority()
+            if priority is None:
+                return
+
+            # The tenant at the front gets one slot and goes to the back of the round
+            queues = self._queues[priority]
+            tenant, waiting = next(iter(queues.items()))
+            waiter = waiting.popleft()
+            if waiting:
+                queues.move_to_end(tenant)
+            else:
+                del queues[tenant]
+            self._grant(waiter)
+
+    def _grant(self, waiter: _Waiter):
+        waiter.granted = True
+        self._running[waiter.priority] += 1
+        label = self._tenant_label(waiter.tenant)
+        counts = self._granted.setdefault(label, {priority: 0 for priority in PRIORITY_CLASSES})
+        counts[waiter.priority] += 1
+        QUEUE_WAIT.labels(priority=waiter.priority, tenant=label).observe(self._clock() - waiter.enqueued_at)
+
+        def wake():
+            if not waiter.future.done():
+                waiter.future.set_result(None)
+
+        waiter.loop.call_soon_threadsafe(wake)
+
+    def _tenant_label(self, tenant: str) -> str:
+        if tenant in self._tenant_labels:
+            return tenant
+        if len(self._tenant_labels) < self.max_tenant_labels:
+            self._tenant_labels.add(tenant)
+            return tenant
+        return "other"
+
+    def report(self) -> Dict[str, Any]:
+        """Settings, running and waiting work per class, and slots granted per tenant"""
+        with self._lock:
+            waiting = {priority: {tenant: sum(1 for w in queue if not w.cancelled)
+                                  for tenant, queue in self._queues[priority].items()}
+                       for priority in PRIORITY_CLASSES}
+            return {
+                "slots": self.slots,
+                "reserved_interactive": self.reserved_interactive,
+                "interactive_burst": self.interactive_burst,
+                "running": dict(self._running),
+                "waiting": waiting,
+                "granted": {tenant: dict(counts) for tenant, counts in self._granted.items()}
+            }
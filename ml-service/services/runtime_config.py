@@ -0,0 +1,223 @@
+import asyncio
+import contextvars
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Optional
+
+from services.metrics import QUEUE_DEPTH
+from services.request_scheduler import FairRequestScheduler, current_request_class
+
+try:
+    from threadpoolctl import threadpool_info, threadpool_limits
+    THREADPOOLCTL_AVAILABLE = True
+except ImportError:
+    THREADPOOLCTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# OpenMP/BLAS pools (NumPy, OpenCV's OpenMP build, Paddle's MKL) size themselves from these when first loaded
+BLAS_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS',
+                 'NUMEXPR_NUM_THREADS')
+
+# Settings of this service's own engines that default to the per-request thread count
+ENGINE_THREAD_ENV_VARS = ('PADDLEOCR_CPU_THREADS', 'ONNX_OCR_INTRA_OP_THREADS', 'EMBEDDING_THREADS')
+
+def available_cpus() -> int:
+    """CPUs this process may run on (respects taskset/cgroup CPU affinity)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+class ThreadBudget:
+    """
+    Splits the process's CPUs between request workers and library thread pools
+
+    Each request runs on one of ``workers`` threads, and inside it torch,
+    Paddle, OpenCV, ONNX Runtime and BLAS each use up to ``library_threads``
+    threads, so ``workers * library_threads`` stays close to the CPU count.
+    Without a budget every library sizes its pool to the whole machine, and
+    concurrent requests oversubscribe the cores.
+    """
+
+    def __init__(self, cpus: Optional[int] = None, workers: Optional[int] = None,
+                 library_threads: Optional[int] = None):
+        """
+        Args:
+            cpus: CPUs to budget (default: CPUs available to the process)
+            workers: Requests processed concurrently (default: up to 4, never more than the CPUs)
+            library_threads: Threads per library per request (default: cpus // workers)
+        """
+        self.cpus = cpus or available_cpus()
+        self.workers = workers or max(1, min(4, self.cpus))
+        self.library_threads = library_threads or max(1, self.cpus // self.workers)
+
+    @classmethod
+    def from_env(cls) -> "ThreadBudget":
+        """Build the budget from ML_CPU_BUDGET, ML_WORKER_THREADS and ML_LIBRARY_THREADS (0 = derived)"""
+        return cls(
+            cpus=int(os.getenv('ML_CPU_BUDGET', '0')) or None,
+            workers=int(os.getenv('ML_WORKER_THREADS', '0')) or None,
+            library_threads=int(os.getenv('ML_LIBRARY_THREADS', '0')) or None
+        )
+
+    def configure_environment(self):
+        """
+        Export thread counts that libraries read when they load
+
+        Must run before NumPy, OpenCV, torch or Paddle are imported. Variables
+        already set to a value are left alone, so explicit settings win.
+        """
+        for var in BLAS_ENV_VARS + ENGINE_THREAD_ENV_VARS:
+            if not os.environ.get(var):
+                os.environ[var] = str(self.library_threads)
+
+    def enforce(self) -> Dict[str, Any]:
+        """
+        Apply the budget to thread pools of libraries that are already loaded
+
+        Libraries are not imported here; call again after loading models,
+        since some libraries resize their pools on import.
+
+        Returns:
+            Effective settings as reported by the libraries
+        """
+        threads = self.library_threads
+
+        if 'torch' in sys.modules:
+            torch = sys.modules['torch']
+            torch.set_num_threads(threads)
+            try:
+                # Only allowed before torch runs any parallel work
+                torch.set_num_interop_threads(1)
+            except RuntimeError:
+                pass
+
+        if 'cv2' in sys.modules:
+            sys.modules['cv2'].setNumThreads(threads)
+
+        if THREADPOOLCTL_AVAILABLE:
+            threadpool_limits(limits=threads)
+
+        return self.effective_settings()
+
+    def effective_settings(self) -> Dict[str, Any]:
+        """Budget plus the thread counts each loaded library actually reports"""
+        libraries = {}
+        if 'torch' in sys.modules:
+            torch = sys.modules['torch']
+            libraries['torch'] = {"intra_op": torch.get_num_threads(), "inter_op": torch.get_num_interop_threads()}
+        if 'cv2' in sys.modules:
+            libraries['opencv'] = sys.modules['cv2'].getNumThreads()
+        if THREADPOOLCTL_AVAILABLE:
+            libraries['blas'] = [
+                {"library": info.get('internal_api'), "threads": info.get('num_threads')}
+                for info in threadpool_info()
+            ]
+        libraries['paddle'] = int(os.environ.get('PADDLEOCR_CPU_THREADS') or 0)
+        libraries['onnxruntime'] = int(os.environ.get('ONNX_OCR_INTRA_OP_THREADS') or 0)
+        libraries['embedding'] = int(os.environ.get('EMBEDDING_THREADS') or 0)
+
+        return {
+            "enabled": thread_budget_enabled(),
+            "cpus": self.cpus,
+            "workers": self.workers,
+            "library_threads": self.library_threads,
+            "threads_per_cpu": self.workers * self.library_threads / self.cpus,
+            "environment": {var: os.environ.get(var) for var in BLAS_ENV_VARS},
+            "libraries": libraries
+        }
+
+class RequestWorkerPool:
+    """
+    Bounded thread pool for blocking model calls made from async endpoints
+
+    Keeps OCR and marking off the event loop while capping concurrent model
+    work at the thread budget's worker count. Waiting calls are admitted by
+    the request's priority class and tenant (see FairRequestScheduler). Each
+    call runs in a copy of the caller's context, so tracing spans opened in
+    the worker attach to the request's trace.
+    """
+
+    def __init__(self, workers: int, scheduler: Optional[FairRequestScheduler] = None):
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ml-worker')
+        self.scheduler = scheduler or FairRequestScheduler(workers)
+        self._waiting = QUEUE_DEPTH.labels(queue='worker_pool')
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """Run func(*args, **kwargs) on a worker thread once the request's turn comes, and await its result"""
+        context = contextvars.copy_context()
+        tenant, priority = current_request_class()
+        self._waiting.inc()
+
+        def call():
+            self._waiting.dec()
+            return context.run(func, *args, **kwargs)
+
+        def done(future):
+            if future.cancelled():
+                self._waiting.dec()
+            self.scheduler.release(priority)
+
+        try:
+            await self.scheduler.acquire(tenant, priority)
+        except BaseException:
+            self._waiting.dec()
+            raise
+        try:
+            future = self.executor.submit(call)
+        except BaseException:
+            self._waiting.dec()
+            self.scheduler.release(priority)
+            raise
+        # A cancelled request cannot stop a call that is already running, so the
+        # slot is only returned once the worker thread is done with it
+        future.add_done_callback(done)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+_budget = None
+_worker_pool = None
+_lock = threading.Lock()
+
+def thread_budget_enabled() -> bool:
+    return os.getenv('ML_THREAD_BUDGET', 'true').lower() == 'true'
+
+def apply_thread_budget() -> ThreadBudget:
+    """
+    Process-wide thread budget, configured on first call
+
+    Call before importing the ML services. With ML_THREAD_BUDGET=false the
+    environment is left untouched and libraries keep their own defaults; the
+    worker pool is still sized from the budget.
+
+    Returns:
+        The shared ThreadBudget
+    """
+    global _budget
+    with _lock:
+        if _budget is None:
+            _budget = ThreadBudget.from_env()
+            if thread_budget_enabled():
+                _budget.configure_environment()
+                _budget.enforce()
+                logger.info(f"🧵 Thread budget: {_budget.workers} workers x {_budget.library_threads} "
+                            f"threads per library on {_budget.cpus} CPUs")
+            else:
+                logger.info("ℹ️  Thread budget disabled (ML_THREAD_BUDGET=false)")
+    return _budget
+
+def get_worker_pool() -> RequestWorkerPool:
+    """Process-wide request worker pool sized by the thread budget"""
+    global _worker_pool
+    budget = apply_thread_budget()
+    with _lock:
+        if _worker_pool is None:
+            _worker_pool = RequestWorkerPool(budget.workers, FairRequestScheduler.from_env(budget.workers))
+    return _worker_pool
@@ -0,0 +1,89 @@
+import asyncio
+import hashlib
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict
+
+from services.metrics import SINGLE_FLIGHT_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+def request_key(*parts: Any) -> str:
+    """
+    Content hash of a request
+
+    Args:
+        parts: Request content (bytes are hashed as-is, everything else by its repr)
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part if isinstance(part, bytes) else repr(part).encode('utf-8')
+        # Length prefix, so ('ab', 'c') and ('a', 'bc') hash differently
+        digest.update(len(data).to_bytes(8, 'big'))
+        digest.update(data)
+    return digest.hexdigest()
+
+class SingleFlight:
+    """
+    Shares one computation between concurrent identical requests
+
+    The first request with a key starts the computation as its own task;
+    requests with the same key that arrive while it runs await that task
+    instead of starting another. A caller that goes away (client disconnect)
+    does not cancel the computation for the others. Nothing is kept once the
+    computation finishes, so this is coalescing, not caching.
+    """
+
+    def __init__(self, endpoint: str, enabled: bool = True):
+        """
+        Args:
+            endpoint: Label for the duplicate metrics
+            enabled: When false every request computes its own result
+        """
+        self.endpoint = endpoint
+        self.enabled = enabled
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @classmethod
+    def from_env(cls, endpoint: str) -> "SingleFlight":
+        """Build from ML_SINGLE_FLIGHT"""
+        return cls(endpoint, enabled=os.getenv('ML_SINGLE_FLIGHT', 'true').lower() == 'true')
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    async def run(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Await the result for key, computing it only if no identical request is in flight
+
+        Args:
+            key: Content hash of the request (see request_key)
+            compute: Starts the computation; called at most once per in-flight key
+
+        Returns:
+            The shared result (treat it as read-only); exceptions are shared too
+        """
+        if not self.enabled:
+            return await compute()
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            SINGLE_FLIGHT_REQUESTS.labels(endpoint=self.endpoint, result='computed').inc()
+        else:
+            logger.info(f"🔁 Joining in-flight {self.endpoint} request {key[:12]}")
+            SINGLE_FLIGHT_REQUESTS.labels(endpoint=self.endpoint, result='shared').inc()
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved when every caller went away before it was raised
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,204 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Header and form flag that opt a request into tracing
+TRACE_HEADER = "X-DeciGarde-Trace"
+
+_current_span = contextvars.ContextVar("decigarde_current_span", default=None)
+
+class Span:
+    """
+    Timed operation inside a traced request
+
+    Spans form a tree rooted at the request span. Attributes carry stage
+    details such as image dimensions or the engine name.
+    """
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, trace_id: Optional[str] = None, **attributes):
+        self.name = name
+        self.parent = parent
+        self.trace_id = trace_id or (parent.trace_id if parent else uuid.uuid4().hex[:16])
+        self.attributes = dict(attributes)
+        self.children: List[Span] = []
+        self.thread_id = threading.get_ident()
+        self.start = time.perf_counter()
+        self.end = None
+        self._lock = threading.Lock()
+        if parent is not None:
+            parent._add_child(self)
+
+    def _add_child(self, child: "Span"):
+        with self._lock:
+            self.children.append(child)
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_image(self, image, prefix: str = ""):
+        """Record the dimensions of an image (numpy array) at this stage"""
+        if image is None or not hasattr(image, "shape"):
+            return
+        self.attributes[f"{prefix}height"] = int(image.shape[0])
+        self.attributes[f"{prefix}width"] = int(image.shape[1])
+        self.attributes[f"{prefix}channels"] = int(image.shape[2]) if len(image.shape) > 2 else 1
+
+    def finish(self):
+        if self.end is None:
+            self.end = time.perf_counter()
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def root(self) -> "Span":
+        span = self
+        while span.parent is not None:
+            span = span.parent
+        return span
+
+    def to_dict(self, origin: Optional[float] = None) -> Dict[str, Any]:
+        """Serialize the span tree with durations and offsets in milliseconds"""
+        origin = self.start if origin is None else origin
+        with self._lock:
+            children = list(self.children)
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "children": [child.to_dict(origin) for child in children]
+        }
+
+    def iter_spans(self):
+        yield self
+        with self._lock:
+            children = list(self.children)
+        for child in children:
+            yield from child.iter_spans()
+
+class _NoopSpan:
+    """Returned when no trace is active, so instrumentation costs almost nothing"""
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_image(self, image, prefix: str = ""):
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+def current_span():
+    """Return the active span, or None when the request is not traced"""
+    return _current_span.get()
+
+@contextmanager
+def start_trace(name: str, **attributes):
+    """
+    Start a new trace rooted at a span for the current request
+
+    Args:
+        name: Root span name (usually the endpoint)
+        attributes: Attributes recorded on the root span
+
+    Yields:
+        Root Span
+    """
+    root = Span(name, **attributes)
+    token = _current_span.set(root)
+    try:
+        yield root
+    finally:
+        root.finish()
+        _current_span.reset(token)
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Record a child span of the active span (no-op outside a trace)
+
+    Args:
+        name: Span name (stage, preprocessing step or engine)
+        attributes: Attributes recorded on the span
+
+    Yields:
+        Span, or a no-op span when tracing is disabled
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+
+    child = Span(name, parent=parent, **attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    finally:
+        child.finish()
+        _current_span.reset(token)
+
+def is_trace_requested(header_value: Optional[str], form_flag: bool = False) -> bool:
+    """Whether a request opted into tracing via the trace header or form flag"""
+    if form_flag:
+        return True
+    return bool(header_value) and header_value.strip().lower() in ("1", "true", "yes", "on")
+
+def to_chrome_trace(root: Span) -> Dict[str, Any]:
+    """
+    Convert a span tree to the Chrome Trace Event format
+
+    The result loads in chrome://tracing, Perfetto and speedscope.
+    """
+    events = []
+    pid = os.getpid()
+    for item in root.iter_spans():
+        events.append({
+            "name": item.name,
+            "cat": "decigarde",
+            "ph": "X",
+            "ts": round((item.start - root.start) * 1e6, 1),
+            "dur": round(item.duration * 1e6, 1),
+            "pid": pid,
+            "tid": item.thread_id,
+            "args": item.attributes
+        })
+    return {
+        "traceEvents": events,
+        "displayTimeUnit": "ms",
+        "otherData": {"trace_id": root.trace_id, "root": root.name}
+    }
+
+def write_trace_file(root: Span, output_dir: Optional[str] = None) -> Optional[str]:
+    """
+    Write a finished trace as Chrome Trace Event JSON
+
+    Args:
+        root: Root span of the trace
+        output_dir: Directory for trace files (defaults to TRACE_OUTPUT_DIR)
+
+    Returns:
+        Path of the written file, or None when no output directory is configured
+    """
+    output_dir = output_dir or os.getenv("TRACE_OUTPUT_DIR")
+    if not output_dir:
+        return None
+
+    try:
+        directory = Path(output_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{int(time.time())}-{root.name.strip('/').replace('/', '_')}-{root.trace_id}.json"
+        with open(path, "w") as f:
+            json.dump(to_chrome_trace(root), f)
+        return str(path)
+    except Exception as e:
+        logger.warning(f"Failed to write trace file: {e}")
+        return None
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Answer Feature Extraction Test
+Checks that precompiled per-subject features count exactly what the former
+inline patterns counted, that normalization is unchanged, and that repeated
+answers are served from the feature cache. No models required.
+
+    python -m pytest -q test_answer_features.py
+"""
+
+import re
+
+import pytest
+
+from services.answer_features import FeatureExtractor, subject_group
+
+ANSWERS = [
+    "F = ma gives 2*5=10 N, and sin x with 3x2 kg in 4 s at 25°C",
+    "The war was very long. It clearly changed Europe. Quite rather obviously.",
+    "A short answer",
+    ""
+]
+
+@pytest.mark.parametrize("answer", ANSWERS)
+def test_counts_match_inline_patterns(answer):
+    extractor = FeatureExtractor(cache_size=0)
+    quantitative = extractor.extract(answer, "Physics")
+    written = extractor.extract(answer, "history")
+
+    assert quantitative.count('math_expressions') == len(re.findall(
+        r'(\d+[\+\-\*/]\d+|\d+[=<>]\d+|\d+[xyz]\d*|\b(sin|cos|tan|log|sqrt)\b)', answer, re.IGNORECASE))
+    assert quantitative.count('units') == len(re.findall(r'\b(kg|m|s|N|J|W|V|A|Ω|°C|°F)\b', answer, re.IGNORECASE))
+    assert written.count('descriptive_words') == len(re.findall(
+        r'\b(very|extremely|quite|rather|somewhat|clearly|obviously)\b', answer, re.IGNORECASE))
+    assert written.word_count == len(answer.split())
+    assert written.sentence_count == len(answer.split('.'))
+
+def test_subject_groups():
+    assert subject_group('Mathematics') == 'quantitative'
+    assert subject_group('geography') == 'written'
+    assert subject_group('biology') == 'general'
+    assert FeatureExtractor().extract("2+2 m", "biology").count('units') == 0
+
+def test_normalize_matches_former_substitutions():
+    text = "  Energy\t= 5 J\n\n(approx.) → 25°C; done!  "
+    expected = re.sub(r'[^\w\s\.\,\!\?\;\:\-\(\)\[\]\{\}]', '', re.sub(r'\s+', ' ', text.strip()))
+
+    assert FeatureExtractor.normalize(text) == expected
+    assert FeatureExtractor.normalize("") == ""
+
+def test_repeated_answers_come_from_the_cache():
+    extractor = FeatureExtractor(cache_size=2)
+    first = extractor.extract("one answer", "math")
+
+    assert extractor.extract("one answer", "physics") is first
+    assert extractor.extract("one answer", "english") is not first
+
+    extractor.extract("two", "math")
+    extractor.extract("three", "math")
+    assert extractor.extract("one answer", "math") is not first
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Integration Client Resilience Test
+Exercises DeciGardeMLClient retries, circuit breaking and hedging against
+in-process stub servers with injected faults. No ML service required.
+
+    python -m pytest -q test_client_resilience.py
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from benchmarks.stub_server import StubServer
+from integration_client import (
+    DeciGardeMLClient, AsyncDeciGardeMLClient, RetryPolicy, CircuitBreaker, HTTPX_AVAILABLE
+)
+
+FAST_RETRIES = RetryPolicy(max_attempts=3, backoff_base=0.01, backoff_max=0.05)
+
+@pytest.fixture
+def servers():
+    started = []
+
+    def start(latency: float = 0.0) -> StubServer:
+        server = StubServer(latency=latency).start()
+        started.append(server)
+        return server
+
+    yield start
+    for server in started:
+        server.stop()
+
+@pytest.fixture
+def image(tmp_path):
+    path = tmp_path / "page.jpg"
+    path.write_bytes(b"not really a jpeg")
+    return path
+
+def test_transient_errors_are_retried(servers, image):
+    server = servers()
+    server.inject_faults(2, status=503)
+
+    with DeciGardeMLClient(server.url, retry_policy=FAST_RETRIES) as client:
+        result = client.process_ocr(image)
+
+    assert result["success"] is True
+    assert server.stats["requests"] == 3
+    assert client.resilience_status()["stats"]["retries"] == 2
+
+def test_dropped_connection_is_retried(servers):
+    server = servers()
+    server.inject_drops(1)
+
+    with DeciGardeMLClient(server.url, retry_policy=FAST_RETRIES) as client:
+        result = client.mark_answer("Q", "A", {"keywords": ["a"]}, 10)
+
+    assert result["success"] is True
+
+def test_client_errors_are_not_retried(servers, image):
+    server = servers()
+    server.inject_faults(1, status=422)
+
+    with DeciGardeMLClient(server.url, retry_policy=FAST_RETRIES) as client:
+        result = client.process_ocr(image)
+
+    assert result == {"success": False, "error": "HTTP 422"}
+    assert server.stats["requests"] == 1
+
+def test_gives_up_after_max_attempts(servers, image):
+    server = servers()
+    server.inject_faults(5, status=500)
+
+    with DeciGardeMLClient(server.url, retry_policy=FAST_RETRIES) as client:
+        result = client.process_ocr(image)
+
+    assert result == {"success": False, "error": "HTTP 500"}
+    assert server.stats["requests"] == 3
+
+def test_transient_server_error_is_retried_and_trips_the_breaker(servers, image):
+    server = servers()
+    server.inject_faults(1, status=500)
+
+    with DeciGardeMLClient(server.url, retry_policy=FAST_RETRIES, breaker_threshold=2, breaker_reset=60) as client:
+        recovered = client.process_ocr(image)
+        assert server.stats["requests"] == 2
+        assert client.resilience_status()["breakers"][server.url] == CircuitBreaker.CLOSED
+
+        # Two 500s in a row reach the threshold and open the circuit
+        server.inject_faults(2, status=500)
+        failed = client.process_ocr(image)
+        state = client.resilience_status()["breakers"][server.url]
+
+    assert recovered["success"] is True
+    assert failed["success"] is False
+    assert state == CircuitBreaker.OPEN
+
+def test_retry_after_is_honoured(servers, image):
+    server = servers()
+    server.inject_faults(1, status=429, retry_after=0.2)
+
+    policy = RetryPolicy(max_attempts=2, backoff_base=0.01, backoff_max=1.0)
+    with DeciGardeMLClient(server.url, retry_policy=policy) as client:
+        start = time.monotonic()
+        result = client.process_ocr(image)
+
+    assert result["success"] is True
+    assert time.monotonic() - start >= 0.2
+
+def test_retries_fail_over_to_replica(servers, image):
+    primary, replica = servers(), servers()
+    primary.inject_faults(1, status=502)
+
+    with DeciGardeMLClient(primary.url, replica_urls=[replica.url], retry_policy=FAST_RETRIES) as client:
+        result = client.process_ocr(image)
+
+    assert result["success"] is True
+    assert primary.stats["requests"] == 1
+    assert replica.stats["requests"] == 1
+
+def test_circuit_opens_and_skips_unhealthy_instance(servers, image):
+    primary, replica = servers(), servers()
+    primary.inject_faults(10, status=500)
+
+    with DeciGardeMLClient(primary.url, replica_urls=[replica.url], retry_policy=RetryPolicy(max_attempts=1),
+                           breaker_threshold=2, breaker_reset=60) as client:
+        client.process_ocr(image)
+        client.process_ocr(image)
+        assert client.resilience_status()["breakers"][primary.url] == CircuitBreaker.OPEN
+
+        results = [client.process_ocr(image) for _ in range(3)]
+
+    assert all(result["success"] for result in results)
+    assert primary.stats["requests"] == 2
+    assert replica.stats["requests"] == 3
+
+def test_open_circuit_fails_fast(servers, image):
+    server = servers()
+    server.inject_faults(10, status=500)
+
+    with DeciGardeMLClient(server.url, retry_policy=RetryPolicy(max_attempts=1),
+                           breaker_threshold=1, breaker_reset=60) as client:
+        client.process_ocr(image)
+        result = client.process_ocr(image)
+
+    assert result["success"] is False
+    assert "Circuit open" in result["error"]
+    assert server.stats["requests"] == 1
+
+def test_half_open_probe_closes_circuit(servers, image):
+    server = servers()
+    server.inject_faults(1, status=500)
+
+    with DeciGardeMLClient(server.url, retry_policy=RetryPolicy(max_attempts=1),
+                           breaker_threshold=1, breaker_reset=0.1) as client:
+        client.process_ocr(image)
+        assert client.resilience_status()["breakers"][server.url] == CircuitBreaker.OPEN
+
+        time.sleep(0.15)
+        result = client.process_ocr(image)
+
+    assert result["success"] is True
+    assert client.resilience_status()["breakers"][server.url] == CircuitBreaker.CLOSED
+
+def test_slow_ocr_is_hedged_to_replica(servers, image):
+    slow, fast = servers(latency=1.0), servers()
+
+    with DeciGardeMLClient(slow.url, replica_urls=[fast.url], hedge_after=0.1) as client:
+        start = time.monotonic()
+        result = client.process_ocr(image)
+        elapsed = time.monotonic() - start
+
+    assert result["success"] is True
+    assert elapsed < 0.8
+    stats = client.resilience_status()["stats"]
+    assert stats["hedges"] == 1
+    assert stats["hedge_wins"] == 1
+
+def test_hedge_delay_follows_latency_percentile(servers, image):
+    primary, replica = servers(), servers()
+
+    with DeciGardeMLClient(primary.url, replica_urls=[replica.url], hedge_percentile=95) as client:
+        # Not enough history yet: no hedging
+        assert client._hedge_delay("/api/ml/ocr") is None
+        for _ in range(25):
+            client.process_ocr(image)
+        delay = client._hedge_delay("/api/ml/ocr")
+        p95 = client._latencies["/api/ml/ocr"].percentile(95)
+
+    # Whether a later call happens to be slower than p95 (and gets hedged) is timing noise; only check the delay
+    assert delay is not None and delay == p95
+    assert delay < 0.5
+
+@pytest.mark.skipif(not HTTPX_AVAILABLE, reason="httpx not installed")
+def test_async_client_retries_and_hedges(servers, image):
+    flaky, slow_primary, fast = servers(), servers(latency=1.0), servers()
+    flaky.inject_faults(1, status=503)
+
+    async def scenario():
+        async with AsyncDeciGardeMLClient(flaky.url, retry_policy=FAST_RETRIES) as client:
+            retried = await client.process_ocr(image)
+        async with AsyncDeciGardeMLClient(slow_primary.url, replica_urls=[fast.url], hedge_after=0.1) as client:
+            start = time.monotonic()
+            hedged = await client.process_ocr(image)
+            return retried, hedged, time.monotonic() - start, client.resilience_status()
+
+    retried, hedged, elapsed, status = asyncio.run(scenario())
+
+    assert retried["success"] is True
+    assert flaky.stats["requests"] == 2
+    assert hedged["success"] is True
+    assert elapsed < 0.8
+    assert status["stats"]["hedge_wins"] == 1
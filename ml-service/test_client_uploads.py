@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Integration Client Upload Encoding Test
+Checks client-side downscaling/recompression of OCR uploads and upload
+content types. Runs against an in-process stub server.
+
+    python -m pytest -q test_client_uploads.py
+"""
+
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from benchmarks.stub_server import StubServer
+from integration_client import DeciGardeMLClient, encode_for_upload, guess_content_type, _image_file
+
+def _jpeg(width: int, height: int, orientation: int = 1) -> bytes:
+    rng = np.random.default_rng(0)
+    img = Image.fromarray(rng.integers(0, 255, (height, width, 3), dtype=np.uint8))
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    output = io.BytesIO()
+    img.save(output, 'JPEG', quality=95, exif=exif)
+    return output.getvalue()
+
+def test_large_photo_is_downscaled_to_working_resolution():
+    data = _jpeg(4000, 3000)
+    encoded, content_type = encode_for_upload(data, (2000, 3000), quality=80)
+
+    assert content_type == 'image/jpeg'
+    assert len(encoded) < len(data)
+    assert Image.open(io.BytesIO(encoded)).size == (2000, 1500)
+
+def test_exif_orientation_is_applied_before_resizing():
+    # Stored landscape, displayed portrait
+    data = _jpeg(4000, 3000, orientation=6)
+    encoded, _ = encode_for_upload(data, (2000, 3000))
+
+    assert Image.open(io.BytesIO(encoded)).size == (2000, 2666)
+
+def test_small_images_are_sent_unchanged():
+    assert encode_for_upload(_jpeg(800, 600), (2000, 3000)) is None
+
+def test_content_type_is_guessed_from_name_or_bytes(tmp_path):
+    png = io.BytesIO()
+    Image.new('L', (10, 10)).save(png, 'PNG')
+
+    assert guess_content_type('scan.png', b'') == 'image/png'
+    assert guess_content_type('upload.bin', png.getvalue()) == 'image/png'
+
+    path = tmp_path / "page"
+    path.write_bytes(png.getvalue())
+    assert _image_file(path)[1][2] == 'image/png'
+
+@pytest.fixture
+def server():
+    server = StubServer().start()
+    yield server
+    server.stop()
+
+def test_client_uploads_fewer_bytes_when_downscaling(server, tmp_path):
+    path = tmp_path / "photo.jpg"
+    path.write_bytes(_jpeg(4000, 3000))
+
+    with DeciGardeMLClient(server.url) as client:
+        client.process_ocr(path)
+    as_is = server.stats["bytes_received"]
+
+    server.reset_stats()
+    with DeciGardeMLClient(server.url, downscale_uploads=True, upload_quality=80) as client:
+        result = client.process_ocr(path)
+        assert client._working_resolution["handwriting"] == (2000, 3000)
+
+    assert result["success"] is True
+    # One capabilities request plus a much smaller upload
+    assert server.stats["requests"] == 2
+    assert server.stats["bytes_received"] < as_is / 2
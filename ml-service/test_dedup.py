@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Duplicate Page Test
+Checks that only a page uploaded again reuses an indexed OCR result, that
+different answers on the same exam template and recompressed copies are read
+separately, that the index file is appended to and compacted, and that batch
+OCR flags duplicates. No OCR engines required.
+
+    python -m pytest -q test_dedup.py
+"""
+
+import json
+
+import benchmarks.common  # noqa: F401 (puts the repository root on the path)
+from create_test_document import CONTENT_LINES, render_test_document, encode_document
+from services.dedup import DuplicateIndex, content_hash
+
+SETTINGS = {"language": "eng", "enhance_handwriting": True}
+
+def _page(lines=None, seed=1, quality=90):
+    return encode_document(render_test_document(1600, 2200, style="handwritten", noise=0.05, seed=seed,
+                                                lines=lines), quality=quality)
+
+def _record(name):
+    return dict(filename=name, batch_id="b", text=f"text of {name}", confidence=0.9, provider="test")
+
+def test_only_identical_pages_are_duplicates():
+    other_answer = list(CONTENT_LINES)
+    other_answer[13] = "- Mathematics: 2 + 2 = 5"
+    page = _page()
+    index = DuplicateIndex()
+    index.add(content_hash(page), SETTINGS, _record("first.jpg"))
+
+    assert index.find(content_hash(_page(other_answer)), **SETTINGS) is None
+    assert index.find(content_hash(_page(quality=70)), **SETTINGS) is None
+    assert index.find(content_hash(page), **SETTINGS)["filename"] == "first.jpg"
+    assert index.find(content_hash(page), language="fra", enhance_handwriting=True) is None
+
+def test_index_keeps_the_newest_entries():
+    index = DuplicateIndex(max_entries=2)
+    for i in range(3):
+        index.add(f"digest-{i}", SETTINGS, _record(f"{i}.jpg"))
+
+    assert len(index) == 2
+    assert index.find("digest-0", **SETTINGS) is None
+    assert index.find("digest-2", **SETTINGS)["filename"] == "2.jpg"
+
+def test_index_file_is_appended_and_compacted(tmp_path):
+    path = tmp_path / "dedup.jsonl"
+    index = DuplicateIndex(path=str(path), max_entries=3)
+
+    for i in range(3):
+        index.add(f"digest-{i}", SETTINGS, _record(f"{i}.jpg"))
+        index.save()
+    assert len(path.read_text().splitlines()) == 3
+
+    for i in range(3, 7):
+        index.add(f"digest-{i}", SETTINGS, _record(f"{i}.jpg"))
+    index.save()
+
+    # Past twice max_entries the file is rewritten with the newest entries
+    assert [json.loads(line)["filename"] for line in path.read_text().splitlines()] == ["4.jpg", "5.jpg", "6.jpg"]
+    reloaded = DuplicateIndex(path=str(path), max_entries=3)
+    assert len(reloaded) == 3
+    assert reloaded.find("digest-6", **SETTINGS)["filename"] == "6.jpg"
+
+def test_batch_ocr_reuses_only_pages_uploaded_again():
+    from fastapi.testclient import TestClient
+    import app
+
+    read = []
+
+    def extract(image_content, **kwargs):
+        read.append(image_content)
+        return {"text": f"page {len(read)}", "confidence": 0.9, "provider": "test"}, None
+
+    other_answer = list(CONTENT_LINES)
+    other_answer[7] = "Sample answer: The capital of France is Lyon."
+    first, second = _page(), _page(other_answer)
+    original_extract, original_index = app._extract_with_quality_gate, app.duplicate_index
+    app._extract_with_quality_gate = extract
+    app.duplicate_index = DuplicateIndex()
+    try:
+        files = [("images", (name, data, "image/jpeg"))
+                 for name, data in (("a.jpg", first), ("b.jpg", second), ("a-again.jpg", first))]
+        body = TestClient(app.app).post('/api/ml/batch-ocr', files=files, data={"dedup": "true"}).json()
+    finally:
+        app._extract_with_quality_gate, app.duplicate_index = original_extract, original_index
+
+    results = body["results"]
+    assert len(read) == 2
+    assert [result["text"] for result in results] == ["page 1", "page 2", "page 1"]
+    assert "duplicate_of" not in results[1]
+    assert results[2]["duplicate_of"] == "a.jpg"
+    assert body["duplicate_images"] == 1
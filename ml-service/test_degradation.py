@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Degradation Controller Test
+Checks that queue depth and the latency SLO raise the degradation level, that
+the level falls back one step per cooldown, that forced and disabled settings
+win, and that degraded marking runs only the approaches its level keeps. No
+models or server required.
+
+    python -m pytest -q test_degradation.py
+"""
+
+import pytest
+
+from services.degradation import DegradationController, build_policies
+from services.marking_service import MarkingService
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def _controller(depth, clock=None, **kwargs):
+    return DegradationController(queue_thresholds=[2, 4, 8], queue_depth=lambda: depth["value"],
+                                 clock=clock or Clock(), **kwargs)
+
+def test_queue_depth_selects_the_level():
+    depth = {"value": 0}
+    controller = _controller(depth)
+
+    assert controller.current().mode == 'normal'
+
+    depth["value"] = 4
+    policy = controller.current()
+
+    assert policy.level == 2
+    assert policy.max_ocr_engines == 1
+    assert 'llm' not in policy.marking_approaches
+
+    depth["value"] = 100
+    assert controller.current().mode == 'keyword_only'
+
+def test_level_falls_one_step_per_cooldown():
+    depth = {"value": 8}
+    clock = Clock()
+    controller = _controller(depth, clock, cooldown=10)
+    assert controller.current().level == 3
+
+    depth["value"] = 0
+    clock.now = 5
+    assert controller.current().level == 3
+
+    clock.now = 10
+    assert controller.current().level == 2
+    clock.now = 15
+    assert controller.current().level == 2
+    clock.now = 20
+    assert controller.current().level == 1
+
+def test_latency_slo_raises_the_level():
+    controller = _controller({"value": 0}, latency_slo=1.0, latency_ratios=[1.0, 2.0, 3.0], window=10)
+    for _ in range(10):
+        controller.record_latency(0.5)
+    assert controller.current().level == 0
+
+    for _ in range(10):
+        controller.record_latency(2.2)
+
+    assert controller.latency_p95() == pytest.approx(2.2)
+    assert controller.current().level == 2
+
+def test_forced_and_disabled_levels():
+    depth = {"value": 100}
+
+    assert _controller(depth, enabled=False).current().level == 0
+    assert _controller(depth, enabled=False, forced_level=1).current().mode == 'no_llm'
+    assert _controller({"value": 0}, forced_level=9).current().level == 3
+
+def test_policies_downscale_further_at_each_level():
+    policies = build_policies(max_image_side=1800, minimal_max_image_side=1000)
+
+    assert [p.max_image_side for p in policies] == [None, None, 1800, 1000]
+    assert policies[3].describe() == {"level": 3, "mode": "keyword_only"}
+
+def test_keyword_only_marking_skips_other_approaches():
+    service = MarkingService()
+    rubric = {"keywords": ["photosynthesis", "chlorophyll", "sunlight"]}
+    answer = "Photosynthesis uses sunlight and chlorophyll to make glucose."
+
+    full = service.mark_answer("What is photosynthesis?", answer, rubric, 10, "science")
+    degraded = service.mark_answer("What is photosynthesis?", answer, rubric, 10, "science",
+                                   approaches=build_policies()[3].marking_approaches)
+
+    assert full['semantic_score'] > 0
+    assert degraded['semantic_score'] == 0.0
+    assert set(degraded['matched_keywords']) == {'photosynthesis', 'chlorophyll', 'sunlight'}
+    assert degraded['score'] > 0
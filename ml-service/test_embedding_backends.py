@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Embedding Backend Test
+Checks the ONNX embedding backend's tokenization, masked mean pooling and
+backend selection on a tiny generated model (skipped when onnx, onnxruntime
+or tokenizers are not installed). No sentence-transformers model required.
+
+    python -m pytest -q test_embedding_backends.py
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+pytest.importorskip('onnxruntime')
+pytest.importorskip('tokenizers')
+onnx = pytest.importorskip('onnx')
+
+from onnx import helper, TensorProto, numpy_helper
+from tokenizers import Tokenizer, models, pre_tokenizers
+
+from services.embedding_backends import ONNXEmbeddingBackend, create_embedding_backend, MANIFEST_NAME
+
+VOCAB = ["[PAD]", "[UNK]", "plants", "use", "sunlight", "to", "make", "food", "energy"]
+
+@pytest.fixture
+def model_dir(tmp_path):
+    """Token embeddings are a lookup table, so sentence embeddings are easy to predict"""
+    tokenizer = Tokenizer(models.WordLevel({token: i for i, token in enumerate(VOCAB)}, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.save(str(tmp_path / "tokenizer.json"))
+
+    table = np.random.default_rng(0).normal(size=(len(VOCAB), 8)).astype(np.float32)
+    graph = helper.make_graph(
+        [helper.make_node('Gather', ['table', 'input_ids'], ['token_embeddings'])],
+        'embedding',
+        [helper.make_tensor_value_info('input_ids', TensorProto.INT64, ['batch', 'sequence']),
+         helper.make_tensor_value_info('attention_mask', TensorProto.INT64, ['batch', 'sequence'])],
+        [helper.make_tensor_value_info('token_embeddings', TensorProto.FLOAT, ['batch', 'sequence', 8])],
+        [numpy_helper.from_array(table, 'table')]
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 14)])
+    model.ir_version = 8
+    onnx.save(model, str(tmp_path / "model.onnx"))
+
+    (tmp_path / MANIFEST_NAME).write_text(json.dumps({
+        "model": {"fp32": "model.onnx"},
+        "tokenizer": "tokenizer.json",
+        "max_seq_length": 16,
+        "normalize": True
+    }))
+    return tmp_path, table
+
+def test_embeddings_are_masked_mean_of_tokens(model_dir):
+    path, table = model_dir
+    backend = ONNXEmbeddingBackend(str(path), precision='int8')
+
+    [embedding] = backend.encode(["plants use sunlight"])
+
+    expected = table[[2, 3, 4]].mean(axis=0)
+    np.testing.assert_allclose(embedding, expected / np.linalg.norm(expected), rtol=1e-5)
+    assert backend.describe()["model"] == "model.onnx"
+
+def test_padding_does_not_change_embeddings(model_dir):
+    backend = ONNXEmbeddingBackend(str(model_dir[0]))
+
+    alone = backend.encode(["plants use sunlight"])[0]
+    batched = backend.encode(["plants use sunlight", "plants use sunlight to make food energy"])[0]
+
+    np.testing.assert_allclose(alone, batched, rtol=1e-6)
+
+def test_max_seq_length_truncates(model_dir):
+    backend = ONNXEmbeddingBackend(str(model_dir[0]), max_seq_length=2)
+
+    np.testing.assert_allclose(backend.encode(["plants use sunlight to make food"])[0],
+                               backend.encode(["plants use"])[0], rtol=1e-6)
+
+def test_backend_selected_by_environment(model_dir, monkeypatch):
+    monkeypatch.setenv('EMBEDDING_BACKEND', 'onnx')
+    monkeypatch.setenv('EMBEDDING_MODEL_DIR', str(model_dir[0]))
+    monkeypatch.setenv('EMBEDDING_THREADS', '1')
+
+    backend = create_embedding_backend()
+
+    assert isinstance(backend, ONNXEmbeddingBackend)
+    assert backend.describe()["threads"] == 1
+    assert create_embedding_backend('none') is None
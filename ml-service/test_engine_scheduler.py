@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+OCR Engine Scheduler Test
+Checks that the cascade learns which engines to trust, stops once a trusted
+engine is confident, explores periodically, and sheds engines under load,
+using scripted engines in OCRService. No OCR models required.
+
+    python -m pytest -q test_engine_scheduler.py
+"""
+
+import numpy as np
+import pytest
+
+from services.engine_scheduler import EngineScheduler
+from services.ocr_engines import OCREngine, EngineRegistry
+from services.ocr_service import OCRService
+
+PAGE = np.full((1000, 1000, 3), 255, np.uint8)
+
+class ScriptedEngine(OCREngine):
+    """Returns a fixed reading at a fixed cost"""
+
+    def __init__(self, name, text, confidence, cost):
+        super().__init__()
+        self.name = name
+        self.text = text
+        self.confidence = confidence
+        self.default_cost = cost
+        self.pages = 0
+
+    def load(self):
+        self.model = object()
+
+    def infer(self, image, language="eng", enhance_handwriting=True, page_straightened=False):
+        self.pages += 1
+        return {"text": self.text, "confidence": self.confidence, "provider": self.name}
+
+def _service(scheduler, *engines):
+    registry = EngineRegistry()
+    for engine in engines:
+        registry.register(engine)
+    registry.load_all()
+    return OCRService(registry, scheduler=scheduler)
+
+def _engines():
+    # Measured costs overwrite the default costs, so keep them fixed for the test
+    cheap = ScriptedEngine('cheap', 'the quick brown fox', 0.95, cost=0.1)
+    costly = ScriptedEngine('costly', 'the quick brown fox', 0.9, cost=2.0)
+    for engine in (cheap, costly):
+        engine.record_latency = lambda seconds, shape: None
+    return cheap, costly
+
+def test_cascade_runs_everything_until_an_engine_is_trusted():
+    cheap, costly = _engines()
+    service = _service(EngineScheduler(min_samples=3, explore_every=0, queue_depth=lambda: 0), cheap, costly)
+
+    for _ in range(3):
+        assert service.extract_from_array(PAGE)['schedule']['ran'] == ['cheap', 'costly']
+
+    result = service.extract_from_array(PAGE)
+
+    assert result['text'] == 'the quick brown fox'
+    assert result['schedule']['ran'] == ['cheap']
+    assert result['schedule']['skipped'] == {'costly': 'target_met'}
+    assert result['schedule']['stopped_early'] is True
+    assert service.scheduler.report()['engines']['cheap']['trusted'] is True
+
+def test_low_confidence_keeps_the_cascade_going():
+    cheap, costly = _engines()
+    cheap.confidence = 0.5
+    service = _service(EngineScheduler(min_samples=1, explore_every=0, queue_depth=lambda: 0), cheap, costly)
+
+    for _ in range(3):
+        schedule = service.extract_from_array(PAGE)['schedule']
+
+    assert schedule['ran'] == ['cheap', 'costly']
+
+def test_disagreeing_engine_is_not_trusted():
+    cheap, costly = _engines()
+    cheap.text = 'qvick brwn'
+    cheap.default_cost = 0.05
+    third = ScriptedEngine('third', 'the quick brown fox', 0.9, cost=3.0)
+    third.record_latency = lambda seconds, shape: None
+    scheduler = EngineScheduler(min_samples=2, explore_every=0, queue_depth=lambda: 0)
+    service = _service(scheduler, cheap, costly, third)
+
+    for _ in range(4):
+        service.extract_from_array(PAGE)
+
+    assert not scheduler.is_trusted('cheap')
+    assert scheduler.is_trusted('costly')
+    # Once trusted, the agreeing engine ends the cascade even though it is not the cheapest
+    assert service.extract_from_array(PAGE)['schedule']['ran'] == ['cheap', 'costly']
+
+def test_exploration_runs_all_engines_periodically():
+    cheap, costly = _engines()
+    service = _service(EngineScheduler(min_samples=1, explore_every=3, queue_depth=lambda: 0), cheap, costly)
+
+    runs = [service.extract_from_array(PAGE)['schedule']['ran'] for _ in range(6)]
+
+    assert runs[3] == ['cheap'] and runs[4] == ['cheap']
+    assert runs[5] == ['cheap', 'costly']
+
+def test_all_mode_keeps_registration_order_and_runs_everything():
+    cheap, costly = _engines()
+    service = _service(EngineScheduler(mode='all', min_samples=1, queue_depth=lambda: 0), costly, cheap)
+
+    for _ in range(3):
+        assert service.extract_from_array(PAGE)['schedule']['ran'] == ['costly', 'cheap']
+
+def test_queue_growth_sheds_to_the_best_value_engine():
+    cheap, costly = _engines()
+    depth = {"value": 0}
+    scheduler = EngineScheduler(mode='all', shed_queue_depth=4, queue_depth=lambda: depth["value"])
+    service = _service(scheduler, costly, cheap)
+
+    assert service.extract_from_array(PAGE)['schedule']['ran'] == ['costly', 'cheap']
+
+    depth["value"] = 5
+    schedule = service.extract_from_array(PAGE)['schedule']
+
+    assert schedule['ran'] == ['cheap']
+    assert schedule['skipped'] == {'costly': 'shed'}
+    assert schedule['shedding'] is True
+
+def test_engine_limit_from_caller():
+    cheap, costly = _engines()
+    service = _service(EngineScheduler(mode='all', queue_depth=lambda: 0), costly, cheap)
+
+    schedule = service.extract_from_array(PAGE, max_engines=1)['schedule']
+
+    assert schedule['ran'] == ['cheap']
+    assert schedule['skipped'] == {'costly': 'engine_limit'}
+
+def test_empty_results_lower_quality():
+    scheduler = EngineScheduler(queue_depth=lambda: 0)
+    blank = ScriptedEngine('blank', '', 0.0, cost=0.1)
+    reader = ScriptedEngine('reader', 'text', 0.9, cost=0.1)
+    service = _service(scheduler, blank, reader)
+
+    for _ in range(5):
+        service.extract_from_array(PAGE)
+
+    assert scheduler.report()['engines']['blank']['empty_rate'] == pytest.approx(1.0)
+    assert scheduler.quality('blank') < scheduler.quality('reader')
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        EngineScheduler(mode='fastest')
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Golden-Score Regression Test
+Verifies that MarkingService scores the benchmark corpus exactly as recorded in
+benchmarks/golden/marking_scores.json. Runs in-process, no server required.
+
+Regenerate the golden file after an intentional scoring change with:
+    python -m benchmarks.marking_benchmark --update-golden
+"""
+
+from benchmarks.marking_benchmark import check_golden
+
+def test_marking_scores_match_golden():
+    """Scores, confidences and approach scores are unchanged"""
+    mismatches = check_golden()
+    assert not mismatches, "\n".join(mismatches[:20])
+
+if __name__ == "__main__":
+    print("🧪 Checking marking scores against the golden file...")
+    mismatches = check_golden()
+    if mismatches:
+        print(f"❌ {len(mismatches)} mismatches")
+        for mismatch in mismatches:
+            print(f"   {mismatch}")
+    else:
+        print("✅ All marking scores match the golden file")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+OCR Engine Registry Test
+Checks engine selection, replacement, weighting and cost tracking in the
+engine registry, Tesseract's health report, OCRService running on a
+registry of scripted engines, and the remote engine against a local HTTP
+endpoint. No OCR models required.
+
+    python -m pytest -q test_ocr_engines.py
+"""
+
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import numpy as np
+import pytesseract
+import pytest
+
+from services.ocr_engines import OCREngine, EngineRegistry, RemoteOCREngine, TesseractEngine, parse_engine_list
+from services.ocr_service import OCRService
+
+PAGE = np.full((1000, 1000, 3), 255, np.uint8)
+
+class ScriptedEngine(OCREngine):
+    """Returns a fixed reading and counts calls"""
+
+    def __init__(self, name, text, confidence, handwriting_only=False, weight=1.0, fails_to_load=False):
+        super().__init__(weight)
+        self.name = name
+        self.text = text
+        self.confidence = confidence
+        self.handwriting_only = handwriting_only
+        self.fails_to_load = fails_to_load
+        self.pages = 0
+
+    def load(self):
+        if self.fails_to_load:
+            raise RuntimeError("model missing")
+        self.model = object()
+
+    def infer(self, image, language="eng", enhance_handwriting=True, page_straightened=False):
+        self.pages += 1
+        return {"text": self.text, "confidence": self.confidence, "provider": self.name}
+
+def _service(*engines, replaced_by=None):
+    registry = EngineRegistry()
+    for engine in engines:
+        registry.register(engine, replaced_by=(replaced_by or {}).get(engine.name))
+    registry.load_all()
+    return OCRService(registry)
+
+def test_handwriting_only_engines_skip_printed_requests():
+    handwriting = ScriptedEngine('hand', 'written answer', 0.9, handwriting_only=True)
+    printed = ScriptedEngine('print', 'printed answer', 0.8)
+    service = _service(handwriting, printed)
+
+    result = service.extract_from_array(PAGE, enhance_handwriting=False)
+
+    assert result['provider'] == 'print'
+    assert handwriting.pages == 0
+    assert set(service.extract_from_array(PAGE)['engine_times']) == {'hand', 'print'}
+
+def test_engine_selection_and_load_failures():
+    broken = ScriptedEngine('broken', 'x', 1.0, fails_to_load=True)
+    first = ScriptedEngine('first', 'one', 0.5)
+    second = ScriptedEngine('second', 'two', 0.7)
+    service = _service(broken, first, second)
+
+    assert service.get_available_engines() == ['first', 'second']
+    assert service.get_engine_status()['broken'] == 'error'
+    assert service.extract_from_array(PAGE, engines=['first'])['text'] == 'one'
+    assert second.pages == 0
+
+def test_tesseract_health_tells_missing_binary_from_load_error(monkeypatch):
+    monkeypatch.setattr(pytesseract.pytesseract, 'tesseract_cmd', '/nonexistent/tesseract')
+    missing = _service(TesseractEngine())
+    assert missing.get_engine_status()['tesseract'] == 'not_installed'
+
+    def broken_version():
+        raise RuntimeError("unsupported tesseract version")
+
+    # Any binary on disk will do; load() fails on the version check
+    monkeypatch.setattr(pytesseract.pytesseract, 'tesseract_cmd', sys.executable)
+    monkeypatch.setattr(pytesseract, 'get_tesseract_version', broken_version)
+    broken = _service(TesseractEngine())
+    assert broken.get_engine_status()['tesseract'] == 'error'
+
+def test_replaced_engine_is_not_loaded():
+    stock = ScriptedEngine('stock', 'a', 0.5)
+    export = ScriptedEngine('export', 'a', 0.5)
+    service = _service(stock, export, replaced_by={'stock': 'export'})
+
+    assert service.get_available_engines() == ['export']
+    assert service.get_engine_status()['stock'] == 'replaced (export)'
+
+def test_weight_ranks_results_and_zero_disables():
+    confident = ScriptedEngine('confident', 'alpha beta', 0.9, weight=0.5)
+    trusted = ScriptedEngine('trusted', 'gamma delta', 0.6, weight=1.0)
+    disabled = ScriptedEngine('disabled', 'epsilon', 1.0, weight=0)
+    service = _service(confident, trusted, disabled)
+
+    result = service.extract_from_array(PAGE)
+
+    # The combined result keeps the confidence of the best weighted result
+    assert result['provider'] == 'combined'
+    assert result['confidence'] == pytest.approx(0.6)
+    assert disabled.pages == 0
+
+def test_cost_estimate_tracks_measured_latency():
+    engine = ScriptedEngine('engine', 'a', 0.5)
+    engine.default_cost = 2.0
+
+    assert engine.cost_estimate((2000, 1000)) == pytest.approx(4.0)
+
+    engine.record_latency(1.0, (1000, 1000))
+    engine.record_latency(2.0, (1000, 1000))
+
+    # First sample seeds the average, the second moves it by the EWMA weight
+    assert engine.seconds_per_megapixel == pytest.approx(1.2)
+    assert engine.cost_estimate((500, 1000)) == pytest.approx(0.6)
+    assert engine.describe()['calls'] == 2
+
+def test_parse_engine_list():
+    assert parse_engine_list(' a=1, b=http://host:8000/x?y=z ,,') == {'a': '1', 'b': 'http://host:8000/x?y=z'}
+
+@pytest.fixture
+def remote_url():
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            requests_seen.append((self.path, self.headers['Content-Type'], body))
+            payload = json.dumps({"success": True, "text": "remote text", "confidence": 0.75}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/api/ml/ocr/raw", requests_seen
+    server.shutdown()
+
+def test_remote_engine_posts_page_to_raw_endpoint(remote_url):
+    pytest.importorskip('requests')
+    url, requests_seen = remote_url
+    engine = RemoteOCREngine('peer', url, timeout=5)
+    engine.load()
+
+    result = engine.infer(PAGE, enhance_handwriting=False)
+
+    assert result == {"text": "remote text", "confidence": 0.75, "provider": "peer"}
+    path, content_type, body = requests_seen[0]
+    assert path.startswith('/api/ml/ocr/raw?') and 'auto_route=false' in path and 'enhance_handwriting=false' in path
+    assert content_type == 'image/jpeg' and body[:2] == b'\xff\xd8'
+
+def test_unreachable_remote_engine_returns_empty_result():
+    pytest.importorskip('requests')
+    engine = RemoteOCREngine('peer', 'http://127.0.0.1:9/api/ml/ocr/raw', timeout=1)
+    engine.load()
+
+    assert engine.infer(PAGE)['text'] == ''
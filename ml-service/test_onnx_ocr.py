@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+ONNX OCR Engine Test
+Checks the detection/recognition post-processing used by the onnxocr engine
+and runs the pipeline end to end on tiny generated ONNX models (skipped when
+onnx/onnxruntime are not installed). No PaddleOCR required.
+
+    python -m pytest -q test_onnx_ocr.py
+"""
+
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+from services.onnx_ocr import (
+    boxes_from_probability_map, ctc_greedy_decode, recognition_batch, sort_boxes, MANIFEST_NAME
+)
+
+CHARACTERS = ['blank', 'h', 'i', ' ']
+
+def test_ctc_decode_collapses_repeats_and_drops_blanks():
+    # Steps: h h blank i i blank h
+    steps = [1, 1, 0, 2, 2, 0, 1]
+    probs = np.full((1, len(steps), len(CHARACTERS)), 0.05, dtype=np.float32)
+    for t, c in enumerate(steps):
+        probs[0, t, c] = 0.85
+
+    [(text, score)] = ctc_greedy_decode(probs, CHARACTERS)
+
+    assert text == 'hih'
+    assert score == pytest.approx(0.85)
+
+def test_ctc_decode_all_blank_is_empty():
+    probs = np.zeros((2, 5, len(CHARACTERS)), dtype=np.float32)
+    probs[:, :, 0] = 1.0
+
+    assert ctc_greedy_decode(probs, CHARACTERS) == [('', 0.0), ('', 0.0)]
+
+def test_boxes_from_probability_map_finds_and_unclips_regions():
+    pred = np.zeros((200, 300), dtype=np.float32)
+    pred[40:60, 50:250] = 0.9
+    pred[120:140, 30:130] = 0.8
+
+    boxes = boxes_from_probability_map(pred, unclip_ratio=1.5)
+
+    assert len(boxes) == 2
+    for points, score in boxes:
+        assert points.shape == (4, 2)
+        assert score >= 0.6
+    long_box = max(boxes, key=lambda b: np.ptp(b[0][:, 0]))[0]
+    # Grown past the 200x20 region on every side
+    assert long_box[:, 0].min() < 50 and long_box[:, 0].max() > 249
+    assert long_box[:, 1].min() < 40 and long_box[:, 1].max() > 59
+
+def test_faint_regions_are_dropped():
+    pred = np.zeros((100, 100), dtype=np.float32)
+    pred[40:60, 10:90] = 0.4
+
+    assert boxes_from_probability_map(pred, threshold=0.3, box_threshold=0.6) == []
+
+def test_sort_boxes_reads_lines_left_to_right():
+    def box(x, y):
+        return np.array([[x, y], [x + 10, y], [x + 10, y + 5], [x, y + 5]], dtype=np.float32)
+
+    ordered = sort_boxes([box(100, 52), box(0, 50), box(0, 0)])
+
+    assert [tuple(b[0]) for b in ordered] == [(0, 0), (0, 50), (100, 52)]
+
+def test_recognition_batch_pads_to_widest_crop():
+    crops = [np.full((20, 40, 3), 255, np.uint8), np.full((10, 200, 3), 0, np.uint8)]
+
+    batch = recognition_batch(crops, (3, 48, 320))
+
+    assert batch.shape == (2, 3, 48, 960)
+    assert batch[0, :, :, :96].min() == pytest.approx(1.0)
+    assert batch[0, :, :, 96:].max() == 0.0
+    assert batch[1].min() == pytest.approx(-1.0)
+
+def _build_models(model_dir):
+    """Detector: dark pixels are text. Recognizer: always reads 'hi'."""
+    onnx = pytest.importorskip('onnx')
+    from onnx import helper, TensorProto, numpy_helper
+
+    det = helper.make_graph(
+        [helper.make_node('ReduceMean', ['x'], ['mean'], axes=[1], keepdims=1),
+         helper.make_node('Mul', ['mean', 'scale'], ['logits']),
+         helper.make_node('Sigmoid', ['logits'], ['prob'])],
+        'det',
+        [helper.make_tensor_value_info('x', TensorProto.FLOAT, [1, 3, 'h', 'w'])],
+        [helper.make_tensor_value_info('prob', TensorProto.FLOAT, [1, 1, 'h', 'w'])],
+        [numpy_helper.from_array(np.array(-5.0, dtype=np.float32), 'scale')]
+    )
+
+    steps, classes = 4, len(CHARACTERS) - 1
+    bias = np.full((steps, classes), -10.0, dtype=np.float32)
+    for t, c in enumerate([1, 1, 0, 2]):
+        bias[t, c] = 10.0
+    rec = helper.make_graph(
+        [helper.make_node('ReduceMean', ['x'], ['pooled'], axes=[1, 2], keepdims=0),
+         helper.make_node('MatMul', ['pooled', 'weight'], ['projected']),
+         helper.make_node('Add', ['projected', 'bias'], ['flat']),
+         helper.make_node('Reshape', ['flat', 'shape'], ['logits']),
+         helper.make_node('Softmax', ['logits'], ['probs'], axis=2)],
+        'rec',
+        [helper.make_tensor_value_info('x', TensorProto.FLOAT, ['n', 3, 48, 320])],
+        [helper.make_tensor_value_info('probs', TensorProto.FLOAT, ['n', steps, classes])],
+        [numpy_helper.from_array(np.zeros((320, steps * classes), dtype=np.float32), 'weight'),
+         numpy_helper.from_array(bias.reshape(-1), 'bias'),
+         numpy_helper.from_array(np.array([-1, steps, classes], dtype=np.int64), 'shape')]
+    )
+
+    for name, graph in (('det', det), ('rec', rec)):
+        model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 11)])
+        model.ir_version = 7
+        onnx.save(model, str(model_dir / f"{name}.onnx"))
+
+    (model_dir / "dict.txt").write_text("h\ni\n")
+    (model_dir / MANIFEST_NAME).write_text(json.dumps({
+        "det": {"fp32": "det.onnx"},
+        "rec": {"fp32": "rec.onnx"},
+        "dict": "dict.txt",
+        "rec_image_shape": [3, 48, 320],
+        "use_space_char": True
+    }))
+
+def test_pipeline_reads_each_text_line(tmp_path):
+    pytest.importorskip('onnxruntime')
+    _build_models(tmp_path)
+    from services.onnx_ocr import ONNXOCRPipeline
+
+    page = np.full((400, 600, 3), 255, np.uint8)
+    cv2.rectangle(page, (50, 200), (400, 230), (0, 0, 0), -1)
+    cv2.rectangle(page, (50, 60), (500, 90), (0, 0, 0), -1)
+
+    # int8 requested but not exported: falls back to fp32
+    pipeline = ONNXOCRPipeline(str(tmp_path), precision='int8', intra_op_threads=1)
+    lines = pipeline.ocr(page)
+
+    assert pipeline.describe()["models"] == {"det": "det.onnx", "rec": "rec.onnx"}
+    assert [text for _, text, _ in lines] == ['hi', 'hi']
+    # Reading order: the upper line first
+    assert lines[0][0][:, 1].mean() < lines[1][0][:, 1].mean()
+    assert all(score > 0.9 for _, _, score in lines)
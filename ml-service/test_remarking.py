@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Incremental Re-marking Test
+Checks that a rubric edit recomputes only the approaches that read the
+edited fields, that re-marked scores equal a full re-mark with the new
+rubric, and that the re-mark endpoints report what was reused. Uses the LLM
+stub from the marking benchmark; no models or API keys required.
+
+    python -m pytest -q test_remarking.py
+"""
+
+import json
+
+import pytest
+
+from benchmarks.marking_benchmark import create_service
+from services.marking_service import rubric_changes
+
+QUESTION = "Explain how plants make food."
+ANSWER = "Plants use sunlight and chlorophyll to turn carbon dioxide and water into glucose. This is photosynthesis."
+RUBRIC = {
+    "keywords": ["sunlight", "chlorophyll"],
+    "key_phrases": ["carbon dioxide"],
+    "criteria": "Mentions light energy and the products"
+}
+
+def _edited(**changes):
+    return dict(RUBRIC, **changes)
+
+class CountingService:
+    """Marking service with call counts per approach"""
+
+    def __init__(self):
+        self.service = create_service(semantic="difflib")
+        self.calls = {"keyword": 0, "semantic": 0, "content": 0, "llm": 0}
+        for approach, method in (("keyword", "_mark_by_keywords"), ("semantic", "_mark_by_semantic_similarity"),
+                                 ("content", "_mark_by_content_analysis"), ("llm", "_mark_by_llm")):
+            setattr(self.service, method, self._counted(approach, getattr(self.service, method)))
+
+    def _counted(self, approach, method):
+        def call(*args, **kwargs):
+            self.calls[approach] += 1
+            return method(*args, **kwargs)
+        return call
+
+def test_rubric_changes():
+    assert rubric_changes(RUBRIC, RUBRIC) == ([], set())
+    assert rubric_changes(RUBRIC, _edited(keywords=["glucose"])) == (["keywords"], {"keyword"})
+    assert rubric_changes(RUBRIC, _edited(key_phrases=[])) == (["key_phrases"], {"content"})
+    assert rubric_changes(RUBRIC, _edited(criteria="Names the products")) == (["criteria"], {"llm"})
+
+@pytest.mark.parametrize("edit, recomputed", [
+    ({"keywords": ["sunlight", "glucose", "water"]}, ["keyword"]),
+    ({"key_phrases": ["carbon dioxide", "glucose"]}, ["content"]),
+    ({"criteria": "Names both products"}, ["llm"])
+])
+def test_edit_recomputes_only_affected_approaches(edit, recomputed):
+    counting = CountingService()
+    original = counting.service.mark_answer(QUESTION, ANSWER, RUBRIC, 10, "biology")
+    before = dict(counting.calls)
+
+    new_rubric = _edited(**edit)
+    result = counting.service.remark_answer(QUESTION, ANSWER, RUBRIC, new_rubric, 10, "biology")
+
+    assert {a: counting.calls[a] - before[a] for a in before} == {a: int(a in recomputed) for a in before}
+    assert result["remark"]["recomputed"] == recomputed
+    assert sorted(result["remark"]["reused"]) == sorted(set(before) - set(recomputed))
+
+    # Recomputed approaches match a full mark with the new rubric, reused ones keep their earlier result
+    full = create_service(semantic="difflib").mark_answer(QUESTION, ANSWER, new_rubric, 10, "biology")
+    for approach, score in result["approach_scores"].items():
+        expected = full if approach in recomputed or approach == "semantic" else original
+        assert score == expected["approach_scores"][approach]
+
+def test_cache_miss_computes_unaffected_approaches():
+    counting = CountingService()
+
+    result = counting.service.remark_answer(QUESTION, ANSWER, RUBRIC, _edited(keywords=["glucose"]), 10, "biology")
+
+    assert result["remark"]["reused"] == []
+    assert all(count == 1 for count in counting.calls.values())
+
+def test_remark_endpoints():
+    from fastapi.testclient import TestClient
+    import app
+
+    client = TestClient(app.app)
+    form = {"question": QUESTION, "answer": ANSWER, "rubric": json.dumps(RUBRIC), "max_score": "10",
+            "subject": "biology"}
+    client.post('/api/ml/mark', data=form)
+
+    new_rubric = json.dumps(_edited(keywords=["glucose"]))
+    single = client.post('/api/ml/remark', data={
+        "question": QUESTION, "answer": ANSWER, "old_rubric": json.dumps(RUBRIC), "new_rubric": new_rubric,
+        "max_score": "10", "subject": "biology"
+    }).json()
+    batch = client.post('/api/ml/batch-remark', data={
+        "remark_data": json.dumps([{"question": QUESTION, "answer": ANSWER, "max_score": 10, "subject": "biology"},
+                                   {"question": QUESTION, "max_score": 10}]),
+        "old_rubric": json.dumps(RUBRIC), "new_rubric": new_rubric
+    }).json()
+
+    assert single["remark"]["affected"] == ["keyword"]
+    assert "semantic" in single["remark"]["reused"]
+    assert batch["processed_questions"] == 1 and batch["failed_questions"] == 1
+    assert batch["results"][0]["score"] == single["score"]
+    assert batch["reused_results"] >= 2
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Request Scheduler Test
+Checks that interactive work goes ahead of bulk batch items without starving
+them, that tenants take turns within a class, that bulk work leaves a worker
+free for interactive requests, that a cancelled request keeps its worker
+slot until its call finishes, and that the app schedules requests by the
+X-Tenant-ID and X-Request-Priority headers. No models required.
+
+    python -m pytest -q test_request_scheduler.py
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from services.request_scheduler import FairRequestScheduler, current_request_class
+from services.runtime_config import RequestWorkerPool
+
+def _grant_order(scheduler, submissions):
+    """Hold every slot, queue the submissions, then release one slot at a time and record who runs"""
+    order = []
+
+    async def main():
+        for _ in range(scheduler.slots):
+            await scheduler.acquire('holder', 'interactive')
+
+        async def submit(tenant, priority):
+            await scheduler.acquire(tenant, priority)
+            order.append((tenant, priority))
+
+        tasks = [asyncio.ensure_future(submit(*item)) for item in submissions]
+        await asyncio.sleep(0)
+        scheduler.release('interactive')
+        while len(order) < len(submissions):
+            await asyncio.sleep(0)
+            if order and scheduler.report()["running"][order[-1][1]]:
+                scheduler.release(order[-1][1])
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    return order
+
+def test_interactive_goes_first_but_bulk_keeps_draining():
+    scheduler = FairRequestScheduler(slots=1, interactive_burst=2)
+    submissions = [('lecturer', 'bulk')] * 3 + [('student', 'interactive')] * 5
+
+    order = [priority for _, priority in _grant_order(scheduler, submissions)]
+
+    assert order == ['interactive', 'interactive', 'bulk', 'interactive', 'interactive', 'bulk',
+                     'interactive', 'bulk']
+
+def test_tenants_take_turns_within_a_class():
+    scheduler = FairRequestScheduler(slots=1)
+    submissions = [('big', 'bulk')] * 4 + [('small', 'bulk')] * 2
+
+    order = [tenant for tenant, _ in _grant_order(scheduler, submissions)]
+
+    assert order == ['big', 'small', 'big', 'small', 'big', 'big']
+    assert scheduler.report()["granted"]["big"]["bulk"] == 4
+
+def test_bulk_leaves_a_slot_for_interactive_requests():
+    scheduler = FairRequestScheduler(slots=2)
+
+    async def main():
+        await scheduler.acquire('lecturer', 'bulk')
+        waiting = asyncio.ensure_future(scheduler.acquire('lecturer', 'bulk'))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+
+        # The reserved slot goes to an interactive request straight away
+        await asyncio.wait_for(scheduler.acquire('student', 'interactive'), 1)
+        scheduler.release('bulk')
+        await asyncio.wait_for(waiting, 1)
+
+    asyncio.run(main())
+    assert scheduler.report()["running"] == {'interactive': 1, 'bulk': 1}
+
+def test_cancelled_waiter_does_not_hold_a_slot():
+    scheduler = FairRequestScheduler(slots=1)
+
+    async def main():
+        await scheduler.acquire('a', 'interactive')
+        waiting = asyncio.ensure_future(scheduler.acquire('b', 'interactive'))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        scheduler.release('interactive')
+        await asyncio.wait_for(scheduler.acquire('c', 'interactive'), 1)
+
+    asyncio.run(main())
+    assert scheduler.report()["waiting"] == {'interactive': {}, 'bulk': {}}
+
+def test_worker_pool_runs_under_the_request_class():
+    pool = RequestWorkerPool(1)
+
+    async def main():
+        return await pool.run(current_request_class)
+
+    try:
+        assert asyncio.run(main()) == ('default', 'interactive')
+    finally:
+        pool.shutdown()
+    assert pool.scheduler.report()["running"] == {'interactive': 0, 'bulk': 0}
+
+def test_cancelled_request_keeps_its_slot_until_the_call_finishes():
+    pool = RequestWorkerPool(1)
+    started, finish = threading.Event(), threading.Event()
+
+    def work():
+        started.set()
+        finish.wait(5)
+
+    async def main():
+        running = asyncio.ensure_future(pool.run(work))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        running.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await running
+
+        # The worker thread is still busy, so the next request has to wait for it
+        assert pool.scheduler.report()["running"]["interactive"] == 1
+        waiting = asyncio.ensure_future(pool.run(current_request_class))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        finish.set()
+        return await asyncio.wait_for(waiting, 5)
+
+    try:
+        assert asyncio.run(main()) == ('default', 'interactive')
+    finally:
+        finish.set()
+        pool.shutdown()
+    assert pool.scheduler.report()["running"] == {'interactive': 0, 'bulk': 0}
+
+def test_app_classifies_requests_by_headers():
+    from fastapi.testclient import TestClient
+    import app
+
+    seen = []
+    original = app.marking_service.mark_answer
+    app.marking_service.mark_answer = lambda **kwargs: seen.append(current_request_class()) or original(**kwargs)
+    form = {"question": "q", "answer": "plants use light", "rubric": '{"keywords": ["light"]}', "max_score": "5"}
+    try:
+        client = TestClient(app.app)
+        client.post('/api/ml/mark', data=form, headers={"X-Tenant-ID": "lecturer-7"})
+        client.post('/api/ml/mark', data=form, headers={"X-Request-Priority": "bulk"})
+        client.post('/api/ml/batch-mark', data={"marking_data": '[{"question": "q", "answer": "light", '
+                                                                '"rubric": {}, "max_score": 5}]'})
+    finally:
+        app.marking_service.mark_answer = original
+
+    assert seen == [('lecturer-7', 'interactive'), ('default', 'bulk'), ('default', 'bulk')]
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Thread Budget Test
+Checks how the runtime thread budget splits CPUs, which environment it
+exports and that the request worker pool bounds concurrency and carries the
+caller's context. No ML models required.
+
+    python -m pytest -q test_runtime_config.py
+"""
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+
+import cv2
+
+from services.runtime_config import ThreadBudget, RequestWorkerPool, BLAS_ENV_VARS
+
+def test_budget_splits_cpus_between_workers_and_libraries():
+    assert (ThreadBudget(cpus=8).workers, ThreadBudget(cpus=8).library_threads) == (4, 2)
+    assert ThreadBudget(cpus=8, workers=8).library_threads == 1
+    assert ThreadBudget(cpus=8, workers=1).library_threads == 8
+    assert (ThreadBudget(cpus=1).workers, ThreadBudget(cpus=1).library_threads) == (1, 1)
+
+def test_budget_reads_environment(monkeypatch):
+    monkeypatch.setenv('ML_CPU_BUDGET', '16')
+    monkeypatch.setenv('ML_WORKER_THREADS', '2')
+    monkeypatch.delenv('ML_LIBRARY_THREADS', raising=False)
+
+    budget = ThreadBudget.from_env()
+
+    assert (budget.cpus, budget.workers, budget.library_threads) == (16, 2, 8)
+
+def test_explicit_library_settings_win(monkeypatch):
+    for var in BLAS_ENV_VARS:
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setenv('OMP_NUM_THREADS', '3')
+    monkeypatch.setenv('ONNX_OCR_INTRA_OP_THREADS', '')
+
+    ThreadBudget(cpus=8, workers=4).configure_environment()
+
+    assert os.environ['OMP_NUM_THREADS'] == '3'
+    assert os.environ['MKL_NUM_THREADS'] == '2'
+    assert os.environ['ONNX_OCR_INTRA_OP_THREADS'] == '2'
+
+def test_enforce_sets_loaded_library_pools():
+    previous = cv2.getNumThreads()
+    try:
+        settings = ThreadBudget(cpus=4, workers=2).enforce()
+        assert cv2.getNumThreads() == 2
+        assert settings["libraries"]["opencv"] == 2
+        assert settings["threads_per_cpu"] == 1.0
+    finally:
+        cv2.setNumThreads(previous)
+
+def test_worker_pool_bounds_concurrency_and_copies_context():
+    request_id = contextvars.ContextVar('request_id', default=None)
+    pool = RequestWorkerPool(workers=2)
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def work(i):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return i, request_id.get()
+
+    async def handle(i):
+        request_id.set(f"req-{i}")
+        return await pool.run(work, i)
+
+    async def scenario():
+        return await asyncio.gather(*(handle(i) for i in range(6)))
+
+    try:
+        results = asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+
+    assert results == [(i, f"req-{i}") for i in range(6)]
+    assert peak[0] == 2
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Single-Flight Test
+Checks that concurrent identical requests share one computation, that
+different requests and finished requests compute again, that errors and
+disconnects are handled, and that the app coalesces identical marking
+requests. No models required.
+
+    python -m pytest -q test_single_flight.py
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from services.metrics import SINGLE_FLIGHT_REQUESTS
+from services.single_flight import SingleFlight, request_key
+
+def _counter(endpoint, result):
+    return SINGLE_FLIGHT_REQUESTS.labels(endpoint=endpoint, result=result).get()
+
+def test_request_key_depends_on_every_part():
+    assert request_key(b'page', 'eng', True) == request_key(b'page', 'eng', True)
+    assert request_key(b'page', 'eng', True) != request_key(b'page', 'eng', False)
+    assert request_key('ab', 'c') != request_key('a', 'bc')
+
+def test_concurrent_identical_requests_share_one_computation():
+    flight = SingleFlight('test-shared')
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"score": 7}
+
+    async def main():
+        results = await asyncio.gather(*(flight.run('same', compute) for _ in range(5)),
+                                       flight.run('other', compute))
+        # Finished keys are forgotten, so a later request computes again
+        await flight.run('same', compute)
+        return results
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 3
+    assert all(result == {"score": 7} for result in results)
+    assert flight.inflight == 0
+    assert _counter('test-shared', 'shared') == 4
+    assert _counter('test-shared', 'computed') == 3
+
+def test_errors_are_shared_and_not_remembered():
+    flight = SingleFlight('test-errors')
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("engine crashed")
+
+    async def main():
+        return await asyncio.gather(flight.run('k', fail), flight.run('k', fail), return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.inflight == 0
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight('test-cancel')
+
+    async def compute():
+        await asyncio.sleep(0.02)
+        return "text"
+
+    async def main():
+        first = asyncio.ensure_future(flight.run('k', compute))
+        second = asyncio.ensure_future(flight.run('k', compute))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "text"
+
+def test_disabled_computes_every_request():
+    flight = SingleFlight('test-disabled', enabled=False)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0)
+
+    async def main():
+        await asyncio.gather(flight.run('k', compute), flight.run('k', compute))
+
+    asyncio.run(main())
+    assert len(calls) == 2
+
+def test_app_coalesces_identical_mark_requests():
+    import httpx
+    import app
+
+    release = threading.Event()
+    calls = []
+    original = app.marking_service.mark_answer
+
+    def slow_mark(**kwargs):
+        calls.append(kwargs['answer'])
+        release.wait(5)
+        return original(**kwargs)
+
+    form = {"question": "q", "answer": "plants use light", "rubric": '{"keywords": ["light"]}', "max_score": "5"}
+
+    async def main():
+        transport = httpx.ASGITransport(app=app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            requests = [asyncio.ensure_future(client.post('/api/ml/mark', data=form)) for _ in range(3)]
+            while not calls:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)
+            release.set()
+            return await asyncio.gather(*requests)
+
+    app.marking_service.mark_answer = slow_mark
+    try:
+        responses = asyncio.run(main())
+    finally:
+        app.marking_service.mark_answer = original
+
+    assert calls == ["plants use light"]
+    assert len({response.json()["score"] for response in responses}) == 1
+    assert all(response.status_code == 200 for response in responses)